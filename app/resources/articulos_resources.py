@@ -0,0 +1,155 @@
+import asyncio
+import time
+from urllib.parse import quote
+
+import httpx
+
+from config import ARTICULOS_INDICE_REFRESCO
+from utils.api_helpers import api_get_async
+from utils.paginacion import PaginadorDragonfish
+from app.resources.catalogos_resources import obtener_mapa_descripciones
+
+# Relación entre los campos de tipificación del artículo y el endpoint que los describe
+TIPIFICACIONES_ARTICULO = {
+    "Familia": "Familia",
+    "TipodeArticulo": "Tipodearticulo",
+    "Linea": "Linea",
+    "Grupo": "Grupo",
+    "CategoriaDeArticulo": "Categoriadearticulo",
+    "Material": "Material",
+    "Clasificacion": "Clasificacionarticulo",
+    "Proveedor": "Proveedor",
+    "UnidadDeMedida": "Unidaddemedida",
+    "Temporada": "Temporada",
+    "Paletadecolores": "Paletadecolores",
+    "Curvadetalles": "Curvadetalles",
+}
+
+async def construir_mapas_descripciones(articulos: list, base_datos: str) -> dict:
+    """
+    Construye los diccionarios de descripciones para las tipificaciones referenciadas
+    por los artículos. Cada endpoint se consulta como máximo una vez y todas las
+    consultas se hacen en paralelo.
+    
+    Returns:
+        Diccionario endpoint -> {código: descripción}, con None para los endpoints
+        que no se pudieron consultar
+    """
+    # Solo se consultan las tipificaciones que algún artículo tiene asignadas
+    endpoints = [
+        endpoint for campo, endpoint in TIPIFICACIONES_ARTICULO.items()
+        if any(articulo.get(campo) for articulo in articulos)
+    ]
+    
+    resultados = await asyncio.gather(
+        *(obtener_mapa_descripciones(endpoint, base_datos) for endpoint in endpoints),
+        return_exceptions=True
+    )
+    
+    return {
+        endpoint: None if isinstance(resultado, Exception) else resultado
+        for endpoint, resultado in zip(endpoints, resultados)
+    }
+
+class IndiceArticulos:
+    """
+    Índice en memoria código -> artículo para una base de datos.
+    Se carga completo la primera vez que se usa y luego se refresca en segundo plano
+    cada `intervalo_refresco` segundos, sin bloquear las búsquedas mientras tanto.
+    """
+    
+    def __init__(self, base_datos: str, intervalo_refresco: float = ARTICULOS_INDICE_REFRESCO):
+        self.base_datos = base_datos
+        self.intervalo_refresco = intervalo_refresco
+        self._articulos: dict = {}
+        self._cargado_en: float | None = None
+        self._refresco: asyncio.Task | None = None
+        self._carga_inicial = asyncio.Lock()
+    
+    async def refrescar(self) -> None:
+        """
+        Descarga todos los artículos (página por página) y reemplaza el índice.
+        """
+        articulos = {}
+        async for articulo in PaginadorDragonfish("Articulo", self.base_datos):
+            articulos[articulo.get("Codigo")] = articulo
+        self._articulos = articulos
+        self._cargado_en = time.monotonic()
+    
+    def _programar_refresco(self) -> None:
+        """
+        Lanza un refresco en segundo plano si el índice está vencido y no hay otro en curso.
+        """
+        vencido = time.monotonic() - self._cargado_en >= self.intervalo_refresco
+        if vencido and (self._refresco is None or self._refresco.done()):
+            self._refresco = asyncio.create_task(self._refrescar_silencioso())
+    
+    async def _refrescar_silencioso(self) -> None:
+        # Si el refresco en segundo plano falla se sigue usando el índice anterior
+        try:
+            await self.refrescar()
+        except Exception:
+            pass
+    
+    async def _buscar_en_api(self, codigo: str) -> dict | None:
+        """
+        Consulta un único artículo a la API (para altas posteriores a la última carga).
+        """
+        try:
+            articulo = await api_get_async(f"Articulo/{quote(codigo, safe='')}", self.base_datos)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+        if not articulo or articulo.get("Codigo") != codigo:
+            return None
+        self._articulos[codigo] = articulo
+        return articulo
+    
+    async def _asegurar_cargado(self) -> None:
+        """
+        Hace la carga inicial del índice o programa un refresco si está vencido.
+        """
+        if self._cargado_en is None:
+            # Solo una corrutina hace la carga inicial, el resto espera su resultado
+            async with self._carga_inicial:
+                if self._cargado_en is None:
+                    await self.refrescar()
+        else:
+            self._programar_refresco()
+    
+    async def todos(self) -> dict:
+        """
+        Devuelve el índice completo código -> artículo.
+        El diccionario es compartido y no debe modificarse.
+        """
+        await self._asegurar_cargado()
+        return self._articulos
+    
+    async def obtener(self, codigo: str) -> dict | None:
+        """
+        Busca un artículo por código. Si no está en el índice se hace una única
+        consulta puntual a la API.
+        
+        Returns:
+            El registro del artículo o None si no existe
+        """
+        await self._asegurar_cargado()
+        
+        articulo = self._articulos.get(codigo)
+        if articulo is None:
+            articulo = await self._buscar_en_api(codigo)
+        return articulo
+
+# Índices de artículos por base de datos
+_indices_articulos: dict[str, IndiceArticulos] = {}
+
+def obtener_indice_articulos(base_datos: str) -> IndiceArticulos:
+    """
+    Devuelve el índice de artículos compartido de la base de datos indicada.
+    """
+    indice = _indices_articulos.get(base_datos)
+    if indice is None:
+        indice = IndiceArticulos(base_datos)
+        _indices_articulos[base_datos] = indice
+    return indice
@@ -0,0 +1,30 @@
+from config import CACHE_CATALOGOS_TTL, CACHE_CATALOGOS_MAX
+from utils.paginacion import PaginadorDragonfish
+from utils.cache import TTLCache
+
+# Caché de catálogos de referencia (tipificaciones, colores, talles) por (endpoint, base_datos)
+cache_catalogos = TTLCache(ttl=CACHE_CATALOGOS_TTL, max_entradas=CACHE_CATALOGOS_MAX, nombre="catalogos")
+
+async def obtener_catalogo(endpoint: str, base_datos: str) -> list:
+    """
+    Devuelve los registros de un catálogo de referencia, usando el caché si está vigente.
+    La lista devuelta es compartida entre llamadas y no debe modificarse.
+    """
+    clave = (endpoint, base_datos)
+    registros = cache_catalogos.get(clave)
+    if registros is None:
+        registros = await PaginadorDragonfish(endpoint, base_datos).listar()
+        cache_catalogos.set(clave, registros)
+    return registros
+
+async def obtener_mapa_descripciones(endpoint: str, base_datos: str) -> dict:
+    """
+    Devuelve un diccionario código -> descripción para un catálogo de referencia.
+    """
+    # Proveedor usa "Nombre", el resto de los catálogos usa "Descripcion"
+    campo_descripcion = "Nombre" if endpoint == "Proveedor" else "Descripcion"
+    
+    return {
+        item.get("Codigo"): item.get(campo_descripcion) or ""
+        for item in await obtener_catalogo(endpoint, base_datos)
+    }
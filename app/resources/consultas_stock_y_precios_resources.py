@@ -9,11 +9,11 @@ COL_STOCK = "Stock"
 COL_DISPONIBLE = "Disponible"
 COL_PRECIO = "Precio"
 
-from prettytable import PrettyTable
+from utils.tabla_texto import TablaTexto
 from typing import List, Dict
+from app.resources.stock_columnar_resources import TablaStockColumnar
 
 def crear_parametros_consulta(
-    limite: int | None = None,
     query: str | None = None,
     lista: str | None = None,
     preciocero: bool | None = None,
@@ -21,9 +21,10 @@ def crear_parametros_consulta(
     exacto: bool | None = None
 ) -> dict:
     """
-    Crea los parámetros para la consulta de stock y precios.
+    Crea los parámetros de filtro para la consulta de stock y precios.
+    La paginación ("limit" y "page") la agrega el paginador.
     """
-    params = {"limit": limite if limite else 5000}
+    params = {}
     
     if query:
         params["query"] = query
@@ -38,51 +39,42 @@ def crear_parametros_consulta(
         
     return params
 
-def extraer_listas_precios(articulos: list) -> list:
+def filas_stock_precios(tabla_stock: TablaStockColumnar, largo_descripcion: int | None = None) -> list:
     """
-    Extrae y ordena las listas de precios disponibles en los artículos.
+    Arma las filas (datos de la combinación + un precio por lista) a partir de las
+    columnas ya calculadas de la tabla, sin volver a recorrer los precios de cada registro.
     """
-    listas_disponibles = set()
-    
-    for articulo in articulos:
-        precios_articulo = articulo.get("Precios", [])
-        if precios_articulo and isinstance(precios_articulo, list):
-            for precio_info in precios_articulo:
-                lista_nombre = precio_info.get("Lista", "")
-                if lista_nombre:
-                    listas_disponibles.add(lista_nombre)
+    datos = tabla_stock.datos
+    descripciones = datos["ArticuloDescripcion"]
+    if largo_descripcion is not None:
+        descripciones = descripciones.where(
+            descripciones.str.len() <= largo_descripcion,
+            descripciones.str[:largo_descripcion] + "..."
+        )
+    columnas = [
+        datos["Articulo"],
+        descripciones,
+        datos["ColorDescripcion"],
+        datos["Color"],  # Código de color
+        datos["TalleDescripcion"],
+        datos["Talle"],  # Código de talle
+        datos["Stock"],
+        datos["Disponible"]
+    ]
+    precios = tabla_stock.precios_formateados()
     
-    return sorted(listas_disponibles)
-
-def agrupar_articulos(articulos: list) -> dict:
-    """
-    Agrupa los artículos por código, color y talle.
-    """
-    articulos_agrupados = {}
-    
-    for articulo in articulos:
-        key = (articulo.get("Articulo", ""), articulo.get("Color", ""), articulo.get("Talle", ""))
-        if key not in articulos_agrupados:
-            articulos_agrupados[key] = {
-                "info": articulo,
-                "precios": {}
-            }
-        
-        # Procesar precios desde el array "Precios"
-        precios_articulo = articulo.get("Precios", [])
-        if precios_articulo and isinstance(precios_articulo, list):
-            for precio_info in precios_articulo:
-                lista_nombre = precio_info.get("Lista", "")
-                precio_valor = precio_info.get("Precio", 0)
-                if lista_nombre:
-                    articulos_agrupados[key]["precios"][lista_nombre] = precio_valor
-    
-    return articulos_agrupados
+    # Combinar las columnas base con las columnas de precios
+    return [
+        list(fila_base) + precios_fila
+        for fila_base, precios_fila in zip(zip(*(columna.tolist() for columna in columnas)), precios.tolist())
+    ]
 
-def crear_tabla_stock_precios(articulos_agrupados: dict, listas_ordenadas: list) -> PrettyTable:
+def crear_tabla_stock_precios(tabla_stock: TablaStockColumnar) -> TablaTexto:
     """
-    Crea y configura la tabla de stock y precios.
+    Crea y configura la tabla de stock y precios a partir de la tabla columnar.
     """
+    listas_ordenadas = tabla_stock.listas
+    
     # Crear tabla dinámica con columnas de precios según las listas encontradas
     columnas_base = [
         COL_ARTICULO, COL_DESCRIPCION, COL_COD_COLOR, COL_COLOR, 
@@ -90,33 +82,11 @@ def crear_tabla_stock_precios(articulos_agrupados: dict, listas_ordenadas: list)
     ]
     columnas_precios = [f"Precio {lista}" for lista in listas_ordenadas]
     
-    table = PrettyTable()
+    table = TablaTexto()
     table.field_names = columnas_base + columnas_precios
     
-    # Llenar tabla dinámicamente
-    for key, data_item in articulos_agrupados.items():
-        articulo = data_item["info"]
-        precios = data_item["precios"]
-        
-        # Datos base del artículo
-        fila_base = [
-            articulo.get("Articulo", ""),
-            articulo.get("ArticuloDescripcion", "")[:20] + "..." if len(articulo.get("ArticuloDescripcion", "")) > 20 else articulo.get("ArticuloDescripcion", ""),
-            articulo.get("ColorDescripcion", ""),
-            articulo.get("Color", ""),  # Código de color
-            articulo.get("TalleDescripcion", ""),
-            articulo.get("Talle", ""),  # Código de talle
-            articulo.get("Stock", 0),
-            articulo.get("Disponible", 0)
-        ]
-        
-        # Agregar precios dinámicamente según las listas encontradas
-        precios_fila = []
-        for lista in listas_ordenadas:
-            precio_valor = precios.get(lista, 0)
-            precios_fila.append(f"${precio_valor}" if precio_valor > 0 else "-")
-        
-        table.add_row(fila_base + precios_fila)
+    # Llenar tabla con las columnas ya calculadas
+    table.add_rows(filas_stock_precios(tabla_stock, largo_descripcion=20))
     
     # Configurar alineación de la tabla
     table.align = "l"
@@ -129,40 +99,6 @@ def crear_tabla_stock_precios(articulos_agrupados: dict, listas_ordenadas: list)
     
     return table
 
-def procesar_articulo_para_exportacion(articulo, base_datos):
-    """
-    Procesa un artículo para exportación, extrayendo sus datos y precios.
-    """
-    dato = {
-        "Articulo": articulo.get("Articulo", ""),
-        "Descripcion": articulo.get("ArticuloDescripcion", ""),
-        "Codigo_Color": articulo.get("Color", ""),
-        "Color": articulo.get("ColorDescripcion", ""),
-        "Codigo_Talle": articulo.get("Talle", ""),
-        "Talle": articulo.get("TalleDescripcion", ""),
-        "Stock": articulo.get("Stock", 0),
-        "Disponible": articulo.get("Disponible", 0),
-        "Comprometido": articulo.get("Comprometido", 0),
-        "Pendiente": articulo.get("PendienteEntrega", 0),
-        "Base_Datos": base_datos
-    }
-    
-    precios_articulo = articulo.get("Precios", [])
-    if precios_articulo and isinstance(precios_articulo, list):
-        for precio_info in precios_articulo:
-            lista_nombre = precio_info.get("Lista", "")
-            precio_valor = precio_info.get("Precio", 0)
-            if lista_nombre:
-                dato[f"Precio_{lista_nombre}"] = precio_valor
-                
-    return dato
-
-def filtrar_articulo_por_codigo(articulos: list, codigo_articulo: str) -> list:
-    """
-    Filtra los artículos por un código específico.
-    """
-    return [art for art in articulos if art.get("Articulo") == codigo_articulo]
-
 def crear_encabezado_articulo(articulo, codigo_articulo: str) -> str:
     """
     Crea el encabezado con la información básica del artículo.
@@ -176,57 +112,12 @@ def crear_encabezado_articulo(articulo, codigo_articulo: str) -> str:
     resultado += "\n"
     return resultado
 
-def crear_fila_articulo(articulo, listas_ordenadas):
-    """
-    Crea una fila de datos para un artículo específico.
-    """
-    stock = articulo.get("Stock", 0)
-    disponible = articulo.get("Disponible", 0)
-    
-    # Datos base de la fila
-    fila_base = [
-        articulo.get("Articulo", ""),
-        articulo.get("ArticuloDescripcion", ""),
-        articulo.get("ColorDescripcion", ""),
-        articulo.get("Color", ""),
-        articulo.get("TalleDescripcion", ""),
-        articulo.get("Talle", ""),
-        stock,
-        disponible
-    ]
-    
-    # Procesar precios
-    precios_fila = obtener_precios_articulo(articulo, listas_ordenadas)
-    
-    return fila_base + precios_fila, stock, disponible
-
-def obtener_precios_articulo(articulo, listas_ordenadas):
-    """
-    Obtiene los precios de un artículo según las listas ordenadas.
-    """
-    precios_fila = []
-    precios_articulo = articulo.get("Precios", [])
-    precios_dict = {}
-    
-    if precios_articulo and isinstance(precios_articulo, list):
-        for precio_info in precios_articulo:
-            lista_nombre = precio_info.get("Lista", "")
-            precio_valor = precio_info.get("Precio", 0)
-            if lista_nombre:
-                precios_dict[lista_nombre] = precio_valor
-    
-    for lista in listas_ordenadas:
-        precio_valor = precios_dict.get(lista, 0)
-        precios_fila.append(f"${precio_valor}" if precio_valor > 0 else "-")
-    
-    return precios_fila
-
-def crear_tabla_articulo_especifico(articulos_filtrados: list, listas_ordenadas: list) -> tuple:
+def crear_tabla_articulo_especifico(tabla_articulo: TablaStockColumnar) -> tuple:
     """
     Crea la tabla detallada para un artículo específico y calcula totales.
     """
     # Crear tabla detallada
-    table = PrettyTable()
+    table = TablaTexto()
     
     # Definir las columnas base
     columnas_base = [
@@ -235,20 +126,14 @@ def crear_tabla_articulo_especifico(articulos_filtrados: list, listas_ordenadas:
     ]
     
     # Agregar columnas de precios dinámicamente
-    columnas_precios = [f"Precio {lista}" for lista in listas_ordenadas]
+    columnas_precios = [f"Precio {lista}" for lista in tabla_articulo.listas]
     
     # Establecer los nombres de las columnas
     table.field_names = columnas_base + columnas_precios
     
-    total_stock = 0
-    total_disponible = 0
-    
-    # Procesar cada artículo
-    for articulo in articulos_filtrados:
-        fila, stock, disponible = crear_fila_articulo(articulo, listas_ordenadas)
-        table.add_row(fila)
-        total_stock += stock
-        total_disponible += disponible
+    # Llenar tabla y obtener totales desde las columnas
+    table.add_rows(filas_stock_precios(tabla_articulo))
+    totales = tabla_articulo.totales()
     
     # Configurar alineación de la tabla
     table.align = "l"
@@ -256,16 +141,16 @@ def crear_tabla_articulo_especifico(articulos_filtrados: list, listas_ordenadas:
     table.align[COL_DISPONIBLE] = "r"
     
     # Alinear columnas de precios
-    for lista in listas_ordenadas:
+    for lista in tabla_articulo.listas:
         table.align[f"Precio {lista}"] = "r"
     
-    return table, total_stock, total_disponible
+    return table, totales["Stock"], totales["Disponible"]
 
 def crear_tabla_articulos_sin_stock(articulos_sin_stock):
     """
     Crea una tabla para mostrar los artículos sin stock.
     """
-    table = PrettyTable()
+    table = TablaTexto()
     table.field_names = [
         COL_ARTICULO, COL_DESCRIPCION, COL_COLOR, COL_TALLE, COL_PRECIO
     ]
@@ -286,35 +171,106 @@ def crear_tabla_articulos_sin_stock(articulos_sin_stock):
     
     return table
 
-def obtener_precios_disponibles(articulo):
+def crear_tabla_resumen_tipificacion(resumen, descripciones: dict | None, titulo: str) -> TablaTexto:
     """
-    Extrae los precios disponibles para un artículo.
+    Crea la tabla con los totales de stock agrupados por una tipificación.
+    
+    Args:
+        resumen: DataFrame devuelto por `TablaStockColumnar.resumir_por`
+        descripciones: Diccionario código -> descripción de la tipificación (o None)
+        titulo: Nombre de la tipificación para el encabezado de la columna
     """
-    resultado = ""
-    precios_articulo = articulo.get("Precios", [])
+    table = TablaTexto()
+    table.field_names = [
+        titulo, COL_DESCRIPCION, "Artículos", "Combinaciones",
+        COL_STOCK, COL_DISPONIBLE, "Valor Stock", "% Stock"
+    ]
+    
+    for codigo, fila in zip(resumen.index.tolist(), resumen.itertuples(index=False)):
+        if not codigo:
+            codigo, descripcion = "-", "Sin asignar"
+        elif descripciones is None:
+            descripcion = "Error al obtener descripción"
+        else:
+            descripcion = descripciones.get(codigo) or "Código no encontrado"
+        
+        table.add_row([
+            codigo,
+            descripcion[:30] + "..." if len(descripcion) > 30 else descripcion,
+            fila.Articulos,
+            fila.Combinaciones,
+            f"{fila.Stock:g}",
+            f"{fila.Disponible:g}",
+            f"${fila.Valor:,.2f}",
+            f"{fila.Participacion:.1f}%"
+        ])
+    
+    # Configurar alineación de la tabla
+    table.align = "r"
+    table.align[titulo] = "l"
+    table.align[COL_DESCRIPCION] = "l"
     
-    if precios_articulo and isinstance(precios_articulo, list):
-        for precio_info in precios_articulo:
-            lista_nombre = precio_info.get("Lista", "")
-            precio_valor = precio_info.get("Precio", 0)
-            if lista_nombre:
-                resultado += f"- {lista_nombre}: ${precio_valor}\n"
+    return table
+
+def crear_tabla_comparacion_bases(alineado, bases_datos: list, lista: str | None = None) -> TablaTexto:
+    """
+    Crea la tabla que muestra lado a lado el stock (y opcionalmente el precio) de cada
+    combinación en varias bases de datos. "-" indica que la combinación no existe en esa base.
+    
+    Args:
+        alineado: DataFrame devuelto por `alinear_por_combinacion`
+        bases_datos: Bases de datos comparadas, en el orden de las columnas
+        lista: Lista de precios comparada (opcional)
+    """
+    columnas_valores = [f"Stock {base}" for base in bases_datos]
+    if lista is not None:
+        columnas_valores += [f"Precio {base}" for base in bases_datos]
+    
+    table = TablaTexto()
+    table.field_names = [COL_ARTICULO, COL_DESCRIPCION, COL_COLOR, COL_TALLE] + columnas_valores
+    
+    # Formatear cada columna completa de una vez
+    valores = [
+        alineado[columna].map(
+            (lambda v: "-" if v != v else f"${v:g}") if columna.startswith("Precio")
+            else (lambda v: "-" if v != v else f"{v:g}")
+        ).tolist()
+        for columna in columnas_valores
+    ]
+    descripciones = [d[:20] + "..." if len(d) > 20 else d for d in alineado["Descripcion"].tolist()]
+    
+    for (articulo, color, talle), descripcion, *fila in zip(alineado.index.tolist(), descripciones, *valores):
+        table.add_row([articulo, descripcion, color, talle, *fila])
+    
+    # Configurar alineación de la tabla
+    table.align = "l"
+    for columna in columnas_valores:
+        table.align[columna] = "r"
+    
+    return table
+
+def obtener_precios_disponibles(tabla_stock: TablaStockColumnar, fila: int = 0) -> str:
+    """
+    Lista los precios informados de una fila de la tabla (por defecto la primera).
+    """
+    resultado = ""
+    for lista_nombre, precio_valor in tabla_stock.precios_de_fila(fila).items():
+        resultado += f"- {lista_nombre}: ${precio_valor:g}\n"
     
     return resultado
 
-def crear_resumen_articulo(total_stock: int, total_disponible: int, articulos_filtrados: list, 
-                          listas_ordenadas: list, primer_articulo) -> str:
+def crear_resumen_articulo(total_stock: int, total_disponible: int, tabla_articulo: TablaStockColumnar) -> str:
     """
     Crea el resumen con totales y precios disponibles.
     """
     resultado = "\n\n**📊 Resumen Total:**\n"
-    resultado += f"- Stock total: {total_stock}\n"
-    resultado += f"- Disponible total: {total_disponible}\n"
-    resultado += f"- Combinaciones: {len(articulos_filtrados)}\n"
+    resultado += f"- Stock total: {total_stock:g}\n"
+    resultado += f"- Disponible total: {total_disponible:g}\n"
+    resultado += f"- Combinaciones: {len(tabla_articulo)}\n"
     
     # Mostrar todas las listas de precios disponibles dinámicamente
-    if listas_ordenadas:
+    if tabla_articulo.listas:
         resultado += "\n**💰 Listas de Precios Disponibles:**\n"
-        resultado += obtener_precios_disponibles(primer_articulo)
+        resultado += obtener_precios_disponibles(tabla_articulo)
     
     return resultado
@@ -0,0 +1,244 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import weakref
+from datetime import datetime
+
+import numpy as np
+
+from config import SNAPSHOTS_STOCK_RUTA, SNAPSHOTS_STOCK_MAX
+from utils.metricas import metricas
+from app.resources.stock_columnar_resources import TablaStockColumnar
+
+ESQUEMA_SNAPSHOTS = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    base_datos TEXT NOT NULL,
+    tomado_en TEXT NOT NULL,
+    combinaciones INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_base ON snapshots (base_datos, id);
+
+CREATE TABLE IF NOT EXISTS stock_snapshot (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    articulo TEXT NOT NULL,
+    color TEXT NOT NULL,
+    talle TEXT NOT NULL,
+    descripcion TEXT,
+    stock REAL NOT NULL,
+    disponible REAL NOT NULL,
+    PRIMARY KEY (snapshot_id, articulo, color, talle)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS precio_snapshot (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    articulo TEXT NOT NULL,
+    color TEXT NOT NULL,
+    talle TEXT NOT NULL,
+    lista TEXT NOT NULL,
+    precio REAL NOT NULL,
+    PRIMARY KEY (snapshot_id, articulo, color, talle, lista)
+) WITHOUT ROWID;
+"""
+
+# Combinaciones cuyo stock cambió, aparecieron o desaparecieron entre dos snapshots
+CONSULTA_MOVIMIENTOS = """
+SELECT n.articulo, n.color, n.talle, n.descripcion, a.stock, n.stock
+FROM stock_snapshot n
+LEFT JOIN stock_snapshot a
+    ON a.snapshot_id = :anterior AND a.articulo = n.articulo AND a.color = n.color AND a.talle = n.talle
+WHERE n.snapshot_id = :actual AND (a.stock IS NULL OR a.stock <> n.stock)
+UNION ALL
+SELECT a.articulo, a.color, a.talle, a.descripcion, a.stock, NULL
+FROM stock_snapshot a
+WHERE a.snapshot_id = :anterior AND NOT EXISTS (
+    SELECT 1 FROM stock_snapshot n
+    WHERE n.snapshot_id = :actual AND n.articulo = a.articulo AND n.color = a.color AND n.talle = a.talle
+)
+"""
+
+# Combinaciones que quedaron sin stock (tenían stock o no existían en el snapshot anterior)
+CONSULTA_NUEVOS_SIN_STOCK = """
+SELECT n.articulo, n.color, n.talle, n.descripcion, a.stock
+FROM stock_snapshot n
+LEFT JOIN stock_snapshot a
+    ON a.snapshot_id = :anterior AND a.articulo = n.articulo AND a.color = n.color AND a.talle = n.talle
+WHERE n.snapshot_id = :actual AND n.stock <= 0 AND (a.stock IS NULL OR a.stock > 0)
+ORDER BY n.articulo, n.color, n.talle
+"""
+
+# Precios que cambiaron entre dos snapshots (para combinaciones y listas presentes en ambos)
+CONSULTA_CAMBIOS_PRECIO = """
+SELECT n.articulo, n.color, n.talle, n.lista, a.precio, n.precio
+FROM precio_snapshot n
+JOIN precio_snapshot a
+    ON a.snapshot_id = :anterior AND a.articulo = n.articulo AND a.color = n.color
+    AND a.talle = n.talle AND a.lista = n.lista
+WHERE n.snapshot_id = :actual AND a.precio <> n.precio
+ORDER BY ABS(n.precio - a.precio) DESC
+"""
+
+class AlmacenSnapshotsStock:
+    """
+    Almacén local (SQLite) de snapshots sucesivos de ConsultaStockYPrecios por base de datos.
+    Permite responder qué cambió entre dos consultas completas sin volver a descargar nada.
+    Las operaciones son bloqueantes; desde código asíncrono se invocan con `asyncio.to_thread`.
+    """
+
+    def __init__(self, ruta: str, max_snapshots: int = SNAPSHOTS_STOCK_MAX):
+        """
+        Args:
+            ruta: Archivo SQLite donde se guardan los snapshots
+            max_snapshots: Snapshots que se conservan por base de datos (los más viejos se borran)
+        """
+        self.ruta = ruta
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA foreign_keys=ON")
+        self._conexion.executescript(ESQUEMA_SNAPSHOTS)
+
+    def guardar(self, base_datos: str, tabla_stock: TablaStockColumnar) -> int:
+        """
+        Guarda un snapshot con una fila por combinación artículo + color + talle.
+
+        Args:
+            base_datos: Base de datos de la que proviene la consulta
+            tabla_stock: Tabla de stock ya agrupada por combinación
+
+        Returns:
+            El id del snapshot guardado
+        """
+        datos = tabla_stock.datos
+        claves = list(zip(datos["Articulo"].tolist(), datos["Color"].tolist(), datos["Talle"].tolist()))
+        filas_stock = [
+            (*clave, descripcion, stock, disponible)
+            for clave, descripcion, stock, disponible in zip(
+                claves,
+                datos["ArticuloDescripcion"].tolist(),
+                datos["Stock"].astype(float).tolist(),
+                datos["Disponible"].astype(float).tolist()
+            )
+        ]
+
+        # Pasar la matriz de precios a formato largo, solo con los precios informados
+        filas, columnas = np.nonzero(~np.isnan(tabla_stock.precios))
+        valores = tabla_stock.precios[filas, columnas].tolist()
+        filas_precio = [
+            (*claves[fila], tabla_stock.listas[columna], valor)
+            for fila, columna, valor in zip(filas.tolist(), columnas.tolist(), valores)
+        ]
+
+        with self._lock, self._conexion:
+            cursor = self._conexion.execute(
+                "INSERT INTO snapshots (base_datos, tomado_en, combinaciones) VALUES (?, ?, ?)",
+                (base_datos, datetime.now().isoformat(timespec="seconds"), len(filas_stock))
+            )
+            snapshot_id = cursor.lastrowid
+            self._conexion.executemany(
+                "INSERT INTO stock_snapshot VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, *fila) for fila in filas_stock)
+            )
+            self._conexion.executemany(
+                "INSERT INTO precio_snapshot VALUES (?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, *fila) for fila in filas_precio)
+            )
+            self._podar(base_datos)
+
+        return snapshot_id
+
+    def _podar(self, base_datos: str) -> None:
+        # Borrar los snapshots que exceden el máximo a conservar (las filas se borran en cascada)
+        self._conexion.execute(
+            """
+            DELETE FROM snapshots WHERE base_datos = ? AND id NOT IN (
+                SELECT id FROM snapshots WHERE base_datos = ? ORDER BY id DESC LIMIT ?
+            )
+            """,
+            (base_datos, base_datos, self.max_snapshots)
+        )
+
+    def listar(self, base_datos: str, cantidad: int | None = None) -> list:
+        """
+        Devuelve los snapshots guardados de una base de datos, del más reciente al más viejo.
+
+        Returns:
+            Lista de diccionarios con id, tomado_en y combinaciones
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT id, tomado_en, combinaciones FROM snapshots WHERE base_datos = ? ORDER BY id DESC LIMIT ?",
+                (base_datos, cantidad if cantidad else -1)
+            ).fetchall()
+        return [{"id": id_, "tomado_en": tomado_en, "combinaciones": combinaciones}
+                for id_, tomado_en, combinaciones in filas]
+
+    def diferencias(self, anterior: int, actual: int) -> dict:
+        """
+        Compara dos snapshots.
+
+        Returns:
+            Diccionario con:
+            - "movimientos": (articulo, color, talle, descripcion, stock_anterior, stock_actual),
+              con None en el stock si la combinación no existía en ese snapshot
+            - "sin_stock": (articulo, color, talle, descripcion, stock_anterior)
+            - "precios": (articulo, color, talle, lista, precio_anterior, precio_actual)
+        """
+        parametros = {"anterior": anterior, "actual": actual}
+        with self._lock:
+            movimientos = self._conexion.execute(CONSULTA_MOVIMIENTOS, parametros).fetchall()
+            sin_stock = self._conexion.execute(CONSULTA_NUEVOS_SIN_STOCK, parametros).fetchall()
+            precios = self._conexion.execute(CONSULTA_CAMBIOS_PRECIO, parametros).fetchall()
+
+        # Los movimientos se ordenan por magnitud del cambio de stock
+        movimientos.sort(key=lambda fila: abs((fila[5] or 0) - (fila[4] or 0)), reverse=True)
+
+        return {"movimientos": movimientos, "sin_stock": sin_stock, "precios": precios}
+
+# Almacén compartido, creado al usarse por primera vez
+_almacen: AlmacenSnapshotsStock | None = None
+_almacen_lock = threading.Lock()
+
+def obtener_almacen_snapshots() -> AlmacenSnapshotsStock:
+    """
+    Devuelve el almacén de snapshots compartido (ubicado en SNAPSHOTS_STOCK_RUTA).
+    """
+    global _almacen
+    with _almacen_lock:
+        if _almacen is None:
+            _almacen = AlmacenSnapshotsStock(SNAPSHOTS_STOCK_RUTA)
+        return _almacen
+
+# Tablas ya guardadas como snapshot, para no repetir el snapshot de un resultado tomado del caché
+_tablas_registradas: "weakref.WeakKeyDictionary[TablaStockColumnar, int]" = weakref.WeakKeyDictionary()
+
+async def registrar_snapshot(base_datos: str, tabla_stock: TablaStockColumnar) -> int:
+    """
+    Guarda un snapshot sin bloquear el event loop. Si esa misma tabla ya se guardó
+    (por ejemplo, porque vino del caché de stock) se devuelve el snapshot existente.
+    Los errores se cuentan en la métrica snapshots_stock_errores_total y se propagan,
+    para que quien pidió el snapshot decida cómo informarlos.
+
+    Returns:
+        El id del snapshot
+
+    Raises:
+        Exception: El error de SQLite (u otro) que impidió guardar el snapshot
+    """
+    snapshot_id = _tablas_registradas.get(tabla_stock)
+    if snapshot_id is not None:
+        return snapshot_id
+    try:
+        snapshot_id = await asyncio.to_thread(obtener_almacen_snapshots().guardar, base_datos, tabla_stock)
+    except Exception as e:
+        metricas.incrementar("snapshots_stock_errores_total", base_datos=base_datos, error=type(e).__name__)
+        raise
+    _tablas_registradas[tabla_stock] = snapshot_id
+    return snapshot_id
@@ -0,0 +1,319 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from config import CACHE_STOCK_TTL, CACHE_STOCK_MAX
+from utils.cache import TTLCache
+from utils.paginacion import PaginadorDragonfish
+
+# Columnas de texto y cantidades que se extraen de cada registro de ConsultaStockYPrecios
+COLUMNAS_TEXTO = [
+    "Articulo", "ArticuloDescripcion", "ArticuloDescripcionAdicional",
+    "Color", "ColorDescripcion", "Talle", "TalleDescripcion"
+]
+COLUMNAS_CANTIDAD = ["Stock", "Disponible", "Comprometido", "PendienteEntrega"]
+
+# Clave que identifica una combinación artículo + color + talle
+CLAVE_COMBINACION = ["Articulo", "Color", "Talle"]
+
+# Columnas de los registros exportados -> columna de origen en `datos`
+COLUMNAS_EXPORTACION = {
+    "Articulo": "Articulo",
+    "Descripcion": "ArticuloDescripcion",
+    "Codigo_Color": "Color",
+    "Color": "ColorDescripcion",
+    "Codigo_Talle": "Talle",
+    "Talle": "TalleDescripcion",
+    "Stock": "Stock",
+    "Disponible": "Disponible",
+    "Comprometido": "Comprometido",
+    "Pendiente": "PendienteEntrega",
+}
+
+def columnas_exportacion(listas: list) -> list:
+    """
+    Encabezado de las filas devueltas por `TablaStockColumnar.filas_exportacion`.
+    """
+    return list(COLUMNAS_EXPORTACION) + ["Base_Datos"] + [f"Precio_{lista}" for lista in listas] + ["Otros_Precios"]
+
+class TablaStockColumnar:
+    """
+    Representación columnar de los resultados de ConsultaStockYPrecios.
+
+    Los registros (y sus arrays "Precios") se recorren una sola vez para armar:
+    - `datos`: DataFrame con una fila por registro (textos y cantidades).
+    - `listas`: nombres de las listas de precios encontradas, ordenados e internados.
+    - `indice_listas`: lista -> número de columna en `precios`.
+    - `precios`: matriz filas x listas con el precio de cada fila en cada lista
+      (NaN si la fila no tiene precio en esa lista).
+
+    Sobre esa estructura el agrupamiento, el armado de columnas de precios, la
+    exportación y los totales se calculan sin volver a recorrer los "Precios".
+    """
+
+    def __init__(self, datos: pd.DataFrame, listas: list, precios: np.ndarray,
+                 total_registros: int | None = None):
+        self.datos = datos
+        self.listas = listas
+        self.indice_listas = {lista: columna for columna, lista in enumerate(listas)}
+        self.precios = precios
+        self.total_registros = total_registros
+        self._agrupada: "TablaStockColumnar | None" = None
+
+    def __len__(self) -> int:
+        return len(self.datos)
+
+    @classmethod
+    def desde_resultados(cls, articulos: list) -> "TablaStockColumnar":
+        """
+        Convierte la lista de registros de la API (con su array "Precios") a columnas.
+        """
+        # Extraer de una sola vez las columnas necesarias (incluido el array de precios)
+        datos = pd.DataFrame.from_records(
+            articulos, columns=COLUMNAS_TEXTO + COLUMNAS_CANTIDAD + ["Precios"]
+        )
+        datos[COLUMNAS_TEXTO] = datos[COLUMNAS_TEXTO].fillna("").astype(str)
+        for columna in COLUMNAS_CANTIDAD:
+            datos[columna] = pd.to_numeric(datos[columna], errors="coerce").fillna(0)
+
+        # Aplanar los precios a tres columnas paralelas: fila, lista y precio
+        filas_precio, listas_precio, valores_precio = [], [], []
+        for fila, precios_articulo in enumerate(datos.pop("Precios").tolist()):
+            if not isinstance(precios_articulo, list):
+                continue
+            for precio_info in precios_articulo:
+                lista_nombre = precio_info.get("Lista")
+                if lista_nombre:
+                    filas_precio.append(fila)
+                    listas_precio.append(lista_nombre)
+                    valores_precio.append(precio_info.get("Precio") or 0)
+
+        # Pivotear los precios a una matriz densa filas x listas
+        codigos_lista, listas = pd.factorize(pd.Series(listas_precio, dtype=object), sort=True)
+        precios = np.full((len(datos), len(listas)), np.nan)
+        if valores_precio:
+            precios[np.array(filas_precio), codigos_lista] = pd.to_numeric(
+                pd.Series(valores_precio), errors="coerce"
+            ).fillna(0).to_numpy()
+
+        return cls(datos, [sys.intern(str(lista)) for lista in listas], precios)
+
+    def agrupar(self) -> "TablaStockColumnar":
+        """
+        Agrupa por artículo, color y talle. De cada combinación se conserva la primera
+        fila y, para cada lista, el último precio informado.
+        El resultado se guarda, por lo que agrupar la misma tabla dos veces no repite el cálculo.
+        """
+        if self._agrupada is not None:
+            return self._agrupada
+        if self.datos.empty:
+            return self
+
+        grupos = self.datos.groupby(CLAVE_COMBINACION, sort=False).ngroup().to_numpy()
+        primeras = ~self.datos.duplicated(CLAVE_COMBINACION, keep="first")
+        datos = self.datos[primeras].reset_index(drop=True)
+        precios = pd.DataFrame(self.precios).groupby(grupos, sort=True).last().to_numpy()
+
+        self._agrupada = TablaStockColumnar(datos, self.listas, precios, self.total_registros)
+        self._agrupada._agrupada = self._agrupada
+        return self._agrupada
+
+    def filtrar(self, mascara) -> "TablaStockColumnar":
+        """
+        Devuelve una tabla con las filas seleccionadas por la máscara booleana.
+        Solo se conservan las listas de precios que tienen algún precio en esas filas.
+        """
+        mascara = np.asarray(mascara, dtype=bool)
+        precios = self.precios[mascara]
+        usadas = ~np.isnan(precios).all(axis=0)
+        listas = [lista for lista, usada in zip(self.listas, usadas) if usada]
+        return TablaStockColumnar(self.datos[mascara].reset_index(drop=True), listas, precios[:, usadas])
+
+    def precios_de_fila(self, fila: int) -> dict:
+        """
+        Devuelve los precios informados de una fila como diccionario lista -> precio.
+        """
+        return {
+            lista: valor
+            for lista, valor in zip(self.listas, self.precios[fila].tolist())
+            if valor == valor
+        }
+
+    def registros_exportacion(self, base_datos: str) -> list:
+        """
+        Arma los registros planos para exportación: datos de la combinación y una
+        columna "Precio_<lista>" por cada lista con precio informado en la fila.
+        """
+        registros = pd.DataFrame({
+            nombre: self.datos[columna] for nombre, columna in COLUMNAS_EXPORTACION.items()
+        }).assign(Base_Datos=base_datos).to_dict("records")
+
+        # Agregar solo los precios informados de cada fila
+        columnas_precio = [f"Precio_{lista}" for lista in self.listas]
+        for registro, precios_fila in zip(registros, self.precios.tolist()):
+            for columna, valor in zip(columnas_precio, precios_fila):
+                if valor == valor:
+                    registro[columna] = valor
+        return registros
+
+    def filas_exportacion(self, base_datos: str, listas: list) -> list:
+        """
+        Arma filas (listas de valores) en el orden de `columnas_exportacion(listas)`,
+        con un precio por cada una de las `listas` pedidas. Los precios de listas que no
+        están entre ellas se escriben como texto ("lista=precio; ...") en "Otros_Precios",
+        así un encabezado fijado de antemano no pierde datos.
+        """
+        columnas = [self.datos[columna].tolist() for columna in COLUMNAS_EXPORTACION.values()]
+        columnas.append([base_datos] * len(self.datos))
+
+        vacia = [None] * len(self.datos)
+        for lista in listas:
+            indice = self.indice_listas.get(lista)
+            if indice is None:
+                columnas.append(vacia)
+            else:
+                columnas.append([valor if valor == valor else None for valor in self.precios[:, indice].tolist()])
+
+        pedidas = set(listas)
+        otras = [(lista, indice) for lista, indice in self.indice_listas.items() if lista not in pedidas]
+        if otras:
+            columnas.append([
+                "; ".join(f"{lista}={fila[indice]:g}" for lista, indice in otras if fila[indice] == fila[indice]) or None
+                for fila in self.precios.tolist()
+            ])
+        else:
+            columnas.append(vacia)
+
+        return [list(fila) for fila in zip(*columnas)]
+
+    def totales(self) -> dict:
+        """
+        Devuelve los totales de stock, disponible y comprometido.
+        """
+        return self.datos[["Stock", "Disponible", "Comprometido"]].sum().to_dict()
+
+    def precios_formateados(self) -> np.ndarray:
+        """
+        Devuelve la matriz de precios como texto: "$precio" o "-" si no hay precio.
+        """
+        valores = np.nan_to_num(self.precios, nan=0.0)
+        # Los precios enteros se muestran sin decimales ("$100" y no "$100.0")
+        textos = np.where(
+            valores == np.floor(valores),
+            valores.astype(np.int64).astype(str),
+            valores.astype(str)
+        )
+        return np.where(valores > 0, np.char.add("$", textos), "-")
+
+    def resumir_por(self, claves: pd.Series, lista: str | None = None) -> pd.DataFrame:
+        """
+        Calcula totales agrupando las filas por una clave externa (por ejemplo, la
+        familia de cada artículo).
+
+        Args:
+            claves: Serie alineada con `datos` con la clave de grupo de cada fila
+            lista: Lista de precios para valorizar el stock (por defecto la primera)
+
+        Returns:
+            DataFrame indexado por clave con Articulos, Combinaciones, Stock,
+            Disponible, Valor y Participacion (% del stock total), ordenado por stock
+        """
+        # Precio unitario de cada fila en la lista elegida (0 si no tiene precio)
+        if lista is None and self.listas:
+            lista = self.listas[0]
+        if lista in self.listas:
+            precio = np.nan_to_num(self.precios[:, self.indice_listas[lista]], nan=0.0)
+        else:
+            precio = np.zeros(len(self.datos))
+
+        base = pd.DataFrame({
+            "Clave": claves.to_numpy(),
+            "Articulo": self.datos["Articulo"].to_numpy(),
+            "Stock": self.datos["Stock"].to_numpy(),
+            "Disponible": self.datos["Disponible"].to_numpy(),
+            "Valor": self.datos["Stock"].to_numpy() * precio,
+        })
+        resumen = base.groupby("Clave", sort=False).agg(
+            Articulos=("Articulo", "nunique"),
+            Combinaciones=("Articulo", "size"),
+            Stock=("Stock", "sum"),
+            Disponible=("Disponible", "sum"),
+            Valor=("Valor", "sum"),
+        )
+
+        total_stock = resumen["Stock"].sum()
+        resumen["Participacion"] = resumen["Stock"] / total_stock * 100 if total_stock else 0.0
+
+        return resumen.sort_values("Stock", ascending=False)
+
+def alinear_por_combinacion(tablas: dict, lista: str | None = None) -> pd.DataFrame:
+    """
+    Alinea tablas de stock de varias bases de datos por artículo, color y talle.
+
+    Cada tabla se indexa por la combinación y se unen todas con un join externo por
+    hash sobre ese índice, de modo que las combinaciones ausentes en alguna base
+    quedan con NaN.
+
+    Args:
+        tablas: Diccionario base_datos -> TablaStockColumnar ya agrupada
+        lista: Lista de precios a comparar (opcional)
+
+    Returns:
+        DataFrame indexado por (Articulo, Color, Talle) con la columna Descripcion y,
+        por cada base, las columnas "Stock <base>" y, si se indicó lista, "Precio <base>"
+    """
+    columnas = []
+    descripciones = []
+    for base_datos, tabla in tablas.items():
+        datos = tabla.datos.set_index(CLAVE_COMBINACION)
+        columnas.append(datos["Stock"].rename(f"Stock {base_datos}"))
+        if lista is not None:
+            precio = (tabla.precios[:, tabla.indice_listas[lista]] if lista in tabla.listas
+                      else np.full(len(tabla), np.nan))
+            columnas.append(pd.Series(precio, index=datos.index, name=f"Precio {base_datos}"))
+        descripciones.append(datos["ArticuloDescripcion"])
+
+    if not columnas:
+        return pd.DataFrame()
+
+    alineado = pd.concat(columnas, axis=1, join="outer")
+
+    # La descripción se toma de la primera base que tenga la combinación
+    descripcion = pd.concat(descripciones)
+    descripcion = descripcion[~descripcion.index.duplicated(keep="first")]
+    alineado.insert(0, "Descripcion", descripcion.reindex(alineado.index).fillna(""))
+
+    return alineado.sort_index()
+
+# Caché de resultados de ConsultaStockYPrecios ya convertidos a columnas, por (base_datos, filtros, máximo)
+cache_stock = TTLCache(ttl=CACHE_STOCK_TTL, max_entradas=CACHE_STOCK_MAX, nombre="stock")
+
+async def obtener_tabla_stock(
+    base_datos: str,
+    params: dict | None = None,
+    maximo: int | None = None,
+    usar_cache: bool = True
+) -> TablaStockColumnar:
+    """
+    Descarga ConsultaStockYPrecios (todas las páginas o hasta `maximo` registros) y la
+    convierte a TablaStockColumnar. El resultado se guarda en caché durante
+    CACHE_STOCK_TTL segundos para que las herramientas de stock lo compartan.
+    La tabla devuelta es compartida entre llamadas y no debe modificarse.
+
+    Args:
+        base_datos: Base de datos a consultar
+        params: Filtros de la consulta (query, lista, stockcero, etc.)
+        maximo: Cantidad máxima de registros a descargar (opcional)
+        usar_cache: Si es False se descarga de nuevo aunque haya un resultado vigente
+    """
+    params = params or {}
+    clave = (base_datos, tuple(sorted((k, str(v)) for k, v in params.items())), maximo)
+
+    tabla = cache_stock.get(clave) if usar_cache else None
+    if tabla is None:
+        paginador = PaginadorDragonfish("ConsultaStockYPrecios", base_datos, params, maximo=maximo)
+        tabla = TablaStockColumnar.desde_resultados(await paginador.listar())
+        tabla.total_registros = paginador.total_registros
+        cache_stock.set(clave, tabla)
+    return tabla
@@ -1,10 +1,19 @@
-import httpx
 from prettytable import PrettyTable
 from server import mcp
-from utils.api_helpers import get_headers_with_db, API_BASE_URL
+from utils.tabla_texto import TablaTexto
+from utils.formato_salida import formatear_tabla, verificar_formato_salida
+from utils.cursores import paginar_tabla, siguiente_pagina
+from utils.paginacion import PaginadorDragonfish
+from app.resources.articulos_resources import construir_mapas_descripciones, obtener_indice_articulos
 
 @mcp.tool()
-def listar_articulos(limite: int | None = None, base_datos: str = "ECOMMECS") -> str:
+async def listar_articulos(
+    limite: int | None = None,
+    base_datos: str = "ECOMMECS",
+    output_format: str = "table",
+    filas_por_pagina: int | None = None,
+    cursor: str | None = None
+) -> str:
     """
     Lista todos los artículos con su código y descripción.
     
@@ -19,43 +28,49 @@ def listar_articulos(limite: int | None = None, base_datos: str = "ECOMMECS") ->
         resultado += "🔸 **Condicionales**: PaletaCol, CurvaTall, NoComercial, RestArt, ImprDespach\n"
         resultado += "🔸 **E-commerce**: DescEcomm, DescHTML, Largo, Ancho, Alto, Imagen\n"
         resultado += "\n💡 **Nota**: Ahora incluye descripciones detalladas para Tipificaciones y Generales\n"     base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
+        filas_por_pagina: Si se indica, devuelve el resultado de a esa cantidad de filas junto con un cursor para pedir la página siguiente; en csv/tsv el cursor va en la primera línea ("# cursor=...", vacío en la última página) (opcional)
+        cursor: Cursor devuelto por una consulta anterior para obtener la página siguiente sin volver a consultar la API (opcional)
     
     Returns:
         Una tabla formateada con los artículos
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        url = f"{API_BASE_URL}/Articulo/"
-        # Si se especifica un límite, lo usamos; si no, obtenemos todos los artículos
-        params = {"limit": limite if limite else 10000}
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+        verificar_formato_salida(output_format)
+        
+        # Página siguiente de un resultado ya descargado
+        if cursor:
+            return siguiente_pagina(cursor, output_format)
+        
+        # Recorrer los artículos página por página; si se especifica un límite se corta al alcanzarlo
+        paginador = PaginadorDragonfish("Articulo", base_datos, maximo=limite or None)
         
         # Crear tabla
-        table = PrettyTable()
+        table = TablaTexto()
         table.field_names = ["Código", "Descripción"]
         
-        # Obtener resultados
-        articulos = data.get("Resultados", [])
-        if limite:
-            articulos = articulos[:limite]
-        
-        # Llenar tabla
-        for articulo in articulos:
+        # Llenar tabla a medida que llegan los artículos
+        mostrados = 0
+        async for articulo in paginador:
             table.add_row([
                 articulo.get("Codigo", ""),
                 articulo.get("Descripcion", "")
             ])
+            mostrados += 1
         
         # Configurar la tabla
         table.align = "l"
         table.max_width["Descripción"] = 50
         
-        total = data.get("TotalRegistros", 0)
-        mostrados = len(articulos)
+        total = paginador.total_registros or 0
+        
+        # Resultado por páginas: se guarda completo y se devuelve la primera
+        if filas_por_pagina:
+            return paginar_tabla(table, filas_por_pagina, output_format, encabezado=f"Total de artículos: {total}")
+        
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
         
         return f"Total de artículos: {total}, Mostrando: {mostrados}\n\n{table.get_string()}"
         
@@ -63,7 +78,7 @@ def listar_articulos(limite: int | None = None, base_datos: str = "ECOMMECS") ->
         return f"Error al obtener los artículos: {str(e)}"
 
 @mcp.tool()
-def obtener_detalle_articulo(codigo: str, base_datos: str = "ECOMMECS") -> str:
+async def obtener_detalle_articulo(codigo: str, base_datos: str = "ECOMMECS") -> str:
     """
     Obtiene información detallada de un artículo específico por su código.
     Incluye todas las tipificaciones con sus descripciones completas.
@@ -76,45 +91,25 @@ def obtener_detalle_articulo(codigo: str, base_datos: str = "ECOMMECS") -> str:
         Información detallada del artículo en formato legible con todas las tipificaciones
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        # Obtener el artículo específico
-        url = f"{API_BASE_URL}/Articulo/"
-        params = {"limit": 10000}
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Buscar el artículo por código
-        articulo_encontrado = None
-        for articulo in data.get("Resultados", []):
-            if articulo.get("Codigo") == codigo:
-                articulo_encontrado = articulo
-                break
+        # Buscar el artículo en el índice por código de la base de datos
+        articulo_encontrado = await obtener_indice_articulos(base_datos).obtener(codigo)
         
         if not articulo_encontrado:
             return f"❌ No se encontró ningún artículo con el código **{codigo}** en la base de datos **{base_datos}**"
         
+        # Obtener en paralelo (y desde el caché de catálogos) todas las tipificaciones del artículo
+        mapas_descripciones = await construir_mapas_descripciones([articulo_encontrado], base_datos)
+        
         # Función helper para obtener descripción de tipificaciones
         def obtener_descripcion_tipificacion(endpoint: str, codigo_tipif: str) -> str:
             if not codigo_tipif:
                 return "No asignado"
-            try:
-                desc_url = f"{API_BASE_URL}/{endpoint}/"
-                desc_response = httpx.get(desc_url, headers=headers, params={"limit": 1000})
-                desc_response.raise_for_status()
-                desc_data = desc_response.json()
-                
-                # Definir el campo a usar según el endpoint
-                campo_descripcion = "Nombre" if endpoint == "Proveedor" else "Descripcion"
-                
-                for item in desc_data.get("Resultados", []):
-                    if item.get("Codigo") == codigo_tipif:
-                        return item.get(campo_descripcion, "Sin descripción")
-                return "Código no encontrado"
-            except:
+            descripciones = mapas_descripciones.get(endpoint)
+            if descripciones is None:
                 return "Error al obtener descripción"
+            if codigo_tipif not in descripciones:
+                return "Código no encontrado"
+            return descripciones[codigo_tipif] or "Sin descripción"
         
         # Crear representación detallada del artículo
         resultado = f"# 📋 Detalle Completo del Artículo: **{codigo}**\n"
@@ -253,7 +248,7 @@ def obtener_detalle_articulo(codigo: str, base_datos: str = "ECOMMECS") -> str:
         return f"❌ Error al obtener el detalle del artículo: {str(e)}"
 
 @mcp.tool()
-def listar_articulos_completos(limite: int | None = None, base_datos: str = "ECOMMECS") -> str:
+async def listar_articulos_completos(limite: int | None = None, base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todos los artículos con todos los campos disponibles de la API de Dragonfish según swagger.json.
     Incluye campos básicos, tipificaciones, datos fiscales, e-commerce y información adicional.
@@ -262,49 +257,30 @@ def listar_articulos_completos(limite: int | None = None, base_datos: str = "ECO
     Args:
         limite: Número máximo de artículos a mostrar (opcional)
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con todos los campos de los artículos disponibles en la API
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        url = f"{API_BASE_URL}/Articulo/"
-        # Si se especifica un límite, lo usamos; si no, obtenemos todos los artículos
-        params = {"limit": limite if limite else 10000}
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Obtener resultados
-        articulos = data.get("Resultados", [])
-        if limite:
-            articulos = articulos[:limite]
-        
-        # Función helper para obtener descripción de endpoint específico
+        verificar_formato_salida(output_format)
+        
+        # Recorrer los artículos página por página; si se especifica un límite se corta al alcanzarlo
+        paginador = PaginadorDragonfish("Articulo", base_datos, maximo=limite or None)
+        articulos = await paginador.listar()
+        
+        # Descargar una sola vez cada tipificación referenciada y armar los diccionarios de descripciones
+        mapas_descripciones = await construir_mapas_descripciones(articulos, base_datos)
+        
+        # Función helper para obtener descripción desde los diccionarios ya construidos
         def obtener_descripcion(endpoint: str, codigo: str) -> str:
-            try:
-                if not codigo:
-                    return ""
-                desc_url = f"{API_BASE_URL}/{endpoint}/"
-                desc_response = httpx.get(desc_url, headers=headers, params={"limit": 1000})
-                desc_response.raise_for_status()
-                desc_data = desc_response.json()
-                
-                # Definir el campo a usar según el endpoint
-                campo_descripcion = "Nombre" if endpoint == "Proveedor" else "Descripcion"
-                
-                for item in desc_data.get("Resultados", []):
-                    if item.get("Codigo") == codigo:
-                        descripcion = item.get(campo_descripcion, "")
-                        return descripcion[:40] + "..." if len(descripcion) > 40 else descripcion
-                return ""
-            except:
+            if not codigo:
                 return ""
+            descripcion = (mapas_descripciones.get(endpoint) or {}).get(codigo, "")
+            return descripcion[:40] + "..." if len(descripcion) > 40 else descripcion
         
         # Crear tabla completa con todos los campos como columnas
-        table = PrettyTable()
+        table = TablaTexto()
         table.field_names = [
             "Código", "Descripción", "DescAdicional", 
             "Familia", "DescFamilia", "Tipo", "DescTipo", "Línea", "DescLínea", 
@@ -409,7 +385,11 @@ def listar_articulos_completos(limite: int | None = None, base_datos: str = "ECO
         table.max_width["DescHTML"] = 10
         table.max_width["Imagen"] = 25
         
-        total = data.get("TotalRegistros", 0)
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
+        total = paginador.total_registros or 0
         mostrados = len(articulos)
         
         resultado = f"📋 **Tabla Completa de Artículos - BD: {base_datos}**\n\n"
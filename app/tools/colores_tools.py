@@ -1,37 +1,30 @@
-import httpx
-from prettytable import PrettyTable
 from server import mcp
-from utils.api_helpers import get_headers_with_db, API_BASE_URL
+from utils.tabla_texto import TablaTexto
+from utils.formato_salida import formatear_tabla, verificar_formato_salida
+from app.resources.catalogos_resources import obtener_catalogo
 
 @mcp.tool()
-def listar_colores(base_datos: str = "ECOMMECS") -> str:
+async def listar_colores(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todos los colores disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con los colores
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        url = f"{API_BASE_URL}/Color/"
-        # Agregamos el parámetro limit con un valor alto para obtener todos los colores
-        params = {"limit": 1000}  # Un número suficientemente alto para obtener todos los colores
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+        verificar_formato_salida(output_format)
+        
+        # Los colores cambian poco, se obtienen desde el caché de catálogos
+        colores = await obtener_catalogo("Color", base_datos)
         
         # Crear tabla
-        table = PrettyTable()
+        table = TablaTexto()
         table.field_names = ["Código", "Descripción", "RGB"]
         
-        # Obtener resultados
-        colores = data.get("Resultados", [])
-        
         # Llenar tabla
         for color in colores:
             # Formatear el RGB como un código de color hexadecimal
@@ -49,6 +42,10 @@ def listar_colores(base_datos: str = "ECOMMECS") -> str:
         # Configurar la tabla
         table.align = "l"
         
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
         total = len(colores)
         
         return f"Total de colores: {total}\n\n{table.get_string()}"
@@ -1,30 +1,46 @@
-import httpx
+import asyncio
+from contextlib import aclosing
+import pandas as pd
 from prettytable import PrettyTable
 from server import mcp
-from utils.api_helpers import get_headers_with_db, API_BASE_URL
+from utils.paginacion import PaginadorDragonfish
+from utils.formato_salida import formatear_tabla, verificar_formato_salida
+from utils.cursores import paginar_tabla, siguiente_pagina
+from utils.exportacion import FORMATOS_EXPORTACION, EscritorTabla, crear_escritor, crear_ruta_exportacion, resolver_formato
+from utils.trabajos_exportacion import TrabajoExportacion, ejecutar_en_hilo, gestor_exportaciones, mensaje_trabajo_enviado
 from typing import List, Dict
 from app.resources.consultas_stock_y_precios_resources import (
     crear_parametros_consulta,
-    extraer_listas_precios,
-    agrupar_articulos,
     crear_tabla_stock_precios,
-    procesar_articulo_para_exportacion,
-    filtrar_articulo_por_codigo,
     crear_encabezado_articulo,
     crear_tabla_articulo_especifico,
     crear_resumen_articulo,
-    crear_tabla_articulos_sin_stock
+    crear_tabla_articulos_sin_stock,
+    crear_tabla_resumen_tipificacion,
+    crear_tabla_comparacion_bases
 )
+from app.resources.stock_columnar_resources import (
+    TablaStockColumnar,
+    obtener_tabla_stock,
+    alinear_por_combinacion,
+    columnas_exportacion
+)
+from app.resources.articulos_resources import TIPIFICACIONES_ARTICULO, obtener_indice_articulos
+from app.resources.catalogos_resources import obtener_mapa_descripciones
+from app.resources.snapshots_stock_resources import registrar_snapshot
 
 @mcp.tool()
-def consultar_stock_y_precios(
+async def consultar_stock_y_precios(
     limite: int | None = None,
     query: str | None = None,
     lista: str | None = None,
     preciocero: bool | None = None,
     stockcero: bool | None = None,
     exacto: bool | None = None,
-    base_datos: str = "ECOMMECS"
+    base_datos: str = "ECOMMECS",
+    output_format: str = "table",
+    filas_por_pagina: int | None = None,
+    cursor: str | None = None
 ) -> str:
     """
     Consulta el stock y precios de todos los artículos del sistema.
@@ -37,48 +53,66 @@ def consultar_stock_y_precios(
         stockcero: Incluir artículos con stock cero (opcional)
         exacto: Búsqueda exacta (opcional)
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
+        filas_por_pagina: Si se indica, devuelve el resultado de a esa cantidad de filas junto con un cursor para pedir la página siguiente; en csv/tsv el cursor va en la primera línea ("# cursor=...", vacío en la última página) (opcional)
+        cursor: Cursor devuelto por una consulta anterior para obtener la página siguiente sin volver a consultar la API (opcional)
     
     Returns:
         Una tabla formateada con stock y precios de artículos
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-        url = f"{API_BASE_URL}/ConsultaStockYPrecios/"
+        verificar_formato_salida(output_format)
         
-        # Crear parámetros de consulta
-        params = crear_parametros_consulta(limite, query, lista, preciocero, stockcero, exacto)
+        # Página siguiente de un resultado ya descargado
+        if cursor:
+            return siguiente_pagina(cursor, output_format)
         
-        # Realizar la consulta
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+        # Crear parámetros de consulta
+        params = crear_parametros_consulta(query, lista, preciocero, stockcero, exacto)
+        
+        # Obtener la tabla de stock (compartida en caché) y agrupar por artículo, color y talle
+        tabla_completa = await obtener_tabla_stock(base_datos, params, maximo=limite or None)
+        tabla_stock = tabla_completa.agrupar()
+        listas_ordenadas = tabla_stock.listas
+        
+        # Una consulta completa (sin filtros ni límite) se guarda como snapshot para consultar cambios.
+        # Un error al guardarlo no hace fallar la consulta: queda en las métricas y se avisa al pie.
+        aviso_snapshot = ""
+        if not params and not limite:
+            try:
+                await registrar_snapshot(base_datos, tabla_stock)
+            except Exception as e:
+                aviso_snapshot = f"⚠️ No se pudo guardar el snapshot de stock: {str(e)}"
         
-        # Obtener resultados
-        articulos = data.get("Resultados", [])
-        if limite:
-            articulos = articulos[:limite]
+        # Crear tabla
+        table = crear_tabla_stock_precios(tabla_stock)
         
-        # Extraer listas de precios
-        listas_ordenadas = extraer_listas_precios(articulos)
+        total = tabla_completa.total_registros or 0
+        leyenda_listas = (f"📋 **Listas de Precios Encontradas:** {', '.join(listas_ordenadas)}"
+                          if listas_ordenadas else "")
         
-        # Agrupar artículos
-        articulos_agrupados = agrupar_articulos(articulos)
+        # Resultado por páginas: se guarda completo y se devuelve la primera
+        if filas_por_pagina:
+            encabezado = f"💰📦 **Consulta de Stock y Precios**\n\nTotal de registros: {total}"
+            pie = "\n\n".join(texto for texto in (leyenda_listas, aviso_snapshot) if texto)
+            return paginar_tabla(table, filas_por_pagina, output_format, encabezado=encabezado, pie=pie)
         
-        # Crear tabla
-        table = crear_tabla_stock_precios(articulos_agrupados, listas_ordenadas)
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
         
         # Preparar resultado
-        total = data.get("TotalRegistros", 0)
-        mostrados = len(articulos_agrupados)
+        mostrados = len(tabla_stock)
         
         resultado = "💰📦 **Consulta de Stock y Precios**\n\n"
         resultado += f"Total de registros: {total}, Mostrando: {mostrados}\n\n"
         resultado += table.get_string()
         
         # Agregar información sobre las listas encontradas
-        if listas_ordenadas:
-            resultado += f"\n\n📋 **Listas de Precios Encontradas:** {', '.join(listas_ordenadas)}"
+        if leyenda_listas:
+            resultado += f"\n\n{leyenda_listas}"
+        if aviso_snapshot:
+            resultado += f"\n\n{aviso_snapshot}"
         
         return resultado
         
@@ -86,7 +120,7 @@ def consultar_stock_y_precios(
         return f"Error al consultar stock y precios: {str(e)}"
 
 @mcp.tool()
-def consultar_stock_articulo_especifico(
+async def consultar_stock_articulo_especifico(
     codigo_articulo: str,
     base_datos: str = "ECOMMECS"
 ) -> str:
@@ -101,50 +135,30 @@ def consultar_stock_articulo_especifico(
         Información detallada de stock y precios del artículo específico
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-        url = f"{API_BASE_URL}/ConsultaStockYPrecios/"
-        
         # Buscar por código específico
         params = {
             "query": codigo_articulo,
-            "exacto": True,
-            "limit": 1000
+            "exacto": True
         }
         
-        # Realizar la consulta
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Obtener resultados
-        articulos = data.get("Resultados", [])
-        
-        if not articulos:
-            return f"No se encontró stock para el artículo {codigo_articulo}"
+        # Realizar la consulta recorriendo todas las páginas de combinaciones
+        tabla_stock = await obtener_tabla_stock(base_datos, params)
         
         # Filtrar solo el artículo específico
-        articulos_filtrados = filtrar_articulo_por_codigo(articulos, codigo_articulo)
+        tabla_articulo = tabla_stock.filtrar(tabla_stock.datos["Articulo"] == codigo_articulo)
         
-        if not articulos_filtrados:
+        if not len(tabla_articulo):
             return f"No se encontró stock para el artículo {codigo_articulo}"
         
-        # Obtener primer artículo para información básica
-        primer_articulo = articulos_filtrados[0]
-        
-        # Crear encabezado con información del artículo
-        resultado = crear_encabezado_articulo(primer_articulo, codigo_articulo)
-        
-        # Extraer listas de precios
-        listas_ordenadas = extraer_listas_precios(articulos_filtrados)
+        # Crear encabezado con la información básica del primer registro
+        resultado = crear_encabezado_articulo(tabla_articulo.datos.iloc[0], codigo_articulo)
         
         # Crear tabla y obtener totales
-        tabla, total_stock, total_disponible = crear_tabla_articulo_especifico(articulos_filtrados, listas_ordenadas)
+        tabla, total_stock, total_disponible = crear_tabla_articulo_especifico(tabla_articulo)
         resultado += tabla.get_string()
         
         # Agregar resumen con totales y precios
-        resultado += crear_resumen_articulo(total_stock, total_disponible, articulos_filtrados, 
-                                          listas_ordenadas, primer_articulo)
+        resultado += crear_resumen_articulo(total_stock, total_disponible, tabla_articulo)
         
         return resultado
         
@@ -152,9 +166,10 @@ def consultar_stock_articulo_especifico(
         return f"Error al consultar stock del artículo específico: {str(e)}"
 
 @mcp.tool()
-def consultar_articulos_sin_stock(
+async def consultar_articulos_sin_stock(
     limite: int | None = None,
-    base_datos: str = "ECOMMECS"
+    base_datos: str = "ECOMMECS",
+    output_format: str = "table"
 ) -> str:
     """
     Consulta artículos que no tienen stock disponible.
@@ -162,43 +177,43 @@ def consultar_articulos_sin_stock(
     Args:
         limite: Número máximo de artículos a mostrar (opcional)
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con artículos sin stock
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-        url = f"{API_BASE_URL}/ConsultaStockYPrecios/"
-        
-        # Filtrar por artículos sin stock
-        params = {
-            "stockcero": True,
-            "limit": limite if limite else 2000
-        }
-        
-        # Realizar la consulta
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Obtener resultados
-        articulos = data.get("Resultados", [])
-        if limite:
-            articulos = articulos[:limite]
-        
-        # Filtrar solo los que realmente tienen stock 0
-        articulos_sin_stock = [art for art in articulos if art.get("Stock", 0) == 0]
+        verificar_formato_salida(output_format)
+        
+        # Pedir a la API que incluya los artículos con stock cero
+        params = crear_parametros_consulta(stockcero=True)
+        paginador = PaginadorDragonfish("ConsultaStockYPrecios", base_datos, params)
+        
+        # Recorrer todas las páginas filtrando cada una a medida que llega; solo se
+        # conservan los artículos sin stock y se corta apenas se alcanza el límite
+        articulos_sin_stock = []
+        recorridos = 0
+        async with aclosing(paginador.paginas()) as paginas:
+            async for pagina in paginas:
+                recorridos += len(pagina)
+                articulos_sin_stock.extend(art for art in pagina if art.get("Stock", 0) == 0)
+                if limite and len(articulos_sin_stock) >= limite:
+                    articulos_sin_stock = articulos_sin_stock[:limite]
+                    break
         
         # Crear tabla
         table = crear_tabla_articulos_sin_stock(articulos_sin_stock)
         
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
         # Preparar resultado
-        total_original = data.get("TotalRegistros", 0)
+        total_original = paginador.total_registros or 0
         mostrados = len(articulos_sin_stock)
         
         resultado = "🚫📦 **Artículos Sin Stock**\n\n"
-        resultado += f"Total sin stock encontrados: {mostrados} (de {total_original} registros consultados)\n\n"
+        resultado += f"Total sin stock encontrados: {mostrados} (recorridos {recorridos} de {total_original} registros)\n\n"
         resultado += table.get_string()
         
         return resultado
@@ -207,7 +222,184 @@ def consultar_articulos_sin_stock(
         return f"Error al consultar artículos sin stock: {str(e)}"
 
 @mcp.tool()
-def obtener_datos_stock_y_precios(
+async def resumir_stock_por_tipificacion(
+    agrupar_por: str = "Familia",
+    lista: str | None = None,
+    query: str | None = None,
+    base_datos: str = "ECOMMECS",
+    output_format: str = "table",
+    filas_por_pagina: int | None = None,
+    cursor: str | None = None
+) -> str:
+    """
+    Resume el stock total, disponible y valorizado agrupado por una tipificación de artículo
+    (Familia, Linea, Temporada, Proveedor, etc.). El cruce y los totales se calculan en el
+    servidor, por lo que solo se devuelve la tabla resumida.
+    
+    Args:
+        agrupar_por: Tipificación por la que agrupar (por defecto Familia)
+        lista: Lista de precios para valorizar el stock (por defecto la primera encontrada)
+        query: Filtro de búsqueda por texto sobre el stock (opcional)
+        base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
+        filas_por_pagina: Si se indica, devuelve el resultado de a esa cantidad de filas junto con un cursor para pedir la página siguiente; en csv/tsv el cursor va en la primera línea ("# cursor=...", vacío en la última página) (opcional)
+        cursor: Cursor devuelto por una consulta anterior para obtener la página siguiente sin volver a consultar la API (opcional)
+    
+    Returns:
+        Una tabla formateada con los totales por tipificación
+    """
+    try:
+        verificar_formato_salida(output_format)
+        
+        # Página siguiente de un resultado ya calculado
+        if cursor:
+            return siguiente_pagina(cursor, output_format)
+        
+        # Validar la tipificación (sin distinguir mayúsculas)
+        campos = {campo.lower(): campo for campo in TIPIFICACIONES_ARTICULO}
+        campo = campos.get(agrupar_por.lower())
+        if campo is None:
+            return (f"❌ Tipificación '{agrupar_por}' no válida. "
+                    f"Opciones: {', '.join(TIPIFICACIONES_ARTICULO)}")
+        
+        # Descargar el stock, el índice de artículos y las descripciones en paralelo
+        params = crear_parametros_consulta(query=query)
+        tabla_completa, articulos, descripciones = await asyncio.gather(
+            obtener_tabla_stock(base_datos, params),
+            obtener_indice_articulos(base_datos).todos(),
+            obtener_mapa_descripciones(TIPIFICACIONES_ARTICULO[campo], base_datos),
+            return_exceptions=True
+        )
+        for resultado in (tabla_completa, articulos):
+            if isinstance(resultado, Exception):
+                raise resultado
+        if isinstance(descripciones, Exception):
+            descripciones = None
+        
+        tabla_stock = tabla_completa.agrupar()
+        if lista is not None and lista not in tabla_stock.listas:
+            return (f"❌ Lista de precios '{lista}' no encontrada. "
+                    f"Listas disponibles: {', '.join(tabla_stock.listas) or 'ninguna'}")
+        
+        # Cruzar cada fila de stock con la tipificación de su artículo y agrupar
+        tipificacion_por_articulo = {
+            codigo: articulo.get(campo) or "" for codigo, articulo in articulos.items()
+        }
+        claves = tabla_stock.datos["Articulo"].map(tipificacion_por_articulo).fillna("")
+        resumen = tabla_stock.resumir_por(claves, lista)
+        lista_valorizacion = lista or (tabla_stock.listas[0] if tabla_stock.listas else None)
+        
+        table = crear_tabla_resumen_tipificacion(resumen, descripciones, campo)
+        
+        encabezado = f"📊📦 **Stock por {campo} - BD: {base_datos}**\n\n"
+        encabezado += f"Combinaciones analizadas: {len(tabla_stock)}, Grupos: {len(resumen)}\n"
+        encabezado += f"Stock total: {resumen['Stock'].sum():g}, Disponible total: {resumen['Disponible'].sum():g}"
+        if lista_valorizacion:
+            encabezado += f"\nValor total (lista {lista_valorizacion}): ${resumen['Valor'].sum():,.2f}"
+        
+        # Resultado por páginas: se guarda completo y se devuelve la primera
+        if filas_por_pagina:
+            return paginar_tabla(table, filas_por_pagina, output_format, encabezado=encabezado)
+        
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
+        resultado = encabezado + "\n\n" + table.get_string()
+        
+        return resultado
+        
+    except Exception as e:
+        return f"Error al resumir stock por tipificación: {str(e)}"
+
+@mcp.tool()
+async def comparar_stock_entre_bases(
+    bases_datos: list[str],
+    query: str | None = None,
+    lista: str | None = None,
+    solo_diferencias: bool = True,
+    limite: int = 50,
+    output_format: str = "table"
+) -> str:
+    """
+    Compara el stock (y opcionalmente el precio de una lista) de las mismas combinaciones
+    de artículo, color y talle en varias bases de datos. Todas las bases se consultan en
+    paralelo y los resultados se alinean por combinación.
+    
+    Args:
+        bases_datos: Bases de datos a comparar (por ejemplo ["ECOMMECS", "TANGO"])
+        query: Filtro de búsqueda por texto (opcional)
+        lista: Lista de precios a comparar entre bases (opcional)
+        solo_diferencias: Mostrar solo las combinaciones que difieren entre bases (por defecto True)
+        limite: Cantidad máxima de combinaciones a mostrar (por defecto 50)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
+    
+    Returns:
+        Una tabla formateada con el stock de cada base lado a lado
+    """
+    try:
+        verificar_formato_salida(output_format)
+        
+        # Quitar duplicados conservando el orden
+        bases_datos = list(dict.fromkeys(base.strip() for base in bases_datos if base.strip()))
+        if len(bases_datos) < 2:
+            return "❌ Se necesitan al menos dos bases de datos para comparar."
+        
+        # Consultar todas las bases en paralelo
+        params = crear_parametros_consulta(query=query)
+        resultados = await asyncio.gather(
+            *(obtener_tabla_stock(base, params) for base in bases_datos),
+            return_exceptions=True
+        )
+        
+        tablas, errores = {}, {}
+        for base, resultado in zip(bases_datos, resultados):
+            if isinstance(resultado, Exception):
+                errores[base] = str(resultado)
+            else:
+                tablas[base] = resultado.agrupar()
+        
+        if len(tablas) < 2:
+            detalle = "; ".join(f"{base}: {error}" for base, error in errores.items())
+            return f"Error al comparar stock entre bases: no se pudieron consultar suficientes bases ({detalle})"
+        
+        # Alinear por artículo + color + talle y detectar diferencias
+        bases_ok = list(tablas)
+        alineado = alinear_por_combinacion(tablas, lista)
+        columnas_comparadas = [f"Stock {base}" for base in bases_ok]
+        if lista is not None:
+            columnas_comparadas += [f"Precio {base}" for base in bases_ok]
+        difiere = pd.Series(False, index=alineado.index)
+        for prefijo in ("Stock", "Precio"):
+            columnas = [columna for columna in columnas_comparadas if columna.startswith(prefijo)]
+            if columnas:
+                difiere |= alineado[columnas].nunique(axis=1, dropna=False) > 1
+        
+        seleccion = alineado[difiere] if solo_diferencias else alineado
+        table = crear_tabla_comparacion_bases(seleccion.head(limite), bases_ok, lista)
+        
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
+        resultado = f"🔀📦 **Comparación de Stock entre Bases: {', '.join(bases_ok)}**\n\n"
+        resultado += f"Combinaciones: {len(alineado)}, Con diferencias: {int(difiere.sum())}, "
+        resultado += f"Mostrando: {min(len(seleccion), limite)}\n"
+        for base in bases_ok:
+            resultado += f"• {base}: {len(tablas[base])} combinaciones, stock total {tablas[base].datos['Stock'].sum():g}\n"
+        resultado += "\n" + table.get_string()
+        
+        if errores:
+            resultado += "\n\n⚠️ **Bases no consultadas:** "
+            resultado += "; ".join(f"{base} ({error})" for base, error in errores.items())
+        
+        return resultado
+        
+    except Exception as e:
+        return f"Error al comparar stock entre bases: {str(e)}"
+
+@mcp.tool()
+async def obtener_datos_stock_y_precios(
     limite: int | None = None,
     query: str | None = None,
     lista: str | None = None,
@@ -230,28 +422,155 @@ def obtener_datos_stock_y_precios(
         
     Returns:
         Lista de diccionarios con datos de artículos procesados
+    
+    Para exportar a un archivo conviene usar `exportar_stock_y_precios_a_excel`, que escribe
+    los datos directamente sin devolverlos.
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-        url = f"{API_BASE_URL}/ConsultaStockYPrecios/"
-        
         # Crear parámetros de consulta
-        params = crear_parametros_consulta(limite, query, lista, preciocero, stockcero, exacto)
-        
-        # Realizar la consulta
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Obtener resultados
-        articulos = data.get("Resultados", [])
-        if limite:
-            articulos = articulos[:limite]
-            
-        # Procesar artículos para exportación
-        return [procesar_articulo_para_exportacion(art, base_datos) for art in articulos]
+        params = crear_parametros_consulta(query, lista, preciocero, stockcero, exacto)
+        
+        # Armar los registros desde la tabla columnar (compartida en caché con el resto de las herramientas)
+        tabla_stock = await obtener_tabla_stock(base_datos, params, maximo=limite or None)
+        return tabla_stock.registros_exportacion(base_datos)
     
     except Exception as e:
         return [{"Error": f"Error al obtener datos de stock y precios: {str(e)}"}]
 
+
+def _abrir_hoja_stock(escritor: EscritorTabla, nombre_hoja: str, base_datos: str, tablas: list) -> list:
+    """
+    Abre la hoja de stock con una columna de precio por cada lista encontrada en las
+    primeras páginas y escribe esas páginas como muestra. Devuelve las listas usadas.
+    """
+    listas = sorted({lista for tabla in tablas for lista in tabla.listas})
+    muestra = [fila for tabla in tablas for fila in tabla.filas_exportacion(base_datos, listas)]
+    escritor.abrir_hoja(nombre_hoja, columnas_exportacion(listas), muestra)
+    return listas
+
+async def _exportar_stock_y_precios(
+    params: dict,
+    limite: int | None,
+    base_datos: str,
+    nombre_archivo: str,
+    nombre_hoja: str,
+    formato: str = "xlsx",
+    trabajo: TrabajoExportacion | None = None
+) -> str:
+    """
+    Descarga ConsultaStockYPrecios página por página, la escribe en el archivo (en el
+    formato pedido) y arma el mensaje final. Si se indica un trabajo, se le informa la ruta y el avance.
+    """
+    paginador = PaginadorDragonfish("ConsultaStockYPrecios", base_datos, params, maximo=limite or None)
+    
+    nombre_archivo_final, ruta_completa = crear_ruta_exportacion(nombre_archivo, FORMATOS_EXPORTACION[formato])
+    escritor = crear_escritor(ruta_completa, formato, progreso=trabajo.avanzar if trabajo else None)
+    if trabajo is not None:
+        trabajo.ruta = ruta_completa
+    
+    # Las primeras páginas (hasta completar la muestra de anchos) se guardan para fijar
+    # el encabezado con las listas de precios encontradas; el resto se escribe al llegar.
+    # Si la exportación falla o se cancela, el escritor cierra y elimina el archivo
+    # en un hilo aparte, igual que la escritura, para no bloquear el event loop.
+    pendientes = []
+    listas = None
+    total_registros = 0
+    totales = {"Stock": 0, "Disponible": 0}
+    try:
+        async with aclosing(paginador.paginas()) as paginas:
+            async for pagina in paginas:
+                if trabajo is not None and trabajo.total is None and paginador.total_registros is not None:
+                    trabajo.total = min(paginador.total_registros, limite) if limite else paginador.total_registros
+                
+                tabla = TablaStockColumnar.desde_resultados(pagina)
+                total_registros += len(tabla)
+                for columna in totales:
+                    totales[columna] += tabla.datos[columna].sum()
+                
+                if listas is None:
+                    pendientes.append(tabla)
+                    if total_registros < escritor.muestra_anchos:
+                        continue
+                    listas = await ejecutar_en_hilo(_abrir_hoja_stock, escritor, nombre_hoja, base_datos, pendientes)
+                    pendientes = []
+                else:
+                    await ejecutar_en_hilo(escritor.agregar_filas, tabla.filas_exportacion(base_datos, listas))
+        
+        if not total_registros:
+            await ejecutar_en_hilo(escritor.descartar)
+            return "No se encontraron registros de stock y precios para exportar."
+        
+        if listas is None:
+            listas = await ejecutar_en_hilo(_abrir_hoja_stock, escritor, nombre_hoja, base_datos, pendientes)
+        await ejecutar_en_hilo(escritor.guardar)
+    except BaseException:
+        await ejecutar_en_hilo(escritor.descartar)
+        raise
+    
+    resultado = f"✅ **EXPORTACIÓN DE STOCK Y PRECIOS A {'EXCEL' if formato == 'xlsx' else formato.upper()}**\n\n"
+    resultado += f"📄 **Archivo generado:** {nombre_archivo_final}\n"
+    resultado += f"📂 **Ubicación:** {ruta_completa}\n\n"
+    resultado += "📊 **Contenido exportado:**\n"
+    resultado += f"• Base de datos: {base_datos}\n"
+    resultado += f"• Registros exportados: {total_registros} (de {paginador.total_registros or total_registros})\n"
+    resultado += f"• Stock total: {totales['Stock']:g}, Disponible total: {totales['Disponible']:g}\n"
+    if listas:
+        resultado += f"• Listas de precios: {', '.join(listas)}\n"
+    
+    return resultado
+
+@mcp.tool()
+async def exportar_stock_y_precios_a_excel(
+    limite: int | None = None,
+    query: str | None = None,
+    lista: str | None = None,
+    preciocero: bool | None = None,
+    stockcero: bool | None = None,
+    exacto: bool | None = None,
+    base_datos: str = "ECOMMECS",
+    nombre_archivo: str = "stock_y_precios.xlsx",
+    nombre_hoja: str = "Stock y Precios",
+    en_segundo_plano: bool = False,
+    formato: str | None = None
+) -> str:
+    """
+    Exporta el stock y precios directamente desde la API a un archivo (Excel, CSV, Parquet o
+    Feather) en la carpeta Descargas. Las páginas de ConsultaStockYPrecios se escriben en el
+    archivo a medida que llegan, sin pasar los registros por la conversación, por lo que sirve
+    para exportaciones grandes. Solo se devuelve la ruta del archivo y un resumen.
+    
+    Args:
+        limite: Número máximo de registros a exportar (opcional, por defecto todos)
+        query: Filtro de búsqueda por texto (opcional)
+        lista: Filtro por lista de precios específica (opcional)
+        preciocero: Incluir artículos con precio cero (opcional)
+        stockcero: Incluir artículos con stock cero (opcional)
+        exacto: Búsqueda exacta (opcional)
+        base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        nombre_archivo: Nombre del archivo Excel a crear
+        nombre_hoja: Nombre de la hoja dentro del archivo Excel
+        en_segundo_plano: Si True, devuelve de inmediato el id de un trabajo cuyo avance se
+            consulta con consultar_exportacion
+        formato: "xlsx", "csv", "csv.gz", "parquet" o "feather" (por defecto se deduce de
+            la extensión de nombre_archivo, o "xlsx")
+    
+    Returns:
+        Mensaje con la ubicación del archivo y un resumen de lo exportado (o el id del trabajo)
+    """
+    try:
+        params = crear_parametros_consulta(query, lista, preciocero, stockcero, exacto)
+        formato = resolver_formato(nombre_archivo, formato)
+        
+        if en_segundo_plano:
+            trabajo = gestor_exportaciones.enviar_async(
+                f"Stock y precios {base_datos} -> {nombre_archivo}",
+                lambda trabajo: _exportar_stock_y_precios(
+                    params, limite, base_datos, nombre_archivo, nombre_hoja, formato, trabajo
+                )
+            )
+            return mensaje_trabajo_enviado(trabajo)
+        
+        return await _exportar_stock_y_precios(params, limite, base_datos, nombre_archivo, nombre_hoja, formato)
+        
+    except Exception as e:
+        return f"Error al exportar stock y precios a Excel: {str(e)}"
@@ -0,0 +1,119 @@
+from prettytable import PrettyTable
+from server import mcp
+from utils.resiliencia import estado_resiliencia
+from utils.api_helpers import estadisticas_consultas
+from utils.metricas import estado_caches, exportar_prometheus, resumen_endpoints, resumen_herramientas
+
+@mcp.tool()
+async def estado_conexiones_dragonfish() -> str:
+    """
+    Muestra el estado de la conexión con Dragonfish para cada base de datos consultada:
+    estado del circuit breaker, fallos, reintentos y consultas rechazadas, además de
+    cuántas consultas se resolvieron compartiendo una consulta idéntica en curso.
+    
+    Returns:
+        Una tabla formateada con los contadores de resiliencia por base de datos
+    """
+    estados = estado_resiliencia()
+    
+    if not estados:
+        return "ℹ️ Todavía no se realizaron consultas a Dragonfish."
+    
+    table = PrettyTable()
+    table.field_names = ["Base de datos", "Circuito", "Fallos seguidos", "Fallos", "Reintentos", "Aperturas", "Rechazos"]
+    
+    for base_datos, estado in estados.items():
+        table.add_row([
+            base_datos,
+            estado["estado"],
+            estado["fallos_consecutivos"],
+            estado["fallos"],
+            estado["reintentos"],
+            estado["aperturas"],
+            estado["rechazos"]
+        ])
+    
+    table.align = "l"
+    
+    resultado = "🔌 **Estado de Conexiones con Dragonfish**\n\n"
+    resultado += table.get_string()
+    resultado += f"\n\n🔁 **Consultas compartidas** (pedidos idénticos simultáneos resueltos con una sola consulta): {estadisticas_consultas['compartidas']}"
+    resultado += "\n\n💡 **Circuito**: cerrado = normal, abierto = Dragonfish no responde y las consultas se rechazan, semiabierto = probando reconexión"
+    
+    return resultado
+
+def _formatear_segundos(valor) -> str:
+    return valor if isinstance(valor, str) else f"{valor:.3f}"
+
+@mcp.tool()
+async def metricas_servidor(formato: str = "table") -> str:
+    """
+    Muestra dónde se va el tiempo: latencia e invocaciones de cada herramienta (con
+    cuántas consultas a Dragonfish hizo cada una), latencia, errores y bytes recibidos
+    de cada endpoint de Dragonfish por base de datos, y la tasa de aciertos de los cachés.
+    
+    Args:
+        formato: "table" (por defecto) o "prometheus" (texto para un scraper de Prometheus)
+    
+    Returns:
+        Tablas formateadas con las métricas, o el texto en formato Prometheus
+    """
+    if formato == "prometheus":
+        return exportar_prometheus()
+    if formato != "table":
+        return f"❌ Formato '{formato}' no válido. Opciones: table, prometheus"
+    
+    resultado = "⏱️ **Métricas del Servidor**\n\n"
+    
+    herramientas = resumen_herramientas()
+    if herramientas:
+        table = PrettyTable()
+        table.field_names = ["Herramienta", "Base de datos", "Invocaciones", "Errores", "Prom. (s)", "p95 (s)", "Consultas/inv."]
+        for fila in herramientas:
+            table.add_row([
+                fila["herramienta"],
+                fila["base_datos"] or "-",
+                fila["invocaciones"],
+                fila["errores"],
+                _formatear_segundos(fila["latencia_promedio"]),
+                _formatear_segundos(fila["latencia_p95"]),
+                f"{fila['consultas_por_invocacion']:.1f}"
+            ])
+        table.align = "l"
+        resultado += "🛠️ **Herramientas**\n" + table.get_string() + "\n\n"
+    
+    endpoints = resumen_endpoints()
+    if endpoints:
+        table = PrettyTable()
+        table.field_names = ["Endpoint", "Base de datos", "Consultas", "Errores", "Compartidas", "Prom. (s)", "p95 (s)", "KB recibidos"]
+        for fila in endpoints:
+            table.add_row([
+                fila["endpoint"],
+                fila["base_datos"],
+                fila["consultas"],
+                fila["errores"],
+                fila["compartidas"],
+                _formatear_segundos(fila["latencia_promedio"]),
+                _formatear_segundos(fila["latencia_p95"]),
+                f"{fila['bytes'] / 1024:,.1f}"
+            ])
+        table.align = "l"
+        resultado += "🌐 **Consultas a Dragonfish**\n" + table.get_string() + "\n\n"
+    
+    table = PrettyTable()
+    table.field_names = ["Caché", "Aciertos", "Fallos", "Tasa de aciertos", "Entradas"]
+    for nombre, estado in estado_caches().items():
+        tasa = estado["tasa_aciertos"]
+        table.add_row([nombre, estado["aciertos"], estado["fallos"], "-" if tasa is None else f"{tasa:.0%}", estado["entradas"]])
+    table.align = "l"
+    resultado += "🗄️ **Cachés**\n" + table.get_string()
+    
+    resultado += "\n\n💡 p95 es una cota superior según los buckets del histograma. Use formato=\"prometheus\" para exportar las métricas."
+    return resultado
+
+@mcp.resource("metricas://prometheus", name="metricas_prometheus", mime_type="text/plain")
+def metricas_prometheus() -> str:
+    """
+    Métricas del servidor en el formato de texto de Prometheus.
+    """
+    return exportar_prometheus()
@@ -1,7 +1,12 @@
-import httpx
+import asyncio
+from contextlib import aclosing
 from prettytable import PrettyTable
 from server import mcp
-from utils.api_helpers import get_headers_with_db, API_BASE_URL
+from utils.tabla_texto import TablaTexto
+from utils.formato_salida import formatear_tabla, verificar_formato_salida
+from utils.paginacion import PaginadorDragonfish
+from app.resources.catalogos_resources import obtener_mapa_descripciones
+from app.resources.articulos_resources import obtener_indice_articulos
 
 # Constantes para mensajes reutilizables
 NO_ASIGNADO = "No asignado"
@@ -9,95 +14,115 @@ SIN_DESCRIPCION = "Sin descripción"
 CODIGO_NO_ENCONTRADO = "Código no encontrado"
 ERROR_OBTENER_DESCRIPCION = "Error al obtener descripción"
 
-def obtener_descripcion_articulo(codigo_articulo: str, headers: dict) -> str:
+# Consultas puntuales simultáneas para los artículos que no están en el índice
+CONSULTAS_ARTICULO_SIMULTANEAS = 8
+
+async def resolver_descripciones(equivalencias: list, base_datos: str) -> dict:
     """
-    Helper para obtener la descripción de un artículo específico.
+    Resuelve en bloque las descripciones de artículos, colores y talles referenciados
+    por las equivalencias. Cada catálogo se consulta una sola vez para toda la llamada.
     
     Args:
-        codigo_articulo: Código del artículo
-        headers: Headers con autenticación y base de datos
+        equivalencias: Lista de equivalencias a describir
+        base_datos: Base de datos a consultar
     
     Returns:
-        Descripción del artículo o mensaje si no se encuentra
+        Diccionario con las claves "Articulo", "Color" y "Talle", cada una con un
+        diccionario código -> descripción (o None si no se pudo obtener el catálogo)
     """
-    if not codigo_articulo:
-        return NO_ASIGNADO
+    # Artículos: solo los códigos distintos presentes, resueltos desde el índice de artículos
+    codigos_articulo = {eq.get("Articulo") for eq in equivalencias if eq.get("Articulo")}
     
-    try:
-        url = f"{API_BASE_URL}/Articulo/"
-        response = httpx.get(url, headers=headers, params={"limit": 1000})
-        response.raise_for_status()
-        data = response.json()
+    async def describir_articulos() -> dict:
+        # Los códigos se buscan en el índice de artículos; solo los que no figuran en él
+        # (altas posteriores al último refresco) se consultan puntualmente a la API, con
+        # un máximo de consultas simultáneas y sin que el error de un código afecte al resto
+        indice = obtener_indice_articulos(base_datos)
+        semaforo = asyncio.Semaphore(CONSULTAS_ARTICULO_SIMULTANEAS)
         
-        for articulo in data.get("Resultados", []):
-            if articulo.get("Codigo") == codigo_articulo:
-                descripcion = articulo.get("Descripcion", SIN_DESCRIPCION)
-                return descripcion[:40] + "..." if len(descripcion) > 40 else descripcion
+        async def describir(codigo: str) -> dict | None:
+            async with semaforo:
+                return await indice.obtener(codigo)
         
-        return CODIGO_NO_ENCONTRADO
-    except Exception:
+        codigos = list(codigos_articulo)
+        articulos = await asyncio.gather(*(describir(codigo) for codigo in codigos), return_exceptions=True)
+        descripciones = {}
+        for codigo, articulo in zip(codigos, articulos):
+            if isinstance(articulo, Exception):
+                descripciones[codigo] = ERROR_OBTENER_DESCRIPCION
+            elif articulo is not None:
+                descripciones[codigo] = articulo.get("Descripcion") or SIN_DESCRIPCION
+        return descripciones
+    
+    # Colores y talles: un único catálogo (cacheado) por tipo. Todo se consulta en paralelo.
+    articulos, colores, talles = await asyncio.gather(
+        describir_articulos(),
+        obtener_mapa_descripciones("Color", base_datos),
+        obtener_mapa_descripciones("Talle", base_datos),
+        return_exceptions=True
+    )
+    
+    return {
+        "Articulo": None if isinstance(articulos, Exception) else articulos,
+        "Color": None if isinstance(colores, Exception) else colores,
+        "Talle": None if isinstance(talles, Exception) else talles,
+    }
+
+def _describir(codigo: str, descripciones: dict | None, largo_maximo: int) -> str:
+    """
+    Busca la descripción de un código en un diccionario ya resuelto y la recorta.
+    """
+    if not codigo:
+        return NO_ASIGNADO
+    if descripciones is None:
         return ERROR_OBTENER_DESCRIPCION
+    if codigo not in descripciones:
+        return CODIGO_NO_ENCONTRADO
+    
+    descripcion = descripciones[codigo] or SIN_DESCRIPCION
+    return descripcion[:largo_maximo] + "..." if len(descripcion) > largo_maximo else descripcion
+
+def obtener_descripcion_articulo(codigo_articulo: str, descripciones: dict) -> str:
+    """
+    Helper para obtener la descripción de un artículo específico.
+    
+    Args:
+        codigo_articulo: Código del artículo
+        descripciones: Descripciones resueltas con `resolver_descripciones`
+    
+    Returns:
+        Descripción del artículo o mensaje si no se encuentra
+    """
+    return _describir(codigo_articulo, descripciones["Articulo"], 40)
 
-def obtener_descripcion_color(codigo_color: str, headers: dict) -> str:
+def obtener_descripcion_color(codigo_color: str, descripciones: dict) -> str:
     """
     Helper para obtener la descripción de un color específico.
     
     Args:
         codigo_color: Código del color
-        headers: Headers con autenticación y base de datos
+        descripciones: Descripciones resueltas con `resolver_descripciones`
     
     Returns:
         Descripción del color o mensaje si no se encuentra
     """
-    if not codigo_color:
-        return NO_ASIGNADO
-    
-    try:
-        url = f"{API_BASE_URL}/Color/"
-        response = httpx.get(url, headers=headers, params={"limit": 1000})
-        response.raise_for_status()
-        data = response.json()
-        
-        for color in data.get("Resultados", []):
-            if color.get("Codigo") == codigo_color:
-                descripcion = color.get("Descripcion", SIN_DESCRIPCION)
-                return descripcion[:20] + "..." if len(descripcion) > 20 else descripcion
-        
-        return CODIGO_NO_ENCONTRADO
-    except Exception:
-        return ERROR_OBTENER_DESCRIPCION
+    return _describir(codigo_color, descripciones["Color"], 20)
 
-def obtener_descripcion_talle(codigo_talle: str, headers: dict) -> str:
+def obtener_descripcion_talle(codigo_talle: str, descripciones: dict) -> str:
     """
     Helper para obtener la descripción de un talle específico.
     
     Args:
         codigo_talle: Código del talle
-        headers: Headers con autenticación y base de datos
+        descripciones: Descripciones resueltas con `resolver_descripciones`
     
     Returns:
         Descripción del talle o mensaje si no se encuentra
     """
-    if not codigo_talle:
-        return NO_ASIGNADO
-    
-    try:
-        url = f"{API_BASE_URL}/Talle/"
-        response = httpx.get(url, headers=headers, params={"limit": 1000})
-        response.raise_for_status()
-        data = response.json()
-        
-        for talle in data.get("Resultados", []):
-            if talle.get("Codigo") == codigo_talle:
-                descripcion = talle.get("Descripcion", SIN_DESCRIPCION)
-                return descripcion[:15] + "..." if len(descripcion) > 15 else descripcion
-        
-        return CODIGO_NO_ENCONTRADO
-    except Exception:
-        return ERROR_OBTENER_DESCRIPCION
+    return _describir(codigo_talle, descripciones["Talle"], 15)
 
 @mcp.tool()
-def listar_equivalencias(limite: int | None = None, base_datos: str = "ECOMMECS") -> str:
+async def listar_equivalencias(limite: int | None = None, base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las equivalencias disponibles en el sistema con sus combinaciones de artículo, color y talle.
     Incluye las descripciones completas de cada elemento para mejor comprensión.
@@ -105,32 +130,27 @@ def listar_equivalencias(limite: int | None = None, base_datos: str = "ECOMMECS"
     Args:
         limite: Número máximo de equivalencias a mostrar (opcional)
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las equivalencias y sus descripciones
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        url = f"{API_BASE_URL}/Equivalencia/"
-        # Si se especifica un límite, lo usamos; si no, obtenemos todas las equivalencias
-        params = {"limit": limite if limite else 1000}
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+        verificar_formato_salida(output_format)
+        
+        # Recorrer las equivalencias página por página; si se especifica un límite se corta al alcanzarlo
+        paginador = PaginadorDragonfish("Equivalencia", base_datos, maximo=limite or None)
+        equivalencias = await paginador.listar()
         
         # Crear tabla con todos los campos relevantes
-        table = PrettyTable()
+        table = TablaTexto()
         table.field_names = [
             "Código", "Artículo", "DescArt", "Color", "DescColor", 
             "Talle", "DescTalle", "Cantidad", "GTIN", "Observación"
         ]
         
-        # Obtener resultados
-        equivalencias = data.get("Resultados", [])
-        if limite:
-            equivalencias = equivalencias[:limite]
+        # Resolver de una sola vez las descripciones de toda la página
+        descripciones = await resolver_descripciones(equivalencias, base_datos)
         
         # Llenar tabla con todas las equivalencias
         for equivalencia in equivalencias:
@@ -140,9 +160,9 @@ def listar_equivalencias(limite: int | None = None, base_datos: str = "ECOMMECS"
             codigo_talle = equivalencia.get("Talle", "")
             
             # Obtener descripciones usando los helpers
-            desc_articulo = obtener_descripcion_articulo(codigo_art, headers)
-            desc_color = obtener_descripcion_color(codigo_color, headers)
-            desc_talle = obtener_descripcion_talle(codigo_talle, headers)
+            desc_articulo = obtener_descripcion_articulo(codigo_art, descripciones)
+            desc_color = obtener_descripcion_color(codigo_color, descripciones)
+            desc_talle = obtener_descripcion_talle(codigo_talle, descripciones)
             
             # Formatear observación
             observacion = equivalencia.get("Observacion", "")
@@ -169,7 +189,11 @@ def listar_equivalencias(limite: int | None = None, base_datos: str = "ECOMMECS"
         table.max_width["DescTalle"] = 12
         table.max_width["Observación"] = 20
         
-        total = data.get("TotalRegistros", 0)
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
+        total = paginador.total_registros or 0
         mostrados = len(equivalencias)
         
         resultado = f"📋 **Equivalencias - BD: {base_datos}**\n"
@@ -194,7 +218,7 @@ def listar_equivalencias(limite: int | None = None, base_datos: str = "ECOMMECS"
         return f"❌ Error al obtener las equivalencias: {str(e)}"
 
 @mcp.tool()
-def obtener_equivalencia_especifica(codigo: str, base_datos: str = "ECOMMECS") -> str:
+async def obtener_equivalencia_especifica(codigo: str, base_datos: str = "ECOMMECS") -> str:
     """
     Obtiene información detallada de una equivalencia específica por su código.
     
@@ -206,21 +230,16 @@ def obtener_equivalencia_especifica(codigo: str, base_datos: str = "ECOMMECS") -
         Información detallada de la equivalencia en formato legible
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        url = f"{API_BASE_URL}/Equivalencia/"
-        params = {"limit": 1000}
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Buscar la equivalencia por código
+        # Buscar la equivalencia por código, recorriendo las páginas solo hasta encontrarla
         equivalencia_encontrada = None
-        for equivalencia in data.get("Resultados", []):
-            if equivalencia.get("Codigo") == codigo:
-                equivalencia_encontrada = equivalencia
-                break
+        async with aclosing(PaginadorDragonfish("Equivalencia", base_datos).paginas()) as paginas:
+            async for pagina in paginas:
+                equivalencia_encontrada = next(
+                    (equivalencia for equivalencia in pagina if equivalencia.get("Codigo") == codigo),
+                    None
+                )
+                if equivalencia_encontrada:
+                    break
         
         if not equivalencia_encontrada:
             return f"❌ No se encontró ninguna equivalencia con el código **{codigo}** en la base de datos **{base_datos}**"
@@ -230,9 +249,10 @@ def obtener_equivalencia_especifica(codigo: str, base_datos: str = "ECOMMECS") -
         codigo_color = equivalencia_encontrada.get("Color", "")
         codigo_talle = equivalencia_encontrada.get("Talle", "")
         
-        desc_articulo = obtener_descripcion_articulo(codigo_art, headers)
-        desc_color = obtener_descripcion_color(codigo_color, headers)
-        desc_talle = obtener_descripcion_talle(codigo_talle, headers)
+        descripciones = await resolver_descripciones([equivalencia_encontrada], base_datos)
+        desc_articulo = obtener_descripcion_articulo(codigo_art, descripciones)
+        desc_color = obtener_descripcion_color(codigo_color, descripciones)
+        desc_talle = obtener_descripcion_talle(codigo_talle, descripciones)
         
         # Crear representación detallada
         resultado = f"# 📋 Detalle de Equivalencia: **{codigo}**\n"
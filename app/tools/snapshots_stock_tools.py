@@ -0,0 +1,165 @@
+import asyncio
+from prettytable import PrettyTable
+from server import mcp
+from app.resources.stock_columnar_resources import obtener_tabla_stock
+from app.resources.snapshots_stock_resources import obtener_almacen_snapshots, registrar_snapshot
+
+def _formatear_cantidad(valor) -> str:
+    """
+    Formatea una cantidad de stock, o "-" si la combinación no existía.
+    """
+    return "-" if valor is None else f"{valor:g}"
+
+def crear_tabla_movimientos(movimientos: list) -> PrettyTable:
+    """
+    Crea la tabla de combinaciones cuyo stock cambió entre dos snapshots.
+    """
+    table = PrettyTable()
+    table.field_names = ["Artículo", "Descripción", "Color", "Talle", "Antes", "Ahora", "Diferencia"]
+
+    for articulo, color, talle, descripcion, antes, ahora in movimientos:
+        descripcion = descripcion or ""
+        table.add_row([
+            articulo,
+            descripcion[:25] + "..." if len(descripcion) > 25 else descripcion,
+            color,
+            talle,
+            _formatear_cantidad(antes),
+            _formatear_cantidad(ahora),
+            f"{(ahora or 0) - (antes or 0):+g}"
+        ])
+
+    table.align = "l"
+    for columna in ("Antes", "Ahora", "Diferencia"):
+        table.align[columna] = "r"
+    return table
+
+def crear_tabla_sin_stock(sin_stock: list) -> PrettyTable:
+    """
+    Crea la tabla de combinaciones que quedaron sin stock.
+    """
+    table = PrettyTable()
+    table.field_names = ["Artículo", "Descripción", "Color", "Talle", "Stock anterior"]
+
+    for articulo, color, talle, descripcion, antes in sin_stock:
+        descripcion = descripcion or ""
+        table.add_row([
+            articulo,
+            descripcion[:25] + "..." if len(descripcion) > 25 else descripcion,
+            color,
+            talle,
+            "Nuevo" if antes is None else f"{antes:g}"
+        ])
+
+    table.align = "l"
+    return table
+
+def crear_tabla_cambios_precio(precios: list) -> PrettyTable:
+    """
+    Crea la tabla de precios que cambiaron entre dos snapshots.
+    """
+    table = PrettyTable()
+    table.field_names = ["Artículo", "Color", "Talle", "Lista", "Antes", "Ahora", "Variación"]
+
+    for articulo, color, talle, lista, antes, ahora in precios:
+        variacion = f"{(ahora - antes) / antes * 100:+.1f}%" if antes else "-"
+        table.add_row([articulo, color, talle, lista, f"${antes:g}", f"${ahora:g}", variacion])
+
+    table.align = "l"
+    for columna in ("Antes", "Ahora", "Variación"):
+        table.align[columna] = "r"
+    return table
+
+@mcp.tool()
+async def tomar_snapshot_stock(base_datos: str = "ECOMMECS") -> str:
+    """
+    Descarga el stock y precios completos de una base de datos y los guarda como snapshot
+    local, para luego consultar los cambios con `consultar_cambios_stock`.
+    Las consultas completas de `consultar_stock_y_precios` (sin filtros ni límite) también
+    se guardan automáticamente como snapshot.
+
+    Args:
+        base_datos: Base de datos a consultar (por defecto ECOMMECS)
+
+    Returns:
+        Confirmación con el id y tamaño del snapshot guardado
+    """
+    try:
+        tabla_stock = (await obtener_tabla_stock(base_datos, usar_cache=False)).agrupar()
+
+        snapshot_id = await registrar_snapshot(base_datos, tabla_stock)
+        cantidad = len(await asyncio.to_thread(obtener_almacen_snapshots().listar, base_datos))
+
+        resultado = f"📸 **Snapshot de stock guardado - BD: {base_datos}**\n\n"
+        resultado += f"Snapshot: #{snapshot_id}, Combinaciones: {len(tabla_stock)}, "
+        resultado += f"Listas de precios: {', '.join(tabla_stock.listas) or 'ninguna'}\n"
+        resultado += f"Snapshots guardados para esta base de datos: {cantidad}"
+        return resultado
+
+    except Exception as e:
+        return f"Error al tomar el snapshot de stock: {str(e)}"
+
+@mcp.tool()
+async def consultar_cambios_stock(
+    actualizar: bool = False,
+    limite: int = 30,
+    base_datos: str = "ECOMMECS"
+) -> str:
+    """
+    Informa qué cambió en el stock desde el snapshot anterior: movimientos de stock,
+    combinaciones que quedaron sin stock y cambios de precio. La comparación se hace
+    localmente entre los dos últimos snapshots guardados, sin consultar la API.
+
+    Args:
+        actualizar: Si es True, primero toma un snapshot nuevo y lo compara con el anterior
+        limite: Cantidad máxima de filas a mostrar en cada tabla (por defecto 30)
+        base_datos: Base de datos a consultar (por defecto ECOMMECS)
+
+    Returns:
+        Tablas formateadas con los cambios detectados
+    """
+    try:
+        almacen = obtener_almacen_snapshots()
+
+        if actualizar:
+            tabla_stock = (await obtener_tabla_stock(base_datos, usar_cache=False)).agrupar()
+            try:
+                await registrar_snapshot(base_datos, tabla_stock)
+            except Exception as e:
+                return f"Error al consultar cambios de stock: no se pudo guardar el snapshot nuevo ({str(e)})"
+
+        snapshots = await asyncio.to_thread(almacen.listar, base_datos, 2)
+        if len(snapshots) < 2:
+            return (f"ℹ️ Se necesitan al menos dos snapshots de {base_datos} para comparar "
+                    f"(hay {len(snapshots)}). Use `tomar_snapshot_stock` o `consultar_cambios_stock(actualizar=True)`.")
+
+        actual, anterior = snapshots
+        cambios = await asyncio.to_thread(almacen.diferencias, anterior["id"], actual["id"])
+        movimientos, sin_stock, precios = cambios["movimientos"], cambios["sin_stock"], cambios["precios"]
+
+        resultado = f"🔄📦 **Cambios de Stock - BD: {base_datos}**\n\n"
+        resultado += f"Comparando snapshot #{anterior['id']} ({anterior['tomado_en']}) "
+        resultado += f"con #{actual['id']} ({actual['tomado_en']})\n"
+        resultado += f"Movimientos de stock: {len(movimientos)}, Nuevos sin stock: {len(sin_stock)}, "
+        resultado += f"Cambios de precio: {len(precios)}\n"
+
+        secciones = [
+            ("📊 **Movimientos de Stock**", movimientos, crear_tabla_movimientos),
+            ("🚫 **Nuevos Sin Stock**", sin_stock, crear_tabla_sin_stock),
+            ("💲 **Cambios de Precio**", precios, crear_tabla_cambios_precio),
+        ]
+        for titulo, filas, crear_tabla in secciones:
+            if not filas:
+                continue
+            resultado += f"\n{titulo}"
+            if len(filas) > limite:
+                resultado += f" (mostrando {limite} de {len(filas)})"
+            resultado += "\n" + crear_tabla(filas[:limite]).get_string() + "\n"
+
+        if not (movimientos or sin_stock or precios):
+            resultado += "\n✅ No hubo cambios entre ambos snapshots."
+
+        return resultado
+
+    except Exception as e:
+        return f"Error al consultar cambios de stock: {str(e)}"
@@ -1,37 +1,30 @@
-import httpx
-from prettytable import PrettyTable
 from server import mcp
-from utils.api_helpers import get_headers_with_db, API_BASE_URL
+from utils.tabla_texto import TablaTexto
+from utils.formato_salida import formatear_tabla, verificar_formato_salida
+from app.resources.catalogos_resources import obtener_catalogo
 
 @mcp.tool()
-def listar_talles(base_datos: str = "ECOMMECS") -> str:
+async def listar_talles(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todos los talles disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con los talles
     """
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        url = f"{API_BASE_URL}/Talle/"
-        # Agregamos el parámetro limit con un valor alto para obtener todos los talles
-        params = {"limit": 1000}
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+        verificar_formato_salida(output_format)
+        
+        # Los talles cambian poco, se obtienen desde el caché de catálogos
+        talles = await obtener_catalogo("Talle", base_datos)
         
         # Crear tabla
-        table = PrettyTable()
+        table = TablaTexto()
         table.field_names = ["Código", "Descripción", "Orden"]
         
-        # Obtener resultados
-        talles = data.get("Resultados", [])
-        
         # Llenar tabla
         for talle in talles:
             table.add_row([
@@ -44,6 +37,10 @@ def listar_talles(base_datos: str = "ECOMMECS") -> str:
         table.align = "l"
         table.align["Orden"] = "r"  # Alinear orden a la derecha
         
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
         total = len(talles)
         
         return f"Total de talles: {total}\n\n{table.get_string()}"
@@ -1,7 +1,11 @@
-import httpx
+import asyncio
 from prettytable import PrettyTable
 from server import mcp
-from utils.api_helpers import get_headers_with_db, API_BASE_URL
+from utils.tabla_texto import TablaTexto
+from utils.formato_salida import FORMATOS_SALIDA, formatear_tabla
+from utils.api_helpers import api_get_async
+from app.resources.catalogos_resources import obtener_catalogo
+from config import TIPIFICACIONES_CONCURRENCIA, TIPIFICACIONES_TIMEOUT
 
 # Configuración de tipificaciones según swagger.json
 TIPIFICACIONES_CONFIG = {
@@ -68,39 +72,33 @@ TIPIFICACIONES_CONFIG = {
     }
 }
 
-def obtener_tipificacion_generica(tipo_tipificacion: str, base_datos: str = "ECOMMECS") -> str:
+async def obtener_tipificacion_generica(tipo_tipificacion: str, base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Helper genérico para obtener cualquier tipificación de artículos.
     
     Args:
         tipo_tipificacion: Tipo de tipificación (debe estar en TIPIFICACIONES_CONFIG)
         base_datos: Base de datos a consultar
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con la tipificación solicitada
     """
     if tipo_tipificacion not in TIPIFICACIONES_CONFIG:
         return f"Error: Tipificación '{tipo_tipificacion}' no válida. Opciones válidas: {', '.join(TIPIFICACIONES_CONFIG.keys())}"
+    if output_format not in FORMATOS_SALIDA:
+        return f"Error: Formato de salida '{output_format}' no válido. Opciones válidas: {', '.join(FORMATOS_SALIDA)}"
     
     config = TIPIFICACIONES_CONFIG[tipo_tipificacion]
     
     try:
-        # Obtener headers con la base de datos especificada
-        headers = get_headers_with_db(base_datos)
-            
-        url = f"{API_BASE_URL}/{config['endpoint']}/"
-        params = {"limit": 1000}
-        response = httpx.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+        # Obtener los registros desde el caché de catálogos
+        items = await obtener_catalogo(config['endpoint'], base_datos)
         
         # Crear tabla
-        table = PrettyTable()
+        table = TablaTexto()
         table.field_names = ["Código", "Descripción"]
         
-        # Obtener resultados
-        items = data.get("Resultados", [])
-        
         # Determinar el campo de descripción (Proveedor usa "Nombre", otros usan "Descripcion")
         campo_desc = config.get("campo_descripcion", "Descripcion")
         
@@ -115,6 +113,10 @@ def obtener_tipificacion_generica(tipo_tipificacion: str, base_datos: str = "ECO
         table.align = "l"
         table.max_width["Descripción"] = 50
         
+        # Formatos compactos: solo los datos, sin encabezados ni leyendas
+        if output_format != "table":
+            return formatear_tabla(table, output_format)
+        
         total = len(items)
         
         resultado = f"📋 **{config['nombre_display']} - BD: {base_datos}**\n"
@@ -130,163 +132,175 @@ def obtener_tipificacion_generica(tipo_tipificacion: str, base_datos: str = "ECO
 # Tools específicas usando el helper genérico
 
 @mcp.tool()
-def listar_familias(base_datos: str = "ECOMMECS") -> str:
+async def listar_familias(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las familias de artículos disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las familias
     """
-    return obtener_tipificacion_generica("Familia", base_datos)
+    return await obtener_tipificacion_generica("Familia", base_datos, output_format)
 
 @mcp.tool()
-def listar_tipos_articulo(base_datos: str = "ECOMMECS") -> str:
+async def listar_tipos_articulo(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todos los tipos de artículo disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con los tipos de artículo
     """
-    return obtener_tipificacion_generica("Tipodearticulo", base_datos)
+    return await obtener_tipificacion_generica("Tipodearticulo", base_datos, output_format)
 
 @mcp.tool()
-def listar_lineas(base_datos: str = "ECOMMECS") -> str:
+async def listar_lineas(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las líneas comerciales disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las líneas
     """
-    return obtener_tipificacion_generica("Linea", base_datos)
+    return await obtener_tipificacion_generica("Linea", base_datos, output_format)
 
 @mcp.tool()
-def listar_grupos(base_datos: str = "ECOMMECS") -> str:
+async def listar_grupos(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todos los grupos de artículos disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con los grupos
     """
-    return obtener_tipificacion_generica("Grupo", base_datos)
+    return await obtener_tipificacion_generica("Grupo", base_datos, output_format)
 
 @mcp.tool()
-def listar_materiales(base_datos: str = "ECOMMECS") -> str:
+async def listar_materiales(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todos los materiales disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con los materiales
     """
-    return obtener_tipificacion_generica("Material", base_datos)
+    return await obtener_tipificacion_generica("Material", base_datos, output_format)
 
 @mcp.tool()
-def listar_clasificaciones_articulo(base_datos: str = "ECOMMECS") -> str:
+async def listar_clasificaciones_articulo(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las clasificaciones de artículos disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las clasificaciones de artículo
     """
-    return obtener_tipificacion_generica("Clasificacionarticulo", base_datos)
+    return await obtener_tipificacion_generica("Clasificacionarticulo", base_datos, output_format)
 
 @mcp.tool()
-def listar_categorias_articulo(base_datos: str = "ECOMMECS") -> str:
+async def listar_categorias_articulo(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las categorías de artículos disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las categorías de artículo
     """
-    return obtener_tipificacion_generica("Categoriadearticulo", base_datos)
+    return await obtener_tipificacion_generica("Categoriadearticulo", base_datos, output_format)
 
 @mcp.tool()
-def listar_proveedores(base_datos: str = "ECOMMECS") -> str:
+async def listar_proveedores(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todos los proveedores disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con los proveedores
     """
-    return obtener_tipificacion_generica("Proveedor", base_datos)
+    return await obtener_tipificacion_generica("Proveedor", base_datos, output_format)
 
 @mcp.tool()
-def listar_unidades_medida(base_datos: str = "ECOMMECS") -> str:
+async def listar_unidades_medida(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las unidades de medida disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las unidades de medida
     """
-    return obtener_tipificacion_generica("Unidaddemedida", base_datos)
+    return await obtener_tipificacion_generica("Unidaddemedida", base_datos, output_format)
 
 @mcp.tool()
-def listar_temporadas(base_datos: str = "ECOMMECS") -> str:
+async def listar_temporadas(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las temporadas disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las temporadas
     """
-    return obtener_tipificacion_generica("Temporada", base_datos)
+    return await obtener_tipificacion_generica("Temporada", base_datos, output_format)
 
 @mcp.tool()
-def listar_paletas_colores(base_datos: str = "ECOMMECS") -> str:
+async def listar_paletas_colores(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las paletas de colores disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las paletas de colores
     """
-    return obtener_tipificacion_generica("Paletadecolores", base_datos)
+    return await obtener_tipificacion_generica("Paletadecolores", base_datos, output_format)
 
 @mcp.tool()
-def listar_curvas_talles(base_datos: str = "ECOMMECS") -> str:
+async def listar_curvas_talles(base_datos: str = "ECOMMECS", output_format: str = "table") -> str:
     """
     Lista todas las curvas de talles disponibles en el sistema.
     
     Args:
         base_datos: Base de datos a consultar (por defecto ECOMMECS)
+        output_format: Formato de salida: "table" (por defecto), "csv", "tsv" o "jsonl"
     
     Returns:
         Una tabla formateada con las curvas de talles
     """
-    return obtener_tipificacion_generica("Curvadetalles", base_datos)
+    return await obtener_tipificacion_generica("Curvadetalles", base_datos, output_format)
 
 @mcp.tool()
-def listar_todas_las_tipificaciones(base_datos: str = "ECOMMECS") -> str:
+async def listar_todas_las_tipificaciones(base_datos: str = "ECOMMECS") -> str:
     """
     Lista un resumen de todas las tipificaciones disponibles en el sistema.
     
@@ -302,36 +316,51 @@ def listar_todas_las_tipificaciones(base_datos: str = "ECOMMECS") -> str:
     table = PrettyTable()
     table.field_names = ["Tipificación", "Total Items", "Descripción"]
     
-    for key, config in TIPIFICACIONES_CONFIG.items():
-        try:
-            # Obtener headers con la base de datos especificada
-            headers = get_headers_with_db(base_datos)
-                
-            url = f"{API_BASE_URL}/{config['endpoint']}/"
-            params = {"limit": 1000}
-            response = httpx.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            total = len(data.get("Resultados", []))
-            
-            table.add_row([
-                config['nombre_display'],
-                str(total),
-                config['descripcion']
-            ])
-        except:
-            table.add_row([
-                config['nombre_display'],
-                "Error",
-                config['descripcion']
-            ])
+    # Consultar las tipificaciones en paralelo, con un máximo de consultas simultáneas
+    semaforo = asyncio.Semaphore(TIPIFICACIONES_CONCURRENCIA)
+    
+    async def contar(endpoint: str) -> int:
+        # Alcanza con pedir un registro: el total viene en "TotalRegistros"
+        data = await api_get_async(endpoint, base_datos, {"limit": 1})
+        total = data.get("TotalRegistros")
+        if total is None:
+            # Si el endpoint no informa el total, se cuenta el catálogo completo (paginado y cacheado)
+            total = len(await obtener_catalogo(endpoint, base_datos))
+        return total
+    
+    async def contar_items(config: dict) -> int:
+        async with semaforo:
+            # Un único timeout por endpoint, incluya o no la descarga del catálogo
+            return await asyncio.wait_for(contar(config['endpoint']), TIPIFICACIONES_TIMEOUT)
+    
+    totales = await asyncio.gather(
+        *(contar_items(config) for config in TIPIFICACIONES_CONFIG.values()),
+        return_exceptions=True
+    )
+    
+    fallidas = 0
+    for config, total in zip(TIPIFICACIONES_CONFIG.values(), totales):
+        if isinstance(total, asyncio.TimeoutError):
+            estado = "Timeout"
+        elif isinstance(total, Exception):
+            estado = "Error"
+        else:
+            estado = str(total)
+        fallidas += estado in ("Timeout", "Error")
+        
+        table.add_row([
+            config['nombre_display'],
+            estado,
+            config['descripcion']
+        ])
     
     # Configurar la tabla
     table.align = "l"
     table.max_width["Descripción"] = 40
     
     resultado += table.get_string()
+    if fallidas:
+        resultado += f"\n\n⚠️ {fallidas} tipificaciones no respondieron; se muestran los resultados parciales."
     resultado += "\n\n💡 **Uso**: Utiliza las tools específicas como `listar_familias`, `listar_materiales`, etc. para obtener detalles completos."
     
     return resultado
@@ -20,3 +20,82 @@ JW_TOKEN = os.getenv("JW_TOKEN")
 SERVER_TITLE = "MCP Server para Dragonfish"
 SERVER_DESCRIPTION = "Un conjunto de herramientas para interactuar con la API de Dragonfish a través de un asistente de IA."
 SERVER_VERSION = "1.0.0"
+
+# --- Configuración del cliente HTTP compartido ---
+# Se mantiene un cliente por base de datos con conexiones persistentes (keep-alive),
+# de modo que las consultas sucesivas no repitan el handshake TCP/TLS.
+HTTP_MAX_CONEXIONES = int(os.getenv("HTTP_MAX_CONEXIONES", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+# --- Configuración del caché de catálogos ---
+# Tipificaciones, colores y talles cambian muy poco, por lo que se guardan en memoria
+# durante CACHE_CATALOGOS_TTL segundos. CACHE_CATALOGOS_MAX limita la cantidad de
+# catálogos (endpoint + base de datos) guardados; al superarlo se descarta el menos usado.
+CACHE_CATALOGOS_TTL = float(os.getenv("CACHE_CATALOGOS_TTL", "600"))
+CACHE_CATALOGOS_MAX = int(os.getenv("CACHE_CATALOGOS_MAX", "128"))
+
+# --- Configuración del índice de artículos ---
+# Segundos luego de los cuales el índice código -> artículo de cada base de datos se
+# vuelve a descargar en segundo plano.
+ARTICULOS_INDICE_REFRESCO = float(os.getenv("ARTICULOS_INDICE_REFRESCO", "900"))
+
+# --- Configuración del resumen de tipificaciones ---
+# Cantidad máxima de endpoints consultados a la vez y timeout (segundos) de cada uno.
+TIPIFICACIONES_CONCURRENCIA = int(os.getenv("TIPIFICACIONES_CONCURRENCIA", "4"))
+TIPIFICACIONES_TIMEOUT = float(os.getenv("TIPIFICACIONES_TIMEOUT", "10"))
+
+# --- Configuración de la paginación de Dragonfish ---
+# Cantidad de registros pedidos por página al recorrer listados grandes.
+DRAGONFISH_TAMANO_PAGINA = int(os.getenv("DRAGONFISH_TAMANO_PAGINA", "500"))
+
+# --- Configuración de reintentos y circuit breaker ---
+# Los GET que fallan por errores transitorios (conexión, timeout, 429, 502, 503, 504)
+# se reintentan hasta HTTP_REINTENTOS veces con espera exponencial (respetando Retry-After).
+HTTP_REINTENTOS = int(os.getenv("HTTP_REINTENTOS", "3"))
+HTTP_REINTENTOS_ESPERA_BASE = float(os.getenv("HTTP_REINTENTOS_ESPERA_BASE", "0.5"))
+HTTP_REINTENTOS_ESPERA_MAX = float(os.getenv("HTTP_REINTENTOS_ESPERA_MAX", "10"))
+# Tras CIRCUITO_UMBRAL_FALLOS fallos seguidos contra una base de datos, las consultas
+# fallan de inmediato durante CIRCUITO_TIEMPO_APERTURA segundos antes de volver a probar.
+CIRCUITO_UMBRAL_FALLOS = int(os.getenv("CIRCUITO_UMBRAL_FALLOS", "5"))
+CIRCUITO_TIEMPO_APERTURA = float(os.getenv("CIRCUITO_TIEMPO_APERTURA", "30"))
+
+# --- Configuración de los snapshots de stock ---
+# Archivo SQLite donde se guardan las consultas completas de stock y precios para poder
+# comparar qué cambió entre una y otra, y cantidad de snapshots conservados por base de datos.
+SNAPSHOTS_STOCK_RUTA = os.getenv(
+    "SNAPSHOTS_STOCK_RUTA",
+    os.path.join(os.path.expanduser("~"), ".mcp_dragonfish", "snapshots_stock.db")
+)
+SNAPSHOTS_STOCK_MAX = int(os.getenv("SNAPSHOTS_STOCK_MAX", "10"))
+
+# --- Configuración del caché de stock y precios ---
+# Los resultados de ConsultaStockYPrecios ya convertidos a columnas se comparten entre
+# herramientas durante CACHE_STOCK_TTL segundos (el stock cambia seguido, por eso es corto).
+CACHE_STOCK_TTL = float(os.getenv("CACHE_STOCK_TTL", "60"))
+CACHE_STOCK_MAX = int(os.getenv("CACHE_STOCK_MAX", "16"))
+
+# --- Configuración de las tablas de texto para resultados grandes ---
+# Máximo de caracteres que devuelve una tabla de listado (0 = sin límite); las filas que
+# no entran se omiten indicando cuántas son. El ancho de las columnas se calcula sobre
+# las primeras TABLA_MUESTRA_ANCHOS filas.
+TABLA_MAX_CARACTERES = int(os.getenv("TABLA_MAX_CARACTERES", "60000"))
+TABLA_MUESTRA_ANCHOS = int(os.getenv("TABLA_MUESTRA_ANCHOS", "200"))
+
+# --- Configuración de los cursores de resultados ---
+# Las herramientas que devuelven listados por páginas (parámetro filas_por_pagina) guardan
+# el resultado completo durante CURSORES_TTL segundos; las páginas siguientes se piden con
+# el cursor devuelto, sin volver a consultar la API. Se conservan hasta CURSORES_MAX resultados.
+CURSORES_TTL = float(os.getenv("CURSORES_TTL", "600"))
+CURSORES_MAX = int(os.getenv("CURSORES_MAX", "32"))
+
+# --- Configuración de las exportaciones ---
+# Filas usadas para calcular el ancho de las columnas de los archivos Excel exportados
+# (las filas se escriben en modo streaming, sin guardar el libro completo en memoria).
+EXPORTACION_MUESTRA_ANCHOS = int(os.getenv("EXPORTACION_MUESTRA_ANCHOS", "1000"))
+# Exportaciones en segundo plano: hilos que escriben los archivos, trabajos permitidos
+# a la vez (en cola o en curso) y trabajos finalizados que se conservan para consultar.
+EXPORTACION_TRABAJOS_WORKERS = int(os.getenv("EXPORTACION_TRABAJOS_WORKERS", "2"))
+EXPORTACION_TRABAJOS_MAX = int(os.getenv("EXPORTACION_TRABAJOS_MAX", "8"))
+EXPORTACION_TRABAJOS_HISTORIAL = int(os.getenv("EXPORTACION_TRABAJOS_HISTORIAL", "50"))
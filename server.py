@@ -1,21 +1,59 @@
 # server.py
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
 import config
+from utils.api_helpers import close_clients
+from utils.metricas import instrumentar_herramienta
+
+# Cantidad de sesiones que están usando los clientes HTTP compartidos.
+# Con transportes HTTP cada conexión abre su propio ciclo de vida, así que los
+# clientes solo se cierran cuando termina la última sesión activa.
+_sesiones_activas = 0
+
+@asynccontextmanager
+async def ciclo_de_vida(server: FastMCP):
+    """
+    Ciclo de vida del servidor: al finalizar cierra los clientes HTTP compartidos
+    con Dragonfish y libera sus conexiones.
+    """
+    global _sesiones_activas
+    _sesiones_activas += 1
+    try:
+        yield {}
+    finally:
+        _sesiones_activas -= 1
+        if _sesiones_activas == 0:
+            await close_clients()
+
+class FastMCPInstrumentado(FastMCP):
+    """
+    FastMCP que registra métricas de cada herramienta: toda función decorada con
+    @mcp.tool() se envuelve con `instrumentar_herramienta` antes de registrarse.
+    """
+
+    def tool(self, *args, **kwargs):
+        registrar = super().tool(*args, **kwargs)
+        nombre = kwargs.get("name") or (args[0] if args else None)
+
+        def decorador(funcion):
+            return registrar(instrumentar_herramienta(funcion, nombre))
+        return decorador
 
 # 1. Inicialización del servidor FastMCP
 # Se utiliza la configuración desde config.py para mantener este archivo limpio.
-mcp = FastMCP(
+mcp = FastMCPInstrumentado(
     title=config.SERVER_TITLE,
     description=config.SERVER_DESCRIPTION,
     version=config.SERVER_VERSION,
+    lifespan=ciclo_de_vida,
 )
 
 # 2. Registro de herramientas
 # Simplemente importando los módulos de herramientas, las funciones decoradas con @mcp.tool()
 # se registrarán automáticamente en la instancia 'mcp'.
 # Esto hace que agregar nuevos grupos de herramientas sea tan fácil como agregar una nueva línea de importación.
-from app.tools import articulos_tools, colores_tools, talles_tools, consultas_stock_y_precios_tools, tipificaciones_artículos_tools, equivalencias_tools
+from app.tools import articulos_tools, colores_tools, talles_tools, consultas_stock_y_precios_tools, tipificaciones_artículos_tools, equivalencias_tools, diagnostico_tools, snapshots_stock_tools
 from utils import exportar_a_excel_tools
 
 # La lógica para ejecutar el servidor (if __name__ == "__main__":) se ha movido a main.py
-# para seguir las mejores prácticas.
\ No newline at end of file
+# para seguir las mejores prácticas.
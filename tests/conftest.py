@@ -0,0 +1,56 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+# Configuración mínima para importar los módulos sin un archivo .env
+os.environ.setdefault("API_BASE_URL", "https://dragonfish.test/api")
+os.environ.setdefault("ID_CLIENTE", "cliente-pruebas")
+os.environ.setdefault("JW_TOKEN", "token-pruebas")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import api_helpers, resiliencia
+from utils.metricas import metricas
+
+BASE_PRUEBAS = "PRUEBAS"
+
+@pytest.fixture(autouse=True)
+def estado_limpio():
+    """
+    Cada prueba arranca sin clientes HTTP, circuit breakers, consultas en curso ni métricas
+    de las anteriores (los clientes asíncronos quedan atados al event loop que los creó).
+    """
+    api_helpers._clientes.clear()
+    api_helpers._clientes_async.clear()
+    api_helpers._consultas_en_curso.clear()
+    resiliencia._breakers.clear()
+    metricas.reiniciar()
+    yield
+    api_helpers._clientes.clear()
+    api_helpers._clientes_async.clear()
+    api_helpers._consultas_en_curso.clear()
+    resiliencia._breakers.clear()
+
+@pytest.fixture
+def dragonfish():
+    """
+    Reemplaza la API de Dragonfish por un `httpx.MockTransport`. Se usa como
+    `dragonfish(manejador)`, donde el manejador recibe el `httpx.Request` y devuelve
+    un `httpx.Response` (puede ser una corrutina). Devuelve la lista de pedidos recibidos.
+    """
+    def instalar(manejador, base_datos: str = BASE_PRUEBAS) -> list:
+        pedidos = []
+
+        def registrar(request: httpx.Request):
+            pedidos.append(request)
+            return manejador(request)
+
+        encabezados = api_helpers.get_headers_with_db(base_datos)
+        transporte = httpx.MockTransport(registrar)
+        api_helpers._clientes[base_datos] = httpx.Client(transport=transporte, headers=encabezados)
+        api_helpers._clientes_async[base_datos] = httpx.AsyncClient(transport=transporte, headers=encabezados)
+        return pedidos
+
+    return instalar
@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+import pytest
+
+from utils import api_helpers
+from utils.api_helpers import api_get_async
+from conftest import BASE_PRUEBAS
+
+def respuesta_lenta(liberar: asyncio.Event, status: int = 200):
+    """
+    Manejador que responde recién cuando se activa `liberar`.
+    """
+    async def manejador(request: httpx.Request) -> httpx.Response:
+        await liberar.wait()
+        return httpx.Response(status, json={"Resultados": [{"Codigo": "A1"}]})
+    return manejador
+
+async def esperar_pedidos(pedidos: list, cantidad: int) -> None:
+    while len(pedidos) < cantidad:
+        await asyncio.sleep(0)
+
+def test_consultas_identicas_comparten_un_pedido(dragonfish):
+    compartidas = api_helpers.estadisticas_consultas["compartidas"]
+
+    async def consultar():
+        liberar = asyncio.Event()
+        pedidos = dragonfish(respuesta_lenta(liberar))
+        tareas = [asyncio.ensure_future(api_get_async("Articulo", BASE_PRUEBAS, {"limit": 5})) for _ in range(3)]
+        await esperar_pedidos(pedidos, 1)
+        liberar.set()
+        return pedidos, await asyncio.gather(*tareas)
+
+    pedidos, resultados = asyncio.run(consultar())
+
+    assert len(pedidos) == 1
+    assert all(resultado is resultados[0] for resultado in resultados)
+    assert api_helpers.estadisticas_consultas["compartidas"] - compartidas == 2
+
+def test_parametros_distintos_no_se_comparten(dragonfish):
+    async def consultar():
+        liberar = asyncio.Event()
+        pedidos = dragonfish(respuesta_lenta(liberar))
+        tareas = [
+            asyncio.ensure_future(api_get_async("Articulo", BASE_PRUEBAS, {"page": pagina}))
+            for pagina in (1, 2)
+        ]
+        await esperar_pedidos(pedidos, 2)
+        liberar.set()
+        await asyncio.gather(*tareas)
+        return pedidos
+
+    assert len(asyncio.run(consultar())) == 2
+
+def test_cancelar_un_llamador_no_cancela_a_los_demas(dragonfish):
+    async def consultar():
+        liberar = asyncio.Event()
+        pedidos = dragonfish(respuesta_lenta(liberar))
+        primero = asyncio.ensure_future(api_get_async("Articulo", BASE_PRUEBAS))
+        segundo = asyncio.ensure_future(api_get_async("Articulo", BASE_PRUEBAS))
+        await esperar_pedidos(pedidos, 1)
+
+        primero.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await primero
+        return pedidos, await segundo
+
+    pedidos, resultado = asyncio.run(consultar())
+
+    assert len(pedidos) == 1
+    assert resultado == {"Resultados": [{"Codigo": "A1"}]}
+
+def test_si_todos_se_cancelan_la_consulta_termina_y_se_libera(dragonfish):
+    async def consultar():
+        liberar = asyncio.Event()
+        pedidos = dragonfish(respuesta_lenta(liberar))
+        llamador = asyncio.ensure_future(api_get_async("Articulo", BASE_PRUEBAS))
+        await esperar_pedidos(pedidos, 1)
+        en_curso = list(api_helpers._consultas_en_curso.values())
+
+        llamador.cancel()
+        await asyncio.sleep(0)
+        liberar.set()
+        await asyncio.gather(*en_curso)
+        pendientes_al_terminar = dict(api_helpers._consultas_en_curso)
+
+        # Una consulta posterior vuelve a pedir los datos
+        await api_get_async("Articulo", BASE_PRUEBAS)
+        return pedidos, pendientes_al_terminar
+
+    pedidos, pendientes_al_terminar = asyncio.run(consultar())
+
+    assert pendientes_al_terminar == {}
+    assert len(pedidos) == 2
+
+def test_el_error_llega_a_todos_los_llamadores(dragonfish):
+    async def consultar():
+        liberar = asyncio.Event()
+        pedidos = dragonfish(respuesta_lenta(liberar, status=404))
+        tareas = [asyncio.ensure_future(api_get_async("Articulo/X", BASE_PRUEBAS)) for _ in range(2)]
+        await esperar_pedidos(pedidos, 1)
+        liberar.set()
+        return pedidos, await asyncio.gather(*tareas, return_exceptions=True)
+
+    pedidos, resultados = asyncio.run(consultar())
+
+    assert len(pedidos) == 1
+    assert all(isinstance(resultado, httpx.HTTPStatusError) for resultado in resultados)
+    assert api_helpers._consultas_en_curso == {}
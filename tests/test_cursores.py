@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import re
+
+import pytest
+
+from utils.cursores import _codificar_cursor, _decodificar_cursor, paginar_tabla, siguiente_pagina
+from utils.tabla_texto import TablaTexto
+
+def tabla(filas: int, max_caracteres: int | None = None) -> TablaTexto:
+    table = TablaTexto(max_caracteres=max_caracteres)
+    table.field_names = ["Codigo", "Descripcion"]
+    table.add_rows([[f"fila-{i:04d}", "x" * 40] for i in range(filas)])
+    return table
+
+def cursor_de(respuesta: str) -> str | None:
+    coincidencia = re.search(r'cursor="([^"]+)"', respuesta)
+    return coincidencia.group(1) if coincidencia else None
+
+def filas_de(respuesta: str) -> list:
+    return re.findall(r"fila-\d{4}", respuesta)
+
+def leer_todo(primera: str, output_format: str = "table") -> list:
+    """
+    Sigue los cursores desde la primera página y devuelve las páginas leídas.
+    """
+    paginas = [primera]
+    cursor = cursor_de(primera)
+    while cursor:
+        paginas.append(siguiente_pagina(cursor, output_format))
+        cursor = cursor_de(paginas[-1])
+        assert len(paginas) < 100
+    return paginas
+
+def test_recorre_todas_las_filas_por_paginas():
+    paginas = leer_todo(paginar_tabla(tabla(25), 10))
+
+    assert len(paginas) == 3
+    assert [filas for pagina in paginas for filas in filas_de(pagina)] == [f"fila-{i:04d}" for i in range(25)]
+    assert "Filas 21-25 de 25" in paginas[-1]
+    assert "Fin de los resultados" in paginas[-1]
+
+def test_si_el_limite_de_caracteres_corta_la_pagina_se_sigue_desde_la_fila_omitida():
+    # Cada página pide 20 filas pero solo entran unas pocas en 600 caracteres
+    paginas = leer_todo(paginar_tabla(tabla(20, max_caracteres=600), 20))
+
+    leidas = [fila for pagina in paginas for fila in filas_de(pagina)]
+    assert leidas == [f"fila-{i:04d}" for i in range(20)]
+    assert len(paginas) > 2
+    assert all(len(pagina) < 1200 for pagina in paginas)
+
+def test_cursor_en_formato_jsonl():
+    respuesta = paginar_tabla(tabla(3), 2, "jsonl")
+    cursor = json.loads(respuesta.splitlines()[-1])["cursor"]
+
+    siguiente = siguiente_pagina(cursor, "jsonl")
+
+    assert [json.loads(linea)["Codigo"] for linea in siguiente.splitlines()] == ["fila-0002"]
+
+def leer_pagina_csv(respuesta: str, delimitador: str = ",") -> tuple:
+    """
+    Separa la línea del cursor y lee el resto de la página con csv.reader.
+    """
+    preambulo, datos = respuesta.split("\n", 1)
+    assert preambulo.startswith("# cursor=")
+    return preambulo.removeprefix("# cursor=") or None, list(csv.reader(io.StringIO(datos), delimiter=delimitador))
+
+def test_cursor_en_formato_csv():
+    cursor, filas = leer_pagina_csv(paginar_tabla(tabla(3), 2, "csv"))
+
+    assert filas == [["Codigo", "Descripcion"], ["fila-0000", "x" * 40], ["fila-0001", "x" * 40]]
+
+    cursor, filas = leer_pagina_csv(siguiente_pagina(cursor, "csv"))
+
+    assert cursor is None
+    assert filas == [["Codigo", "Descripcion"], ["fila-0002", "x" * 40]]
+
+def test_cursor_en_formato_tsv_no_se_mezcla_con_los_datos():
+    cursor, filas = leer_pagina_csv(paginar_tabla(tabla(5), 4, "tsv"), "\t")
+
+    assert cursor is not None
+    assert all(len(fila) == 2 for fila in filas)
+    assert [fila[0] for fila in filas[1:]] == [f"fila-{i:04d}" for i in range(4)]
+
+@pytest.mark.parametrize("posicion", [-4, 10, 11])
+def test_rechaza_posiciones_fuera_del_resultado(posicion):
+    cursor = cursor_de(paginar_tabla(tabla(10), 4))
+    token, _ = _decodificar_cursor(cursor)
+
+    with pytest.raises(ValueError, match="no válido"):
+        siguiente_pagina(_codificar_cursor(token, posicion))
+
+def test_rechaza_cursores_mal_formados_o_vencidos():
+    with pytest.raises(ValueError, match="no válido"):
+        siguiente_pagina("esto-no-es-un-cursor")
+    with pytest.raises(ValueError, match="venció"):
+        siguiente_pagina(_codificar_cursor("token-inexistente", 0))
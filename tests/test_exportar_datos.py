@@ -0,0 +1,60 @@
+import os
+import re
+import threading
+
+import pandas as pd
+import pytest
+
+from utils.exportacion import PASO_PROGRESO
+from utils.trabajos_exportacion import CANCELADO, GestorExportaciones, TrabajoExportacion
+
+# La herramienta se registra en el servidor MCP al importarse
+try:
+    from utils import exportar_a_excel_tools
+except Exception as e:
+    pytest.skip(f"No se pudo importar el servidor MCP: {e}", allow_module_level=True)
+
+@pytest.fixture
+def gestor(monkeypatch):
+    gestor = GestorExportaciones(workers=1, max_pendientes=2, historial=5)
+    monkeypatch.setattr(exportar_a_excel_tools, "gestor_exportaciones", gestor)
+    return gestor
+
+@pytest.mark.parametrize("formato", ["xlsx", "csv"])
+def test_cancelar_export_data_en_segundo_plano_elimina_el_archivo(gestor, tmp_path, monkeypatch, formato):
+    empezo, continuar = threading.Event(), threading.Event()
+    avanzar = TrabajoExportacion.avanzar
+
+    def avanzar_con_pausa(trabajo, filas):
+        # Se detiene en el primer avance, con el archivo ya abierto
+        empezo.set()
+        assert continuar.wait(5)
+        avanzar(trabajo, filas)
+
+    monkeypatch.setattr(TrabajoExportacion, "avanzar", avanzar_con_pausa)
+    escritores = []
+    crear_escritor = exportar_a_excel_tools.crear_escritor
+    monkeypatch.setattr(
+        exportar_a_excel_tools, "crear_escritor",
+        lambda *args, **kwargs: escritores.append(crear_escritor(*args, **kwargs)) or escritores[-1]
+    )
+    datos = pd.DataFrame({"N": range(5 * PASO_PROGRESO), "Texto": "x"})
+
+    mensaje = exportar_a_excel_tools.ExcelExporterTool.export_data(
+        datos, str(tmp_path / "datos.xlsx"), downloads_folder=False, en_segundo_plano=True, formato=formato
+    )
+    trabajo = gestor.obtener(re.search(r'id_trabajo="([^"]+)"', mensaje).group(1))
+
+    assert empezo.wait(5)
+    assert trabajo.cancelar()
+    continuar.set()
+    trabajo._futuro.result(5)
+
+    assert trabajo.estado == CANCELADO
+    assert trabajo.ruta.endswith(f".{formato}")
+    assert os.listdir(tmp_path) == []
+    # El escritor se cerró: sin archivo abierto (CSV) ni hojas temporales pendientes (Excel)
+    if formato == "csv":
+        assert escritores[0]._archivo is None
+    else:
+        assert escritores[0]._guardado
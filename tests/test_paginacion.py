@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+
+from utils.paginacion import PaginadorDragonfish
+from conftest import BASE_PRUEBAS
+
+def listado(total: int, informar_total: bool = True):
+    """
+    Manejador que simula un listado paginado de `total` registros.
+    """
+    def manejador(request: httpx.Request) -> httpx.Response:
+        limite = int(request.url.params["limit"])
+        pagina = int(request.url.params["page"])
+        desde = (pagina - 1) * limite
+        cuerpo = {"Resultados": [{"Codigo": f"A{i}"} for i in range(desde, min(desde + limite, total))]}
+        if informar_total:
+            cuerpo["TotalRegistros"] = total
+        return httpx.Response(200, json=cuerpo)
+    return manejador
+
+def paginas_pedidas(pedidos: list) -> list:
+    return [int(pedido.url.params["page"]) for pedido in pedidos]
+
+def test_termina_con_una_pagina_incompleta(dragonfish):
+    pedidos = dragonfish(listado(25, informar_total=False))
+    paginador = PaginadorDragonfish("Articulo", BASE_PRUEBAS, tamano_pagina=10)
+
+    registros = asyncio.run(paginador.listar())
+
+    assert [r["Codigo"] for r in registros] == [f"A{i}" for i in range(25)]
+    assert paginas_pedidas(pedidos) == [1, 2, 3]
+    assert paginador.total_registros is None
+
+def test_termina_al_alcanzar_total_registros(dragonfish):
+    # Las páginas vienen completas: sin TotalRegistros se pediría una cuarta página vacía
+    pedidos = dragonfish(listado(30))
+    paginador = PaginadorDragonfish("Articulo", BASE_PRUEBAS, tamano_pagina=10)
+
+    registros = asyncio.run(paginador.listar())
+
+    assert len(registros) == 30
+    assert paginas_pedidas(pedidos) == [1, 2, 3]
+    assert paginador.total_registros == 30
+
+def test_termina_al_alcanzar_el_maximo(dragonfish):
+    pedidos = dragonfish(listado(100))
+    paginador = PaginadorDragonfish("Articulo", BASE_PRUEBAS, tamano_pagina=10, maximo=15)
+
+    registros = asyncio.run(paginador.listar())
+
+    assert [r["Codigo"] for r in registros] == [f"A{i}" for i in range(15)]
+    assert paginas_pedidas(pedidos) == [1, 2]
+    assert paginador.total_registros == 100
+
+def test_maximo_menor_que_la_pagina_reduce_el_limit(dragonfish):
+    pedidos = dragonfish(listado(100))
+
+    registros = asyncio.run(PaginadorDragonfish("Articulo", BASE_PRUEBAS, tamano_pagina=500, maximo=7).listar())
+
+    assert len(registros) == 7
+    assert [pedido.url.params["limit"] for pedido in pedidos] == ["7"]
+
+def test_filtros_se_envian_en_cada_pagina(dragonfish):
+    pedidos = dragonfish(listado(12))
+
+    asyncio.run(PaginadorDragonfish("Articulo", BASE_PRUEBAS, {"query": "remera"}, tamano_pagina=5).listar())
+
+    assert paginas_pedidas(pedidos) == [1, 2, 3]
+    assert all(pedido.url.params["query"] == "remera" for pedido in pedidos)
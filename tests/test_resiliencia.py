@@ -0,0 +1,236 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from utils import api_helpers, resiliencia
+from utils.api_helpers import api_get, api_get_async
+from utils.resiliencia import (
+    ABIERTO,
+    CERRADO,
+    SEMIABIERTO,
+    CircuitBreaker,
+    CircuitoAbiertoError,
+    calcular_espera,
+)
+from conftest import BASE_PRUEBAS
+
+class Reloj:
+    """
+    Reemplazo de time.monotonic que avanza solo cuando la prueba lo indica.
+    """
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(resiliencia.time, "monotonic", reloj)
+    return reloj
+
+@pytest.fixture
+def sin_esperas(monkeypatch):
+    """
+    Evita las esperas reales entre reintentos y devuelve las esperas pedidas.
+    """
+    esperas = []
+    monkeypatch.setattr(api_helpers.time, "sleep", esperas.append)
+    return esperas
+
+def instalar_breaker(umbral_fallos: int = 2, tiempo_apertura: float = 30) -> CircuitBreaker:
+    breaker = CircuitBreaker(umbral_fallos=umbral_fallos, tiempo_apertura=tiempo_apertura)
+    resiliencia._breakers[BASE_PRUEBAS] = breaker
+    return breaker
+
+def respuestas(*sucesivas: httpx.Response):
+    """
+    Manejador que devuelve las respuestas indicadas en orden (la última se repite).
+    """
+    pendientes = list(sucesivas)
+
+    def manejador(request: httpx.Request) -> httpx.Response:
+        return pendientes.pop(0) if len(pendientes) > 1 else pendientes[0]
+    return manejador
+
+def test_breaker_se_abre_tras_el_umbral_de_fallos(reloj):
+    breaker = CircuitBreaker(umbral_fallos=3, tiempo_apertura=30)
+
+    for _ in range(2):
+        breaker.verificar()
+        breaker.registrar_fallo()
+    assert breaker.estado == CERRADO
+
+    breaker.verificar()
+    breaker.registrar_fallo()
+    assert breaker.estado == ABIERTO
+    assert breaker.aperturas == 1
+
+    with pytest.raises(CircuitoAbiertoError):
+        breaker.verificar()
+    assert breaker.rechazos == 1
+
+def test_un_exito_reinicia_los_fallos_consecutivos(reloj):
+    breaker = CircuitBreaker(umbral_fallos=2, tiempo_apertura=30)
+
+    breaker.registrar_fallo()
+    breaker.registrar_exito()
+    breaker.registrar_fallo()
+
+    assert breaker.estado == CERRADO
+    assert breaker.fallos_consecutivos == 1
+
+def test_semiabierto_deja_pasar_una_sola_prueba(reloj):
+    breaker = CircuitBreaker(umbral_fallos=1, tiempo_apertura=30)
+    breaker.registrar_fallo()
+
+    reloj.ahora += 29
+    with pytest.raises(CircuitoAbiertoError):
+        breaker.verificar()
+
+    reloj.ahora += 1
+    breaker.verificar()
+    assert breaker.estado == SEMIABIERTO
+    # Mientras la prueba está en curso el resto de las consultas se rechaza
+    with pytest.raises(CircuitoAbiertoError):
+        breaker.verificar()
+
+def test_prueba_exitosa_cierra_el_circuito(reloj):
+    breaker = CircuitBreaker(umbral_fallos=1, tiempo_apertura=30)
+    breaker.registrar_fallo()
+    reloj.ahora += 30
+
+    breaker.verificar()
+    breaker.registrar_exito()
+
+    assert breaker.estado == CERRADO
+    breaker.verificar()
+    breaker.verificar()
+
+def test_prueba_fallida_vuelve_a_abrir_el_circuito(reloj):
+    breaker = CircuitBreaker(umbral_fallos=3, tiempo_apertura=30)
+    for _ in range(3):
+        breaker.registrar_fallo()
+    reloj.ahora += 30
+
+    breaker.verificar()
+    breaker.registrar_fallo()
+
+    assert breaker.estado == ABIERTO
+    assert breaker.aperturas == 2
+    with pytest.raises(CircuitoAbiertoError):
+        breaker.verificar()
+    # El tiempo de apertura vuelve a contarse desde el último fallo
+    reloj.ahora += 30
+    breaker.verificar()
+    assert breaker.estado == SEMIABIERTO
+
+def test_prueba_colgada_se_reemplaza_al_vencer(reloj):
+    breaker = CircuitBreaker(umbral_fallos=1, tiempo_apertura=30)
+    breaker.registrar_fallo()
+    reloj.ahora += 30
+    breaker.verificar()
+
+    reloj.ahora += 30
+    breaker.verificar()
+
+    assert breaker.estado == SEMIABIERTO
+
+def test_calcular_espera_respeta_retry_after_en_segundos():
+    response = httpx.Response(503, headers={"Retry-After": "2"})
+
+    assert calcular_espera(0, response) == 2
+
+def test_calcular_espera_respeta_retry_after_como_fecha():
+    fecha = datetime.now(timezone.utc) + timedelta(seconds=5)
+    response = httpx.Response(503, headers={"Retry-After": format_datetime(fecha, usegmt=True)})
+
+    assert 3 <= calcular_espera(0, response) <= 5
+
+def test_calcular_espera_limita_retry_after(monkeypatch):
+    monkeypatch.setattr(resiliencia, "HTTP_REINTENTOS_ESPERA_MAX", 10)
+
+    assert calcular_espera(0, httpx.Response(429, headers={"Retry-After": "3600"})) == 10
+    assert calcular_espera(0, httpx.Response(429, headers={"Retry-After": "-5"})) == 0
+
+def test_calcular_espera_sin_retry_after_usa_espera_exponencial(monkeypatch):
+    monkeypatch.setattr(resiliencia, "HTTP_REINTENTOS_ESPERA_BASE", 1)
+    monkeypatch.setattr(resiliencia, "HTTP_REINTENTOS_ESPERA_MAX", 100)
+
+    assert all(0 <= calcular_espera(3) <= 8 for _ in range(50))
+    assert 0 <= calcular_espera(0, httpx.Response(503, headers={"Retry-After": "pronto"})) <= 1
+
+def test_503_se_reintenta_esperando_retry_after(dragonfish, sin_esperas):
+    breaker = instalar_breaker(umbral_fallos=5)
+    pedidos = dragonfish(respuestas(
+        httpx.Response(503, headers={"Retry-After": "2"}),
+        httpx.Response(200, json={"Resultados": []}),
+    ))
+
+    assert api_get("Articulo", BASE_PRUEBAS) == {"Resultados": []}
+    assert len(pedidos) == 2
+    assert sin_esperas == [2]
+    assert breaker.reintentos == 1
+    assert breaker.estado == CERRADO and breaker.fallos_consecutivos == 0
+
+def test_503_agota_los_reintentos(dragonfish, sin_esperas, monkeypatch):
+    monkeypatch.setattr(api_helpers, "quedan_reintentos", lambda intento: intento < 2)
+    instalar_breaker(umbral_fallos=10)
+    pedidos = dragonfish(respuestas(httpx.Response(503, headers={"Retry-After": "0"})))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        api_get("Articulo", BASE_PRUEBAS)
+    assert len(pedidos) == 3
+
+def test_500_no_se_reintenta_pero_cuenta_como_fallo(dragonfish):
+    breaker = instalar_breaker(umbral_fallos=2)
+    pedidos = dragonfish(respuestas(httpx.Response(500)))
+
+    async def consultar():
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await api_get_async("Articulo", BASE_PRUEBAS)
+        # Con el circuito abierto la consulta se rechaza sin llegar a Dragonfish
+        with pytest.raises(CircuitoAbiertoError):
+            await api_get_async("Articulo", BASE_PRUEBAS)
+
+    asyncio.run(consultar())
+
+    assert len(pedidos) == 2
+    assert breaker.estado == ABIERTO
+    assert breaker.reintentos == 0
+
+def test_404_no_cuenta_como_fallo(dragonfish):
+    breaker = instalar_breaker(umbral_fallos=1)
+    dragonfish(respuestas(httpx.Response(404)))
+
+    async def consultar():
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                await api_get_async("Articulo/NOEXISTE", BASE_PRUEBAS)
+
+    asyncio.run(consultar())
+
+    assert breaker.estado == CERRADO
+    assert breaker.fallos == 0
+
+def test_errores_de_conexion_abren_el_circuito(dragonfish, sin_esperas, monkeypatch):
+    monkeypatch.setattr(api_helpers, "quedan_reintentos", lambda intento: intento < 1)
+    breaker = instalar_breaker(umbral_fallos=2)
+
+    def sin_conexion(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("sin conexión", request=request)
+
+    pedidos = dragonfish(sin_conexion)
+
+    with pytest.raises(httpx.ConnectError):
+        api_get("Articulo", BASE_PRUEBAS)
+    with pytest.raises(CircuitoAbiertoError):
+        api_get("Articulo", BASE_PRUEBAS)
+    assert len(pedidos) == 2
+    assert breaker.estado == ABIERTO
@@ -0,0 +1,90 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.resources import snapshots_stock_resources
+from app.resources.snapshots_stock_resources import AlmacenSnapshotsStock, registrar_snapshot
+from app.resources.stock_columnar_resources import TablaStockColumnar
+from utils.metricas import metricas
+
+def tabla(*filas) -> TablaStockColumnar:
+    """
+    Arma una tabla agrupada a partir de tuplas (articulo, color, talle, stock, precios).
+    """
+    return TablaStockColumnar.desde_resultados([
+        {
+            "Articulo": articulo, "ArticuloDescripcion": f"Desc {articulo}", "Color": color, "Talle": talle,
+            "Stock": stock, "Disponible": stock,
+            "Precios": [{"Lista": lista, "Precio": precio} for lista, precio in precios.items()],
+        }
+        for articulo, color, talle, stock, precios in filas
+    ]).agrupar()
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenSnapshotsStock(str(tmp_path / "snapshots.sqlite3"), max_snapshots=3)
+
+def test_diferencias_entre_dos_snapshots(almacen):
+    anterior = almacen.guardar("BASE", tabla(
+        ("A1", "01", "M", 10, {"L1": 100}),
+        ("A2", "01", "M", 5, {"L1": 50, "L2": 60}),
+        ("A3", "01", "M", 2, {}),
+        ("A4", "01", "M", 1, {"L1": 10}),
+    ))
+    actual = almacen.guardar("BASE", tabla(
+        ("A1", "01", "M", 10, {"L1": 120}),  # mismo stock, cambió el precio
+        ("A2", "01", "M", 0, {"L1": 50, "L2": 60}),  # quedó sin stock
+        ("A4", "01", "M", 3, {"L1": 10}),  # aumentó el stock
+        ("A5", "01", "M", 0, {"L1": 30}),  # nueva, sin stock
+    ))  # A3 desapareció
+
+    cambios = almacen.diferencias(anterior, actual)
+
+    movimientos = {fila[0]: (fila[4], fila[5]) for fila in cambios["movimientos"]}
+    assert movimientos == {"A2": (5, 0), "A3": (2, None), "A4": (1, 3), "A5": (None, 0)}
+    # Ordenados por magnitud del cambio
+    assert cambios["movimientos"][0][0] == "A2"
+
+    assert [(fila[0], fila[4]) for fila in cambios["sin_stock"]] == [("A2", 5), ("A5", None)]
+    assert [(fila[0], fila[3], fila[4], fila[5]) for fila in cambios["precios"]] == [("A1", "L1", 100, 120)]
+
+def test_snapshots_iguales_no_tienen_diferencias(almacen):
+    datos = tabla(("A1", "01", "M", 10, {"L1": 100}), ("A2", "02", "L", 0, {}))
+    anterior = almacen.guardar("BASE", datos)
+    actual = almacen.guardar("BASE", datos)
+
+    assert almacen.diferencias(anterior, actual) == {"movimientos": [], "sin_stock": [], "precios": []}
+
+def test_se_conservan_los_ultimos_snapshots_por_base(almacen):
+    ids = [almacen.guardar("BASE", tabla(("A1", "01", "M", stock, {}))) for stock in range(5)]
+    otra = almacen.guardar("OTRA", tabla(("A1", "01", "M", 1, {})))
+
+    assert [snapshot["id"] for snapshot in almacen.listar("BASE")] == ids[:-4:-1]
+    assert [snapshot["id"] for snapshot in almacen.listar("OTRA")] == [otra]
+    # Las filas de los snapshots borrados se eliminan en cascada
+    assert almacen.diferencias(ids[0], ids[-1])["movimientos"] == [("A1", "01", "M", "Desc A1", None, 4.0)]
+
+def test_registrar_snapshot_no_repite_la_misma_tabla(almacen, monkeypatch):
+    monkeypatch.setattr(snapshots_stock_resources, "obtener_almacen_snapshots", lambda: almacen)
+    datos = tabla(("A1", "01", "M", 10, {}))
+
+    primero = asyncio.run(registrar_snapshot("BASE", datos))
+    segundo = asyncio.run(registrar_snapshot("BASE", datos))
+
+    assert primero == segundo
+    assert len(almacen.listar("BASE")) == 1
+
+def test_registrar_snapshot_informa_los_errores(almacen, monkeypatch):
+    monkeypatch.setattr(snapshots_stock_resources, "obtener_almacen_snapshots", lambda: almacen)
+    almacen._conexion.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        asyncio.run(registrar_snapshot("BASE", tabla(("A1", "01", "M", 10, {}))))
+
+    errores = {
+        dict(etiquetas)["error"]: valor
+        for (nombre, etiquetas), valor in metricas.contadores().items()
+        if nombre == "snapshots_stock_errores_total"
+    }
+    assert errores == {"ProgrammingError": 1}
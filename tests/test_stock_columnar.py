@@ -0,0 +1,83 @@
+from app.resources.stock_columnar_resources import TablaStockColumnar
+
+def agrupar_articulos_anterior(articulos: list) -> dict:
+    """
+    Agrupamiento por registros que usaba consultar_stock_y_precios antes de la tabla
+    columnar: de cada combinación queda el primer registro y el último precio de cada lista.
+    """
+    articulos_agrupados = {}
+    for articulo in articulos:
+        key = (articulo.get("Articulo", ""), articulo.get("Color", ""), articulo.get("Talle", ""))
+        if key not in articulos_agrupados:
+            articulos_agrupados[key] = {"info": articulo, "precios": {}}
+        precios_articulo = articulo.get("Precios", [])
+        if precios_articulo and isinstance(precios_articulo, list):
+            for precio_info in precios_articulo:
+                lista_nombre = precio_info.get("Lista", "")
+                if lista_nombre:
+                    articulos_agrupados[key]["precios"][lista_nombre] = precio_info.get("Precio", 0)
+    return articulos_agrupados
+
+def registro(articulo, color, talle, stock, precios=None, descripcion=None):
+    return {
+        "Articulo": articulo,
+        "ArticuloDescripcion": descripcion or f"Desc {articulo}",
+        "Color": color,
+        "ColorDescripcion": f"Color {color}",
+        "Talle": talle,
+        "TalleDescripcion": f"Talle {talle}",
+        "Stock": stock,
+        "Disponible": stock - 1,
+        "Comprometido": 1,
+        "PendienteEntrega": 0,
+        "Precios": [{"Lista": lista, "Precio": precio} for lista, precio in (precios or {}).items()],
+    }
+
+REGISTROS = [
+    registro("A1", "01", "M", 5, {"MAYORISTA": 100, "MINORISTA": 150}),
+    registro("A2", "02", "L", 3, {"MINORISTA": 80}),
+    # Repetida: se conserva el primer registro y se actualiza el precio MINORISTA
+    registro("A1", "01", "M", 99, {"MINORISTA": 160}, descripcion="Otra descripción"),
+    # Mismo artículo y color, otro talle: es otra combinación
+    registro("A1", "01", "S", 2),
+    # Repetida sin precios: no borra los precios anteriores
+    registro("A2", "02", "L", 7),
+    # Lista vacía y precio cero
+    {**registro("A3", "", "", 0), "Precios": [{"Lista": "", "Precio": 5}, {"Lista": "OUTLET", "Precio": 0}]},
+    # Registro sin array de precios
+    {**registro("A4", "03", "XL", 1), "Precios": None},
+    registro("A2", "02", "L", 1, {"MAYORISTA": 60}),
+]
+
+def test_agrupar_conserva_la_semantica_de_agrupar_articulos():
+    anterior = agrupar_articulos_anterior(REGISTROS)
+    agrupada = TablaStockColumnar.desde_resultados(REGISTROS).agrupar()
+
+    claves = list(zip(agrupada.datos["Articulo"], agrupada.datos["Color"], agrupada.datos["Talle"]))
+    assert claves == list(anterior)
+
+    for fila, (clave, grupo) in enumerate(anterior.items()):
+        info = grupo["info"]
+        assert agrupada.datos.at[fila, "ArticuloDescripcion"] == info["ArticuloDescripcion"]
+        assert agrupada.datos.at[fila, "Stock"] == info["Stock"]
+        assert agrupada.datos.at[fila, "Disponible"] == info["Disponible"]
+        assert agrupada.precios_de_fila(fila) == grupo["precios"], clave
+
+def test_agrupar_deja_las_listas_ordenadas():
+    agrupada = TablaStockColumnar.desde_resultados(REGISTROS).agrupar()
+
+    assert agrupada.listas == ["MAYORISTA", "MINORISTA", "OUTLET"]
+
+def test_agrupar_se_calcula_una_sola_vez():
+    tabla = TablaStockColumnar.desde_resultados(REGISTROS)
+
+    agrupada = tabla.agrupar()
+
+    assert tabla.agrupar() is agrupada
+    assert agrupada.agrupar() is agrupada
+
+def test_agrupar_tabla_vacia():
+    tabla = TablaStockColumnar.desde_resultados([])
+
+    assert len(tabla.agrupar()) == 0
+    assert tabla.agrupar().listas == []
@@ -0,0 +1,169 @@
+import asyncio
+import gc
+import os
+import tempfile
+import threading
+
+import pytest
+
+from utils.exportacion import PASO_PROGRESO, crear_escritor
+from utils.trabajos_exportacion import (
+    CANCELADO,
+    EN_CURSO,
+    ERROR,
+    TERMINADO,
+    ColaExportacionesLlena,
+    GestorExportaciones,
+    ejecutar_en_hilo,
+)
+
+@pytest.fixture
+def gestor():
+    return GestorExportaciones(workers=1, max_pendientes=2, historial=5)
+
+def filas_con_pausa(cantidad: int, pausa_en: int, empezo: threading.Event, continuar: threading.Event):
+    """
+    Genera filas y se detiene en `pausa_en` hasta que la prueba lo habilite.
+    """
+    for i in range(cantidad):
+        if i == pausa_en:
+            empezo.set()
+            assert continuar.wait(5)
+        yield [i, f"fila {i}"]
+
+def exportar_csv(ruta: str, filas, escritores: list):
+    """
+    Devuelve la función de exportación que usan las herramientas, escribiendo en `ruta`.
+    """
+    def exportar(trabajo) -> str:
+        trabajo.ruta = ruta
+        with crear_escritor(ruta, "csv", progreso=trabajo.avanzar) as escritor:
+            escritores.append(escritor)
+            escritor.escribir_hoja("Datos", ["N", "Texto"], filas)
+            escritor.guardar()
+        return "ok"
+    return exportar
+
+def test_exportacion_terminada(gestor, tmp_path):
+    ruta = str(tmp_path / "datos.csv")
+    trabajo = gestor.enviar("csv", exportar_csv(ruta, ([i, "x"] for i in range(2500)), []), total=2500)
+
+    trabajo._futuro.result(5)
+
+    assert trabajo.estado == TERMINADO
+    assert trabajo.resultado == "ok"
+    assert trabajo.filas == 2500
+    with open(ruta, encoding="utf-8") as archivo:
+        assert len(archivo.readlines()) == 2501
+
+def test_cancelar_una_exportacion_en_curso_cierra_y_elimina_el_archivo(gestor, tmp_path):
+    ruta = str(tmp_path / "datos.csv")
+    empezo, continuar = threading.Event(), threading.Event()
+    escritores = []
+    filas = filas_con_pausa(10 * PASO_PROGRESO, 2 * PASO_PROGRESO + 10, empezo, continuar)
+    trabajo = gestor.enviar("csv", exportar_csv(ruta, filas, escritores))
+
+    assert empezo.wait(5)
+    assert trabajo.estado == EN_CURSO and os.path.exists(ruta)
+    assert trabajo.cancelar()
+    continuar.set()
+    trabajo._futuro.result(5)
+
+    assert trabajo.estado == CANCELADO
+    assert trabajo.filas < 10 * PASO_PROGRESO
+    assert not os.path.exists(ruta)
+    assert escritores[0]._archivo is None
+    # Un trabajo finalizado ya no se puede cancelar
+    assert not trabajo.cancelar()
+
+def test_cancelar_una_exportacion_en_cola_no_la_ejecuta(gestor, tmp_path):
+    empezo, continuar = threading.Event(), threading.Event()
+    ocupado = gestor.enviar(
+        "ocupa el único hilo",
+        exportar_csv(str(tmp_path / "a.csv"), filas_con_pausa(10, 5, empezo, continuar), [])
+    )
+    assert empezo.wait(5)
+    ejecutada = threading.Event()
+    en_cola = gestor.enviar("en cola", lambda trabajo: ejecutada.set())
+
+    assert en_cola.cancelar()
+    continuar.set()
+    ocupado._futuro.result(5)
+
+    assert en_cola.estado == CANCELADO
+    assert not ejecutada.is_set()
+
+def test_error_en_la_exportacion_elimina_el_archivo(gestor, tmp_path):
+    ruta = str(tmp_path / "datos.csv")
+
+    def filas_con_error():
+        for i in range(3 * PASO_PROGRESO):
+            yield [i, "x"]
+        raise RuntimeError("se cortó la consulta")
+
+    trabajo = gestor.enviar("csv", exportar_csv(ruta, filas_con_error(), []))
+    trabajo._futuro.result(5)
+
+    assert trabajo.estado == ERROR
+    assert trabajo.error == "se cortó la consulta"
+    assert not os.path.exists(ruta)
+
+def test_limite_de_exportaciones_pendientes(gestor, tmp_path):
+    empezo, continuar = threading.Event(), threading.Event()
+    gestor.enviar("1", exportar_csv(str(tmp_path / "a.csv"), filas_con_pausa(10, 5, empezo, continuar), []))
+    gestor.enviar("2", lambda trabajo: "ok")
+
+    with pytest.raises(ColaExportacionesLlena):
+        gestor.enviar("3", lambda trabajo: "ok")
+    continuar.set()
+
+def test_cancelar_exportacion_asincrona_espera_la_escritura_en_curso(gestor, tmp_path):
+    ruta = str(tmp_path / "stock.csv")
+    empezo, continuar = threading.Event(), threading.Event()
+    escritores = []
+    estado_al_liberar = []
+
+    async def exportar(trabajo) -> str:
+        trabajo.ruta = ruta
+        with crear_escritor(ruta, "csv", progreso=trabajo.avanzar) as escritor:
+            escritores.append(escritor)
+            escritor.abrir_hoja("Stock", ["N", "Texto"])
+            # Como las páginas de la API: cada parte se escribe en un hilo aparte
+            await ejecutar_en_hilo(escritor.agregar_filas, filas_con_pausa(5 * PASO_PROGRESO, 10, empezo, continuar))
+            await ejecutar_en_hilo(escritor.guardar)
+        return "ok"
+
+    async def cancelar_durante_la_escritura():
+        trabajo = gestor.enviar_async("stock", exportar)
+        await asyncio.to_thread(empezo.wait, 5)
+        trabajo.cancelar()
+        await asyncio.sleep(0.05)
+        # El hilo sigue escribiendo: el archivo todavía no se puede cerrar ni eliminar
+        estado_al_liberar.append((trabajo.estado, os.path.exists(ruta)))
+        continuar.set()
+        await asyncio.gather(trabajo._tarea, return_exceptions=True)
+        return trabajo
+
+    trabajo = asyncio.run(cancelar_durante_la_escritura())
+
+    assert estado_al_liberar == [(EN_CURSO, True)]
+    assert trabajo.estado == CANCELADO
+    assert not os.path.exists(ruta)
+    assert escritores[0]._archivo is None
+
+@pytest.mark.filterwarnings("error")
+def test_descartar_un_excel_sin_guardar_libera_los_temporales(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "temporales"))
+    os.makedirs(tempfile.tempdir)
+    ruta = str(tmp_path / "datos.xlsx")
+
+    with pytest.raises(RuntimeError):
+        with crear_escritor(ruta, "xlsx") as escritor:
+            escritor.abrir_hoja("Datos", ["N", "Texto"])
+            escritor.agregar_filas([i, "x"] for i in range(3 * PASO_PROGRESO))
+            raise RuntimeError("se cortó la consulta")
+    del escritor
+    gc.collect()
+
+    assert not os.path.exists(ruta)
+    assert os.listdir(tempfile.tempdir) == []
@@ -1,4 +1,30 @@
-from config import ID_CLIENTE, JW_TOKEN, API_BASE_URL
+import asyncio
+import threading
+import time
+
+import httpx
+
+from config import (
+    ID_CLIENTE,
+    JW_TOKEN,
+    API_BASE_URL,
+    HTTP_MAX_CONEXIONES,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_TIMEOUT,
+)
+from utils.resiliencia import CircuitBreaker, obtener_breaker, es_reintentable, calcular_espera, quedan_reintentos
+from utils.metricas import metricas, etiqueta_endpoint, registrar_consulta_dragonfish
+
+# Clientes HTTP compartidos, uno por base de datos
+_clientes: dict[str, httpx.Client] = {}
+_clientes_async: dict[str, httpx.AsyncClient] = {}
+_clientes_lock = threading.Lock()
+
+# Consultas asíncronas en curso, para que pedidos idénticos simultáneos compartan una sola
+_consultas_en_curso: dict[tuple, asyncio.Task] = {}
+# Cantidad de consultas que se resolvieron reutilizando una consulta idéntica en curso
+estadisticas_consultas = {"compartidas": 0}
 
 def get_headers_with_db(base_datos: str) -> dict:
     """
@@ -10,3 +36,202 @@ def get_headers_with_db(base_datos: str) -> dict:
         "BaseDeDatos": base_datos,
         "IdCliente": ID_CLIENTE,
     }
+
+def _crear_limites() -> httpx.Limits:
+    """
+    Límites del pool de conexiones compartido, tomados de la configuración.
+    """
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONEXIONES,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+def get_client_with_db(base_datos: str) -> httpx.Client:
+    """
+    Devuelve el cliente HTTP compartido para la base de datos indicada.
+    El cliente se crea la primera vez que se usa y mantiene un pool de conexiones
+    persistentes, por lo que las consultas siguientes no repiten el handshake.
+    """
+    cliente = _clientes.get(base_datos)
+    if cliente is None:
+        with _clientes_lock:
+            cliente = _clientes.get(base_datos)
+            if cliente is None:
+                cliente = httpx.Client(
+                    headers=get_headers_with_db(base_datos),
+                    limits=_crear_limites(),
+                    timeout=HTTP_TIMEOUT,
+                )
+                _clientes[base_datos] = cliente
+    return cliente
+
+def get_async_client_with_db(base_datos: str) -> httpx.AsyncClient:
+    """
+    Devuelve el cliente HTTP asíncrono compartido para la base de datos indicada.
+    Es el que usan las herramientas MCP, que se ejecutan en el event loop del servidor.
+    """
+    cliente = _clientes_async.get(base_datos)
+    if cliente is None:
+        with _clientes_lock:
+            cliente = _clientes_async.get(base_datos)
+            if cliente is None:
+                cliente = httpx.AsyncClient(
+                    headers=get_headers_with_db(base_datos),
+                    limits=_crear_limites(),
+                    timeout=HTTP_TIMEOUT,
+                )
+                _clientes_async[base_datos] = cliente
+    return cliente
+
+async def close_clients() -> None:
+    """
+    Cierra todos los clientes HTTP compartidos (sincrónicos y asíncronos) y libera
+    sus conexiones. Si luego se vuelve a consultar la API, los clientes se crean nuevamente.
+    """
+    with _clientes_lock:
+        clientes = list(_clientes.values())
+        clientes_async = list(_clientes_async.values())
+        _clientes.clear()
+        _clientes_async.clear()
+    for cliente in clientes:
+        cliente.close()
+    for cliente in clientes_async:
+        await cliente.aclose()
+
+def _evaluar_intento(
+    endpoint: str,
+    base_datos: str,
+    breaker: CircuitBreaker,
+    intento: int,
+    inicio: float,
+    response: httpx.Response | None = None,
+    error: httpx.TransportError | None = None
+) -> float | None:
+    """
+    Aplica la política de reintentos y circuit breaker al resultado de un intento de GET
+    (la respuesta o el error de conexión). La comparten `api_get` y su versión asíncrona.
+
+    Returns:
+        None si la respuesta es correcta, o los segundos a esperar antes de reintentar
+
+    Raises:
+        httpx.HTTPStatusError: Si la respuesta es un error que no se reintenta (o no quedan reintentos)
+        httpx.TransportError: Si falló la conexión y no quedan reintentos
+    """
+    segundos = time.perf_counter() - inicio
+    if response is None:
+        registrar_consulta_dragonfish(endpoint, base_datos, segundos, "error_conexion")
+        breaker.registrar_fallo()
+        if not quedan_reintentos(intento):
+            raise error
+        breaker.registrar_reintento()
+        return calcular_espera(intento)
+
+    registrar_consulta_dragonfish(endpoint, base_datos, segundos, str(response.status_code), len(response.content))
+    if response.status_code < 500 and not es_reintentable(response):
+        # Un 4xx es un error de la consulta, no una caída de Dragonfish
+        breaker.registrar_exito()
+        response.raise_for_status()
+        return None
+
+    # Cualquier 5xx (se reintente o no) y los 429 cuentan como fallo de Dragonfish
+    breaker.registrar_fallo()
+    if not es_reintentable(response) or not quedan_reintentos(intento):
+        response.raise_for_status()
+    breaker.registrar_reintento()
+    return calcular_espera(intento, response)
+
+def api_get(endpoint: str, base_datos: str, params: dict | None = None) -> dict:
+    """
+    Realiza un GET a un endpoint de Dragonfish usando el cliente compartido.
+    Pensada para código sincrónico que corre fuera del event loop del servidor.
+    Los errores transitorios se reintentan con espera exponencial y, si Dragonfish
+    sigue fallando, el circuit breaker de la base de datos corta las consultas.
+
+    Args:
+        endpoint: Nombre del endpoint (por ejemplo "Articulo" o "ConsultaStockYPrecios")
+        base_datos: Base de datos a consultar
+        params: Parámetros de la consulta (opcional)
+
+    Returns:
+        El cuerpo de la respuesta ya decodificado desde JSON
+    """
+    url = f"{API_BASE_URL}/{endpoint}/"
+    breaker = obtener_breaker(base_datos)
+    intento = 0
+    while True:
+        breaker.verificar()
+        inicio = time.perf_counter()
+        try:
+            response = get_client_with_db(base_datos).get(url, params=params)
+        except httpx.TransportError as e:
+            espera = _evaluar_intento(endpoint, base_datos, breaker, intento, inicio, error=e)
+        else:
+            espera = _evaluar_intento(endpoint, base_datos, breaker, intento, inicio, response=response)
+            if espera is None:
+                return response.json()
+        intento += 1
+        time.sleep(espera)
+
+async def api_get_async(endpoint: str, base_datos: str, params: dict | None = None) -> dict:
+    """
+    Versión asíncrona de `api_get`: realiza el GET con el cliente asíncrono compartido,
+    de modo que varias consultas independientes puedan ejecutarse en paralelo.
+    Aplica la misma política de reintentos y circuit breaker que `api_get`.
+
+    Si ya hay en curso una consulta idéntica (mismo endpoint, parámetros y base de datos),
+    no se hace un nuevo pedido: se espera el resultado de la que está en curso. Por eso el
+    resultado puede ser compartido entre varios llamadores y no debe modificarse.
+
+    Args:
+        endpoint: Nombre del endpoint (por ejemplo "Articulo" o "ConsultaStockYPrecios")
+        base_datos: Base de datos a consultar
+        params: Parámetros de la consulta (opcional)
+
+    Returns:
+        El cuerpo de la respuesta ya decodificado desde JSON
+    """
+    clave = (base_datos, endpoint, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+
+    tarea = _consultas_en_curso.get(clave)
+    if tarea is None:
+        tarea = asyncio.ensure_future(_api_get_async_con_reintentos(endpoint, base_datos, params))
+        _consultas_en_curso[clave] = tarea
+        tarea.add_done_callback(lambda t: _finalizar_consulta(clave, t))
+    else:
+        estadisticas_consultas["compartidas"] += 1
+        metricas.incrementar(
+            "dragonfish_consultas_compartidas_total", endpoint=etiqueta_endpoint(endpoint), base_datos=base_datos
+        )
+
+    # shield: si un llamador se cancela (por ejemplo por timeout) no cancela la consulta de los demás
+    return await asyncio.shield(tarea)
+
+def _finalizar_consulta(clave: tuple, tarea: asyncio.Task) -> None:
+    if _consultas_en_curso.get(clave) is tarea:
+        del _consultas_en_curso[clave]
+    # Marcar el error como leído aunque todos los llamadores se hayan cancelado
+    if not tarea.cancelled():
+        tarea.exception()
+
+async def _api_get_async_con_reintentos(endpoint: str, base_datos: str, params: dict | None = None) -> dict:
+    """
+    Realiza el GET asíncrono aplicando la política de reintentos y circuit breaker.
+    """
+    url = f"{API_BASE_URL}/{endpoint}/"
+    breaker = obtener_breaker(base_datos)
+    intento = 0
+    while True:
+        breaker.verificar()
+        inicio = time.perf_counter()
+        try:
+            response = await get_async_client_with_db(base_datos).get(url, params=params)
+        except httpx.TransportError as e:
+            espera = _evaluar_intento(endpoint, base_datos, breaker, intento, inicio, error=e)
+        else:
+            espera = _evaluar_intento(endpoint, base_datos, breaker, intento, inicio, response=response)
+            if espera is None:
+                return response.json()
+        intento += 1
+        await asyncio.sleep(espera)
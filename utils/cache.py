@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Cachés con nombre, para informar sus aciertos y fallos en las métricas del servidor
+caches_registradas: dict = {}
+
+class TTLCache:
+    """
+    Caché en memoria con tiempo de expiración por entrada, tamaño acotado
+    y desalojo LRU (se descarta la entrada usada hace más tiempo).
+    Es segura para usar desde varios hilos.
+    """
+    
+    def __init__(self, ttl: float, max_entradas: int, nombre: str | None = None):
+        """
+        Args:
+            ttl: Segundos que una entrada permanece válida
+            max_entradas: Cantidad máxima de entradas guardadas
+            nombre: Si se indica, el caché se registra en `caches_registradas`
+        """
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._entradas: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        if nombre is not None:
+            caches_registradas[nombre] = self
+    
+    def get(self, clave: Hashable, default: Any = None) -> Any:
+        """
+        Devuelve el valor guardado para la clave, o `default` si no existe o ya expiró.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                expira, valor = entrada
+                if expira > time.monotonic():
+                    self._entradas.move_to_end(clave)
+                    self.hits += 1
+                    return valor
+                del self._entradas[clave]
+            self.misses += 1
+            return default
+    
+    def set(self, clave: Hashable, valor: Any) -> None:
+        """
+        Guarda un valor, desalojando la entrada menos usada si se supera el máximo.
+        """
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+    
+    def invalidar(self, clave: Hashable | None = None) -> None:
+        """
+        Elimina una entrada, o todas si no se indica clave.
+        """
+        with self._lock:
+            if clave is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(clave, None)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entradas)
@@ -0,0 +1,109 @@
+import base64
+import json
+import secrets
+
+from config import CURSORES_TTL, CURSORES_MAX
+from utils.cache import TTLCache
+from utils.formato_salida import formatear_tabla, verificar_formato_salida
+
+# Resultados completos guardados para seguir leyéndolos por páginas:
+# token -> (tabla, encabezado, pie, filas_por_pagina)
+cache_cursores = TTLCache(ttl=CURSORES_TTL, max_entradas=CURSORES_MAX, nombre="cursores")
+
+def _codificar_cursor(token: str, posicion: int) -> str:
+    """
+    Arma el cursor opaco que identifica el resultado guardado y la fila desde la que seguir.
+    """
+    return base64.urlsafe_b64encode(f"{token}:{posicion}".encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str) -> tuple:
+    """
+    Obtiene el token y la posición de un cursor.
+
+    Raises:
+        ValueError: Si el cursor no tiene el formato esperado
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        token, posicion = base64.urlsafe_b64decode(cursor + relleno).decode().rsplit(":", 1)
+        return token, int(posicion)
+    except Exception:
+        raise ValueError(f"Cursor '{cursor}' no válido")
+
+def paginar_tabla(
+    table,
+    filas_por_pagina: int,
+    output_format: str = "table",
+    encabezado: str = "",
+    pie: str = ""
+) -> str:
+    """
+    Guarda una tabla completa bajo un cursor y devuelve su primera página.
+    Las páginas siguientes se obtienen con `siguiente_pagina` y el cursor informado,
+    sin volver a consultar la API mientras el resultado siga guardado (CURSORES_TTL).
+
+    Args:
+        table: Tabla completa (TablaTexto) con todas las filas del resultado
+        filas_por_pagina: Cantidad de filas de cada página
+        output_format: Formato de salida: "table", "csv", "tsv" o "jsonl"
+        encabezado: Texto que precede a cada página en formato "table"
+        pie: Texto que sigue a cada página en formato "table"
+
+    En "csv" y "tsv" la primera línea de cada página es "# cursor=<cursor>" (vacío en
+    la última página) y el resto son los datos; en "jsonl" el cursor va en un último
+    objeto {"cursor": ...} que se omite en la última página.
+    """
+    verificar_formato_salida(output_format)
+    if filas_por_pagina < 1:
+        raise ValueError("filas_por_pagina debe ser mayor a 0")
+
+    token = secrets.token_urlsafe(12)
+    cache_cursores.set(token, (table, encabezado, pie, filas_por_pagina))
+    return _responder_pagina(token, 0, output_format)
+
+def siguiente_pagina(cursor: str, output_format: str = "table") -> str:
+    """
+    Devuelve la página de un resultado guardado que indica el cursor.
+
+    Raises:
+        ValueError: Si el cursor no es válido o el resultado ya venció
+    """
+    verificar_formato_salida(output_format)
+    token, posicion = _decodificar_cursor(cursor)
+    return _responder_pagina(token, posicion, output_format)
+
+def _responder_pagina(token: str, posicion: int, output_format: str) -> str:
+    entrada = cache_cursores.get(token)
+    if entrada is None:
+        raise ValueError("El cursor venció o no existe; repita la consulta sin cursor")
+    table, encabezado, pie, filas_por_pagina = entrada
+
+    # Los cursores emitidos siempre apuntan a una fila del resultado (o al inicio si está
+    # vacío): cualquier otra posición es un cursor editado o de otro resultado
+    total = len(table)
+    if posicion < 0 or (posicion >= total and posicion != 0):
+        raise ValueError(f"Cursor '{_codificar_cursor(token, posicion)}' no válido")
+    fin = min(posicion + filas_por_pagina, total)
+    contenido = formatear_tabla(table, output_format, inicio=posicion, fin=fin)
+
+    # Si el límite de caracteres cortó la página, se sigue desde la primera fila omitida
+    fin -= getattr(table, "filas_omitidas", 0)
+    cursor = _codificar_cursor(token, fin) if fin < total else None
+
+    # Formatos compactos: solo los datos y el cursor de la página siguiente. En jsonl va
+    # como último objeto; en csv/tsv va siempre en la primera línea (vacío en la última
+    # página) para que el resto se pueda leer directamente como CSV
+    if output_format == "jsonl":
+        return contenido + ("\n" + json.dumps({"cursor": cursor}) if cursor else "")
+    if output_format != "table":
+        return f"# cursor={cursor or ''}\n{contenido}"
+
+    resultado = f"{encabezado}\n\n" if encabezado else ""
+    resultado += f"Filas {posicion + 1 if fin else 0}-{fin} de {total}\n\n{contenido}"
+    if pie:
+        resultado += f"\n\n{pie}"
+    if cursor:
+        resultado += f"\n\n➡️ Para ver las filas siguientes repita la consulta con cursor=\"{cursor}\""
+    else:
+        resultado += "\n\n✅ Fin de los resultados"
+    return resultado
@@ -0,0 +1,615 @@
+import csv
+import gzip
+import importlib.util
+import os
+import re
+import tempfile
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable
+
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+from config import EXPORTACION_MUESTRA_ANCHOS
+
+# Formato de los encabezados de las hojas exportadas
+FUENTE_ENCABEZADO = Font(bold=True, color="FFFFFF")
+RELLENO_ENCABEZADO = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+ALINEACION_ENCABEZADO = Alignment(horizontal="center", vertical="center")
+
+# Ancho máximo de una columna (en caracteres)
+ANCHO_MAXIMO_COLUMNA = 50
+
+# Cada cuántas filas escritas se informa el avance
+PASO_PROGRESO = 1000
+
+# Filas que admite una hoja de Excel (incluido el encabezado)
+MAX_FILAS_EXCEL = 1048576
+
+# Formatos de exportación soportados -> extensión del archivo
+FORMATOS_EXPORTACION = {
+    "xlsx": ".xlsx",
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+# Otras extensiones reconocidas al deducir el formato del nombre del archivo
+EXTENSIONES_ALTERNATIVAS = {".arrow": "feather", ".ipc": "feather"}
+
+# Filas por lote (row group de Parquet / record batch de Feather)
+TAMANO_LOTE_ARROW = 65536
+
+def resolver_formato(nombre_archivo: str, formato: str | None = None) -> str:
+    """
+    Determina el formato de exportación: el indicado en `formato` o, si no se indica,
+    el que corresponde a la extensión del nombre del archivo (por defecto "xlsx").
+
+    Raises:
+        ValueError: Si el formato no está en FORMATOS_EXPORTACION
+    """
+    if formato is not None:
+        formato = formato.lower().lstrip(".")
+        if formato not in FORMATOS_EXPORTACION:
+            raise ValueError(
+                f"Formato de exportación '{formato}' no válido. Opciones: {', '.join(FORMATOS_EXPORTACION)}"
+            )
+        return formato
+
+    nombre = nombre_archivo.lower()
+    # Se prueban primero las extensiones más largas (".csv.gz" antes que ".csv")
+    for extension, formato_extension in sorted(
+        [*((ext, fmt) for fmt, ext in FORMATOS_EXPORTACION.items()), *EXTENSIONES_ALTERNATIVAS.items()],
+        key=lambda item: -len(item[0])
+    ):
+        if nombre.endswith(extension):
+            return formato_extension
+    return "xlsx"
+
+def crear_ruta_exportacion(nombre_archivo: str, extension: str = ".xlsx") -> tuple:
+    """
+    Arma el nombre final (con fecha y hora para evitar conflictos) y la ruta del archivo
+    dentro de la carpeta Descargas del usuario.
+
+    Returns:
+        Tupla (nombre_archivo_final, ruta_completa)
+    """
+    # Asegurar que termine con la extensión pedida (quitando la de otro formato, si la tiene)
+    base_name = nombre_archivo
+    for conocida in sorted([*FORMATOS_EXPORTACION.values(), *EXTENSIONES_ALTERNATIVAS], key=len, reverse=True):
+        if base_name.lower().endswith(conocida):
+            base_name = base_name[:-len(conocida)]
+            break
+
+    # Agregar timestamp para evitar conflictos
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    nombre_archivo_final = f"{base_name}_{timestamp}{extension}"
+
+    downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+    os.makedirs(downloads_path, exist_ok=True)
+    return nombre_archivo_final, os.path.join(downloads_path, nombre_archivo_final)
+
+def _valor_celda(valor):
+    """
+    Adapta un valor para escribirlo en una celda: las listas y diccionarios
+    (por ejemplo, el array "Precios") se escriben como texto y los NaN como celdas vacías.
+    """
+    if isinstance(valor, (list, tuple, dict, set)):
+        return str(valor)
+    # Los NaN (valores faltantes de pandas) quedan como celdas vacías
+    if isinstance(valor, float) and valor != valor:
+        return None
+    return valor
+
+def _columnas_numericas(df: pd.DataFrame, columnas: list | None = None) -> pd.DataFrame:
+    """
+    Selecciona las columnas numéricas de un DataFrame: las indicadas (convertidas a
+    número) o, si no se indican, las detectadas por su tipo de dato.
+    """
+    if columnas:
+        return df[[columna for columna in columnas if columna in df.columns]].apply(pd.to_numeric, errors="coerce")
+    return df.select_dtypes(include="number")
+
+def resumen_numerico(df: pd.DataFrame, columnas: list | None = None) -> tuple:
+    """
+    Calcula, en una sola pasada de `DataFrame.agg`, la cantidad de valores, el total,
+    el promedio, el mínimo y el máximo de cada columna numérica.
+
+    Args:
+        df: Datos exportados
+        columnas: Columnas a resumir (por defecto, las numéricas según su tipo de dato)
+
+    Returns:
+        Tupla (encabezado, filas) con una fila por columna resumida
+    """
+    encabezado = ["Columna", "Registros", "Total", "Promedio", "Mínimo", "Máximo"]
+    numericas = _columnas_numericas(df, columnas)
+    if numericas.columns.empty:
+        return encabezado, []
+
+    resumen = numericas.agg(["count", "sum", "mean", "min", "max"]).T.round(2)
+    filas = [[columna, *valores] for columna, valores in zip(resumen.index, resumen.itertuples(index=False, name=None))]
+    return encabezado, filas
+
+def subtotales_por_grupo(df: pd.DataFrame, agrupar_por: str, columnas: list | None = None) -> tuple:
+    """
+    Calcula los subtotales de las columnas numéricas para cada valor de `agrupar_por`
+    (por ejemplo, el stock por Familia), ordenados por el total de la primera columna.
+    La última fila tiene el total general.
+
+    Args:
+        df: Datos exportados
+        agrupar_por: Columna por la que agrupar
+        columnas: Columnas a sumar (por defecto, las numéricas según su tipo de dato)
+
+    Returns:
+        Tupla (encabezado, filas)
+
+    Raises:
+        ValueError: Si `agrupar_por` no es una columna de los datos
+    """
+    if agrupar_por not in df.columns:
+        raise ValueError(f"La columna '{agrupar_por}' no existe en los datos")
+
+    numericas = _columnas_numericas(df, columnas).drop(columns=[agrupar_por], errors="ignore")
+    grupos = numericas.groupby(df[agrupar_por], sort=False, dropna=False)
+    subtotales = grupos.sum()
+    subtotales.insert(0, "Registros", grupos.size())
+    if len(numericas.columns):
+        subtotales = subtotales.sort_values(numericas.columns[0], ascending=False)
+    subtotales = subtotales.round(2)
+
+    encabezado = [agrupar_por, "Registros", *(f"Total {columna}" for columna in numericas.columns)]
+    filas = [[clave, *valores] for clave, valores in zip(subtotales.index, subtotales.itertuples(index=False, name=None))]
+    filas.append(["Total", len(df), *numericas.sum().round(2).tolist()])
+    return encabezado, filas
+
+class EscritorTabla:
+    """
+    Base de los escritores de exportación. Reciben las filas de cada hoja a medida que
+    llegan (sin guardar el resultado completo en memoria) e informan el avance.
+
+    Uso:
+        escritor = crear_escritor(ruta, formato)
+        escritor.escribir_hoja("Datos", columnas, filas)
+        escritor.guardar()
+
+    Si las filas llegan de a partes (por ejemplo, páginas de la API), la hoja se abre
+    con `abrir_hoja` y cada parte se agrega con `agregar_filas`.
+
+    Usado como context manager, si la escritura se corta con una excepción (un error o
+    una cancelación) los archivos se cierran y se eliminan con `descartar`:
+
+        with crear_escritor(ruta, formato) as escritor:
+            escritor.escribir_hoja("Datos", columnas, filas)
+            escritor.guardar()
+    """
+
+    def __init__(
+        self,
+        ruta: str,
+        muestra_anchos: int = EXPORTACION_MUESTRA_ANCHOS,
+        progreso: Callable[[int], None] | None = None
+    ):
+        """
+        Args:
+            ruta: Ruta del archivo a crear
+            muestra_anchos: Cantidad de filas que se juntan antes de abrir la hoja (en Excel
+                se usan para calcular los anchos de columna)
+            progreso: Función que recibe la cantidad de filas escritas desde el último
+                aviso (cada PASO_PROGRESO filas); si lanza una excepción la escritura se corta
+        """
+        self.ruta = ruta
+        self.muestra_anchos = muestra_anchos
+        self.progreso = progreso
+        # Archivos generados (los formatos de una sola tabla escriben un archivo por hoja)
+        self.rutas = [ruta]
+        self._hojas = 0
+
+    @property
+    def hojas(self) -> int:
+        return self._hojas
+
+    def _abrir(self, nombre_hoja: str, columnas: list, muestra: list) -> None:
+        raise NotImplementedError
+
+    def _agregar_lote(self, filas: list) -> None:
+        raise NotImplementedError
+
+    def _informar(self, filas: int) -> None:
+        if self.progreso is not None and filas:
+            self.progreso(filas)
+
+    def abrir_hoja(self, nombre_hoja: str, columnas: list, muestra: Iterable = ()) -> None:
+        """
+        Crea una hoja nueva con el encabezado y escribe las filas de muestra. Las filas
+        siguientes se agregan con `agregar_filas`, por lo que la hoja puede llenarse a
+        medida que llegan los datos.
+
+        Args:
+            nombre_hoja: Nombre de la hoja
+            columnas: Nombres de las columnas
+            muestra: Primeras filas de la hoja
+        """
+        muestra = [[_valor_celda(valor) for valor in fila] for fila in muestra]
+        self._hojas += 1
+        self._abrir(nombre_hoja, columnas, muestra)
+        self._agregar_lote(muestra)
+        self._informar(len(muestra))
+
+    def agregar_filas(self, filas: Iterable) -> int:
+        """
+        Agrega filas al final de la última hoja abierta con `abrir_hoja`.
+
+        Returns:
+            Cantidad de filas agregadas
+        """
+        filas = iter(filas)
+        agregadas = 0
+        while True:
+            lote = [[_valor_celda(valor) for valor in fila] for fila in islice(filas, PASO_PROGRESO)]
+            if not lote:
+                return agregadas
+            self._agregar_lote(lote)
+            agregadas += len(lote)
+            self._informar(len(lote))
+
+    def escribir_hoja(self, nombre_hoja: str, columnas: list, filas: Iterable) -> int:
+        """
+        Crea una hoja con el encabezado y escribe las filas de a una.
+
+        Args:
+            nombre_hoja: Nombre de la hoja
+            columnas: Nombres de las columnas
+            filas: Iterable de filas (listas de valores en el orden de `columnas`);
+                puede ser un generador, se recorre una sola vez
+
+        Returns:
+            Cantidad de filas escritas
+        """
+        filas = iter(filas)
+        muestra = list(islice(filas, self.muestra_anchos))
+        self.abrir_hoja(nombre_hoja, columnas, muestra)
+        return len(muestra) + self.agregar_filas(filas)
+
+    def escribir_dataframe(self, nombre_hoja: str, df) -> int:
+        """
+        Escribe un DataFrame completo como una hoja. Los formatos que lo permiten lo
+        escriben por columnas, sin recorrerlo fila por fila.
+
+        Returns:
+            Cantidad de filas escritas
+        """
+        return self.escribir_hoja(nombre_hoja, list(df.columns), df.itertuples(index=False, name=None))
+
+    def guardar(self) -> None:
+        """
+        Cierra el archivo y termina de escribirlo.
+        """
+        raise NotImplementedError
+
+    def cerrar(self) -> None:
+        """
+        Cierra los archivos abiertos sin terminar de escribirlos.
+        """
+
+    def descartar(self) -> None:
+        """
+        Cierra los archivos abiertos y elimina los que se llegaron a crear.
+        """
+        self.cerrar()
+        for ruta in self.rutas:
+            if os.path.exists(ruta):
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, error, traza) -> None:
+        if tipo is not None:
+            self.descartar()
+
+class EscritorExcel(EscritorTabla):
+    """
+    Escribe archivos .xlsx en modo "write-only" de openpyxl: cada fila se envía al
+    archivo a medida que llega, sin guardar el libro completo en memoria, por lo que
+    el consumo de memoria no crece con la cantidad de filas.
+
+    Como en ese modo los anchos de columna deben definirse antes de la primera fila,
+    se calculan sobre una muestra acotada (las primeras EXPORTACION_MUESTRA_ANCHOS filas)
+    que se guarda en memoria y luego se escribe junto con el resto.
+
+    Una hoja de Excel admite MAX_FILAS_EXCEL filas: al llegar al límite, las filas
+    siguientes continúan en otra hoja ("Datos (2)", "Datos (3)", ...) con el mismo
+    encabezado y anchos.
+    """
+
+    def __init__(self, ruta: str, *args, max_filas_hoja: int = MAX_FILAS_EXCEL, **kwargs):
+        """
+        Args:
+            ruta: Ruta del archivo .xlsx a crear
+            max_filas_hoja: Filas por hoja (incluido el encabezado) antes de pasar a otra
+        """
+        super().__init__(ruta, *args, **kwargs)
+        self.max_filas_hoja = max_filas_hoja
+        self.libro = openpyxl.Workbook(write_only=True)
+        self._hoja = None
+        self._nombre_hoja = None
+        self._columnas = []
+        self._anchos = []
+        self._filas_hoja = 0
+        self._continuaciones = 0
+        self._guardado = False
+
+    @property
+    def hojas(self) -> int:
+        return len(self.libro.worksheets)
+
+    def _encabezado(self, hoja, columnas: list) -> list:
+        celdas = []
+        for nombre in columnas:
+            celda = WriteOnlyCell(hoja, value=nombre)
+            celda.font = FUENTE_ENCABEZADO
+            celda.fill = RELLENO_ENCABEZADO
+            celda.alignment = ALINEACION_ENCABEZADO
+            celdas.append(celda)
+        return celdas
+
+    def _crear_hoja(self, nombre_hoja: str) -> None:
+        self._hoja = self.libro.create_sheet(nombre_hoja)
+        for columna, ancho in enumerate(self._anchos, 1):
+            self._hoja.column_dimensions[get_column_letter(columna)].width = min(ancho + 2, ANCHO_MAXIMO_COLUMNA)
+        self._hoja.freeze_panes = "A2"
+
+        self._hoja.append(self._encabezado(self._hoja, self._columnas))
+        self._filas_hoja = 1
+
+    def _abrir(self, nombre_hoja: str, columnas: list, muestra: list) -> None:
+        # Anchos a partir del encabezado y la muestra
+        anchos = [len(str(nombre)) for nombre in columnas]
+        for fila in muestra:
+            for columna, valor in enumerate(fila):
+                if valor is not None and len(str(valor)) > anchos[columna]:
+                    anchos[columna] = len(str(valor))
+
+        self._nombre_hoja = nombre_hoja
+        self._columnas = columnas
+        self._anchos = anchos
+        self._continuaciones = 0
+        self._crear_hoja(nombre_hoja)
+
+    def _agregar_lote(self, filas: list) -> None:
+        inicio = 0
+        while inicio < len(filas):
+            # Hoja llena: seguir en una hoja de continuación (los nombres admiten 31 caracteres)
+            if self._filas_hoja >= self.max_filas_hoja:
+                self._continuaciones += 1
+                sufijo = f" ({self._continuaciones + 1})"
+                self._crear_hoja(self._nombre_hoja[:31 - len(sufijo)] + sufijo)
+
+            fin = min(len(filas), inicio + self.max_filas_hoja - self._filas_hoja)
+            for fila in filas[inicio:fin]:
+                self._hoja.append(fila)
+            self._filas_hoja += fin - inicio
+            inicio = fin
+
+    def guardar(self) -> None:
+        """
+        Cierra el libro y termina de escribir el archivo.
+        """
+        self._guardado = True
+        self.libro.save(self.ruta)
+
+    def cerrar(self) -> None:
+        # El archivo se crea recién al guardar, pero el modo write-only va escribiendo
+        # cada hoja en un archivo temporal que solo se libera al guardar el libro: si no
+        # se guardó, se guarda en un directorio temporal que luego se elimina
+        if self._guardado:
+            return
+        self._guardado = True
+        try:
+            with tempfile.TemporaryDirectory() as directorio:
+                self.libro.save(os.path.join(directorio, "descartado.xlsx"))
+        except Exception:
+            pass
+
+class _EscritorArchivoPorHoja(EscritorTabla):
+    """
+    Base de los formatos que guardan una sola tabla por archivo: la primera hoja se
+    escribe en `ruta` y cada hoja adicional en un archivo aparte, con el nombre de la
+    hoja agregado al nombre del archivo (por ejemplo "export_Resumen.csv").
+    """
+
+    def __init__(self, ruta: str, extension: str, *args, **kwargs):
+        super().__init__(ruta, *args, **kwargs)
+        self.rutas = []
+        self.extension = extension
+
+    def _ruta_hoja(self, nombre_hoja: str) -> str:
+        if not self.rutas:
+            ruta = self.ruta
+        else:
+            base = self.ruta[:-len(self.extension)] if self.ruta.endswith(self.extension) else self.ruta
+            sufijo = re.sub(r"[^\w-]+", "_", nombre_hoja)
+            ruta = f"{base}_{sufijo}{self.extension}"
+        self.rutas.append(ruta)
+        return ruta
+
+    def _cerrar_hoja(self) -> None:
+        raise NotImplementedError
+
+    def guardar(self) -> None:
+        """
+        Cierra el archivo de la última hoja.
+        """
+        self._cerrar_hoja()
+
+    def cerrar(self) -> None:
+        self._cerrar_hoja()
+
+class EscritorCSV(_EscritorArchivoPorHoja):
+    """
+    Escribe archivos CSV (UTF-8, separados por comas), opcionalmente comprimidos con gzip.
+    """
+
+    def __init__(self, ruta: str, comprimir: bool = False, *args, **kwargs):
+        super().__init__(ruta, ".csv.gz" if comprimir else ".csv", *args, **kwargs)
+        self.comprimir = comprimir
+        self._archivo = None
+        self._csv = None
+
+    def _abrir(self, nombre_hoja: str, columnas: list, muestra: list) -> None:
+        self._cerrar_hoja()
+        ruta = self._ruta_hoja(nombre_hoja)
+        if self.comprimir:
+            self._archivo = gzip.open(ruta, "wt", encoding="utf-8", newline="")
+        else:
+            self._archivo = open(ruta, "w", encoding="utf-8", newline="")
+        self._csv = csv.writer(self._archivo)
+        self._csv.writerow(columnas)
+
+    def _agregar_lote(self, filas: list) -> None:
+        self._csv.writerows(filas)
+
+    def _cerrar_hoja(self) -> None:
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def escribir_dataframe(self, nombre_hoja: str, df) -> int:
+        # pandas escribe el CSV por bloques de columnas, mucho más rápido que fila por fila
+        self._hojas += 1
+        self._abrir(nombre_hoja, list(df.columns), [])
+        df.to_csv(self._archivo, index=False, header=False)
+        self._informar(len(df))
+        return len(df)
+
+class EscritorArrow(_EscritorArchivoPorHoja):
+    """
+    Escribe archivos Parquet o Feather (Arrow IPC) con pyarrow. Las filas se juntan en
+    lotes de TAMANO_LOTE_ARROW y cada lote se escribe como un row group (Parquet) o un
+    record batch (Feather), por lo que la memoria usada no depende del total de filas.
+
+    Los tipos de las columnas se deducen del primer lote: las columnas sin ningún valor
+    en ese lote se guardan como texto y las enteras como decimales, para que un valor
+    no entero en un lote posterior no rompa el archivo.
+    """
+
+    def __init__(self, ruta: str, formato: str = "parquet", *args, **kwargs):
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ValueError(f"El formato '{formato}' requiere el paquete pyarrow (pip install pyarrow)")
+        super().__init__(ruta, FORMATOS_EXPORTACION[formato], *args, **kwargs)
+        self.formato = formato
+        self._columnas = []
+        self._lote = []
+        self._esquema = None
+        self._escritor = None
+        self._ruta_actual = None
+
+    def _abrir(self, nombre_hoja: str, columnas: list, muestra: list) -> None:
+        self._cerrar_hoja()
+        self._ruta_actual = self._ruta_hoja(nombre_hoja)
+        self._columnas = [str(columna) for columna in columnas]
+        self._lote = []
+        self._esquema = None
+
+    def _agregar_lote(self, filas: list) -> None:
+        self._lote.extend(filas)
+        if len(self._lote) >= TAMANO_LOTE_ARROW:
+            self._volcar()
+
+    def _escribir_tabla(self, tabla, ampliar_enteros: bool = True) -> None:
+        import pyarrow as pa
+
+        if self._esquema is None:
+            # Las columnas vacías en el primer lote no tienen tipo: se guardan como texto
+            campos = []
+            for campo in tabla.schema:
+                if pa.types.is_null(campo.type):
+                    campo = pa.field(campo.name, pa.string())
+                elif ampliar_enteros and pa.types.is_integer(campo.type):
+                    campo = pa.field(campo.name, pa.float64())
+                campos.append(campo)
+            self._esquema = pa.schema(campos)
+            if self.formato == "parquet":
+                import pyarrow.parquet as pq
+                self._escritor = pq.ParquetWriter(self._ruta_actual, self._esquema)
+            else:
+                self._escritor = pa.ipc.new_file(self._ruta_actual, self._esquema)
+        try:
+            tabla = tabla.cast(self._esquema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Los tipos de las columnas cambiaron entre lotes: {e}")
+        self._escritor.write_table(tabla)
+
+    def _volcar(self) -> None:
+        import pyarrow as pa
+
+        if not self._lote and self._escritor is not None:
+            return
+        valores = list(zip(*self._lote)) if self._lote else [() for _ in self._columnas]
+        tabla = pa.table({
+            columna: pa.array(list(columna_valores))
+            for columna, columna_valores in zip(self._columnas, valores)
+        })
+        self._lote = []
+        self._escribir_tabla(tabla)
+
+    def _cerrar_hoja(self) -> None:
+        if self._ruta_actual is None:
+            return
+        self._volcar()
+        self._escritor.close()
+        self._escritor = None
+        self._ruta_actual = None
+
+    def cerrar(self) -> None:
+        # Sin volcar el lote pendiente: el archivo se va a descartar
+        if self._escritor is not None:
+            self._escritor.close()
+        self._escritor = None
+        self._ruta_actual = None
+        self._lote = []
+
+    def escribir_dataframe(self, nombre_hoja: str, df) -> int:
+        import pyarrow as pa
+
+        # Conversión por columnas; si alguna columna mezcla tipos se escribe fila por fila
+        try:
+            tabla = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return super().escribir_dataframe(nombre_hoja, df)
+        self._hojas += 1
+        self._abrir(nombre_hoja, list(df.columns), [])
+        for lote in tabla.to_batches(max_chunksize=TAMANO_LOTE_ARROW):
+            self._escribir_tabla(pa.Table.from_batches([lote], schema=tabla.schema), ampliar_enteros=False)
+            self._informar(lote.num_rows)
+        return len(df)
+
+def crear_escritor(
+    ruta: str,
+    formato: str = "xlsx",
+    progreso: Callable[[int], None] | None = None
+) -> EscritorTabla:
+    """
+    Crea el escritor que corresponde al formato de exportación.
+
+    Args:
+        ruta: Ruta del archivo a crear
+        formato: Uno de FORMATOS_EXPORTACION (ver `resolver_formato`)
+        progreso: Función que recibe el avance (ver EscritorTabla)
+    """
+    if formato == "xlsx":
+        return EscritorExcel(ruta, progreso=progreso)
+    if formato in ("csv", "csv.gz"):
+        return EscritorCSV(ruta, comprimir=formato == "csv.gz", progreso=progreso)
+    if formato in ("parquet", "feather"):
+        return EscritorArrow(ruta, formato, progreso=progreso)
+    raise ValueError(f"Formato de exportación '{formato}' no válido. Opciones: {', '.join(FORMATOS_EXPORTACION)}")
@@ -1,10 +1,87 @@
 import pandas as pd
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
 from datetime import datetime
 import os
 from typing import List, Dict, Union
 from server import mcp
+from prettytable import PrettyTable
+from utils.exportacion import (
+    FORMATOS_EXPORTACION,
+    crear_escritor,
+    crear_ruta_exportacion,
+    resolver_formato,
+    resumen_numerico,
+    subtotales_por_grupo
+)
+from utils.trabajos_exportacion import TrabajoExportacion, gestor_exportaciones, mensaje_trabajo_enviado
+
+def _escribir_excel_datos(
+    data: List[Dict],
+    nombre_archivo: str,
+    nombre_hoja: str,
+    incluir_resumen: bool,
+    columnas_numericas: List[str] | None,
+    formato: str = "xlsx",
+    agrupar_por: str | None = None,
+    trabajo: TrabajoExportacion | None = None
+) -> str:
+    """
+    Escribe el archivo de `exportar_datos_a_excel` en el formato pedido y arma el mensaje
+    de éxito. Si se indica un trabajo, se le informa la ruta y el avance (filas escritas).
+    """
+    # Preservar el orden de las columnas del primer diccionario
+    column_order = list(data[0].keys())
+    
+    # Crear ruta de descarga (con timestamp para evitar conflictos)
+    nombre_archivo_final, ruta_completa = crear_ruta_exportacion(nombre_archivo, FORMATOS_EXPORTACION[formato])
+    if trabajo is not None:
+        trabajo.ruta = ruta_completa
+    
+    # === HOJA PRINCIPAL: DATOS ===
+    # Las filas se escriben directo desde los diccionarios, sin armar un DataFrame.
+    # Si la escritura falla o se cancela, el escritor cierra y elimina el archivo.
+    with crear_escritor(ruta_completa, formato, progreso=trabajo.avanzar if trabajo else None) as escritor:
+        total_registros = escritor.escribir_hoja(
+            nombre_hoja,
+            column_order,
+            ([item.get(col) for col in column_order] for item in data)
+        )
+        
+        # === HOJAS DE RESUMEN Y SUBTOTALES (si se solicitan) ===
+        if incluir_resumen or agrupar_por:
+            # El avance informado cuenta solo las filas de datos
+            escritor.progreso = None
+            df = pd.DataFrame.from_records(data, columns=column_order)
+            
+            if incluir_resumen:
+                # Totales, promedios, mínimos y máximos de todas las columnas numéricas a la vez
+                encabezado, filas_resumen = resumen_numerico(df, columnas_numericas)
+                if filas_resumen:
+                    escritor.escribir_hoja("Resumen", encabezado, filas_resumen)
+            
+            if agrupar_por:
+                encabezado, filas_subtotales = subtotales_por_grupo(df, agrupar_por, columnas_numericas)
+                escritor.escribir_hoja(f"Por {agrupar_por}"[:31], encabezado, filas_subtotales)
+        
+        # Guardar el archivo
+        escritor.guardar()
+    
+    # Crear mensaje de éxito
+    resultado = f"✅ **EXPORTACIÓN EXITOSA A {'EXCEL' if formato == 'xlsx' else formato.upper()}**\n\n"
+    resultado += f"📄 **Archivo generado:** {nombre_archivo_final}\n"
+    resultado += f"📂 **Ubicación:** {ruta_completa}\n\n"
+    resultado += f"📊 **Contenido exportado:**\n"
+    resultado += f"• Registros totales: {total_registros}\n"
+    resultado += f"• Columnas: {len(column_order)}\n"
+    resultado += f"• Hojas: {escritor.hojas}\n"
+    for ruta_hoja in escritor.rutas[1:]:
+        resultado += f"• Archivo adicional: {ruta_hoja}\n"
+    resultado += f"• Fecha de exportación: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    if formato == "xlsx":
+        resultado += "💡 **El archivo se guardó en la carpeta Descargas con formato profesional.**"
+    else:
+        resultado += "💡 **El archivo se guardó en la carpeta Descargas.**"
+    
+    return resultado
 
 @mcp.tool()
 def exportar_datos_a_excel(
@@ -12,20 +89,32 @@ def exportar_datos_a_excel(
     nombre_archivo: str = "export.xlsx",
     nombre_hoja: str = "Datos",
     incluir_resumen: bool = False,
-    columnas_numericas: List[str] | None = None
+    columnas_numericas: List[str] | None = None,
+    en_segundo_plano: bool = False,
+    formato: str | None = None,
+    agrupar_por: str | None = None
 ) -> str:
     """
-    Exporta datos (lista de diccionarios) a un archivo Excel con formato profesional.
+    Exporta datos (lista de diccionarios) a un archivo Excel con formato profesional,
+    o a CSV, CSV comprimido, Parquet o Feather para procesarlos con otras herramientas.
+    Si los datos superan el límite de filas de una hoja de Excel, continúan en hojas adicionales.
     
     Args:
         data: Los datos a exportar como lista de diccionarios
         nombre_archivo: Nombre del archivo Excel a crear
         nombre_hoja: Nombre de la hoja dentro del archivo Excel
-        incluir_resumen: Si incluir una hoja de resumen automático
-        columnas_numericas: Lista de columnas que contienen datos numéricos para formateo
+        incluir_resumen: Si incluir una hoja de resumen automático (total, promedio, mínimo y
+            máximo de cada columna numérica)
+        columnas_numericas: Columnas numéricas a resumir (por defecto se detectan por su tipo)
+        en_segundo_plano: Si True, devuelve de inmediato el id de un trabajo cuyo avance se
+            consulta con consultar_exportacion (recomendado para exportaciones grandes)
+        formato: "xlsx", "csv", "csv.gz", "parquet" o "feather" (por defecto se deduce de
+            la extensión de nombre_archivo, o "xlsx"); en los formatos de una sola tabla
+            la hoja de resumen se guarda en un archivo aparte
+        agrupar_por: Columna por la que calcular subtotales en una hoja aparte (por ejemplo "Familia")
     
     Returns:
-        Mensaje indicando éxito o error de la exportación
+        Mensaje indicando éxito o error de la exportación (o el id del trabajo)
     """
     try:
         if not data or not isinstance(data, list):
@@ -34,120 +123,111 @@ def exportar_datos_a_excel(
         if not all(isinstance(item, dict) for item in data):
             return "Error: Todos los elementos deben ser diccionarios."
         
-        # Preservar el orden de las columnas del primer diccionario
-        if data:
-            # Obtener el orden de las columnas del primer diccionario
-            column_order = list(data[0].keys())
-            # Convertir a DataFrame preservando el orden
-            df = pd.DataFrame(data, columns=column_order)
-        else:
-            df = pd.DataFrame(data)
-            column_order = list(df.columns)
-        
-        if df.empty:
+        if not data[0]:
             return "Error: No hay datos para exportar."
         
-        # Crear ruta de descarga
-        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        if agrupar_por is not None and agrupar_por not in data[0]:
+            return f"Error: La columna '{agrupar_por}' no existe en los datos."
         
-        # Asegurar que termine en .xlsx
-        if not nombre_archivo.endswith('.xlsx'):
-            nombre_archivo += '.xlsx'
+        formato = resolver_formato(nombre_archivo, formato)
         
-        # Agregar timestamp para evitar conflictos
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_name = nombre_archivo.replace('.xlsx', '')
-        nombre_archivo_final = f"{base_name}_{timestamp}.xlsx"
+        if en_segundo_plano:
+            trabajo = gestor_exportaciones.enviar(
+                f"{formato} {nombre_archivo} ({len(data)} registros)",
+                lambda trabajo: _escribir_excel_datos(
+                    data, nombre_archivo, nombre_hoja, incluir_resumen, columnas_numericas, formato,
+                    agrupar_por, trabajo
+                ),
+                total=len(data)
+            )
+            return mensaje_trabajo_enviado(trabajo)
         
-        ruta_completa = os.path.join(downloads_path, nombre_archivo_final)
+        return _escribir_excel_datos(
+            data, nombre_archivo, nombre_hoja, incluir_resumen, columnas_numericas, formato, agrupar_por
+        )
         
-        # Crear el archivo Excel
-        wb = openpyxl.Workbook()
-        
-        # Eliminar la hoja por defecto
-        wb.remove(wb.active)
-        
-        # === HOJA PRINCIPAL: DATOS ===
-        ws_main = wb.create_sheet(nombre_hoja)
-        
-        # Escribir headers en el orden original preservado
-        ws_main.append(column_order)
-        
-        # Aplicar formato a headers
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        for col_num, header in enumerate(column_order, 1):
-            cell = ws_main.cell(row=1, column=col_num)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-        
-        # Escribir datos en el orden correcto
-        for _, row in df.iterrows():
-            # Asegurar que los datos se escriban en el orden correcto
-            row_data = [row[col] for col in column_order]
-            ws_main.append(row_data)
-        
-        # === HOJA DE RESUMEN (si se solicita) ===
-        if incluir_resumen and columnas_numericas:
-            ws_resumen = wb.create_sheet("Resumen")
-            
-            # Headers del resumen
-            resumen_headers = ["Métrica", "Valor"]
-            ws_resumen.append(resumen_headers)
-            
-            # Aplicar formato a headers del resumen
-            for col_num, header in enumerate(resumen_headers, 1):
-                cell = ws_resumen.cell(row=1, column=col_num)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-            
-            # Calcular estadísticas
-            total_registros = len(df)
-            ws_resumen.append(["Total de registros", total_registros])
+    except Exception as e:
+        return f"Error al exportar datos a Excel: {str(e)}"
+
+@mcp.tool()
+def consultar_exportacion(id_trabajo: str | None = None) -> str:
+    """
+    Consulta el estado de las exportaciones en segundo plano: avance (filas escritas),
+    ruta del archivo generado y resultado o error.
+    
+    Args:
+        id_trabajo: Id devuelto al enviar la exportación (si se omite, lista todas)
+    
+    Returns:
+        El detalle del trabajo o una tabla con todos los trabajos
+    """
+    try:
+        if id_trabajo is None:
+            trabajos = gestor_exportaciones.listar()
+            if not trabajos:
+                return "ℹ️ No hay exportaciones en segundo plano."
             
-            for col in columnas_numericas:
-                if col in df.columns:
-                    total = df[col].sum()
-                    promedio = df[col].mean()
-                    ws_resumen.append([f"Total {col}", round(total, 2)])
-                    ws_resumen.append([f"Promedio {col}", round(promedio, 2)])
+            table = PrettyTable()
+            table.field_names = ["Id", "Descripción", "Estado", "Filas", "Segundos", "Archivo"]
+            for trabajo in trabajos:
+                estado = trabajo.resumen()
+                table.add_row([
+                    estado["id"],
+                    estado["descripcion"],
+                    estado["estado"],
+                    _formatear_avance(estado),
+                    estado["segundos"] if estado["segundos"] is not None else "-",
+                    os.path.basename(estado["ruta"]) if estado["ruta"] else "-"
+                ])
+            table.align = "l"
+            return "📦 **Exportaciones en Segundo Plano**\n\n" + table.get_string()
         
-        # Ajustar ancho de columnas para todas las hojas
-        for ws in wb.worksheets:
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Guardar el archivo
-        wb.save(ruta_completa)
-        
-        # Crear mensaje de éxito
-        resultado = "✅ **EXPORTACIÓN EXITOSA A EXCEL**\n\n"
-        resultado += f"📄 **Archivo generado:** {nombre_archivo_final}\n"
-        resultado += f"📂 **Ubicación:** {ruta_completa}\n\n"
-        resultado += f"📊 **Contenido exportado:**\n"
-        resultado += f"• Registros totales: {len(df)}\n"
-        resultado += f"• Columnas: {len(df.columns)}\n"
-        resultado += f"• Hojas: {len(wb.worksheets)}\n"
-        resultado += f"• Fecha de exportación: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-        resultado += "💡 **El archivo se guardó en la carpeta Descargas con formato profesional.**"
+        trabajo = gestor_exportaciones.obtener(id_trabajo)
+        estado = trabajo.resumen()
+        if trabajo.resultado:
+            return trabajo.resultado
         
+        resultado = f"📦 **Exportación {estado['id']}** - {estado['descripcion']}\n\n"
+        resultado += f"• Estado: {estado['estado']}\n"
+        resultado += f"• Filas escritas: {_formatear_avance(estado)}\n"
+        if estado["segundos"] is not None:
+            resultado += f"• Tiempo transcurrido: {estado['segundos']} s\n"
+        if estado["ruta"]:
+            resultado += f"• Archivo: {estado['ruta']}\n"
+        if estado["error"]:
+            resultado += f"\n❌ Error: {estado['error']}"
         return resultado
         
     except Exception as e:
-        return f"Error al exportar datos a Excel: {str(e)}"
+        return f"Error al consultar la exportación: {str(e)}"
+
+@mcp.tool()
+def cancelar_exportacion(id_trabajo: str) -> str:
+    """
+    Cancela una exportación en segundo plano que está en cola o en curso.
+    
+    Args:
+        id_trabajo: Id devuelto al enviar la exportación
+    
+    Returns:
+        Mensaje indicando si se pidió la cancelación
+    """
+    try:
+        trabajo = gestor_exportaciones.obtener(id_trabajo)
+        if not trabajo.cancelar():
+            return f"ℹ️ La exportación {id_trabajo} ya había finalizado ({trabajo.estado})."
+        return f"🛑 Se pidió cancelar la exportación {id_trabajo}; el archivo parcial se descarta."
+        
+    except Exception as e:
+        return f"Error al cancelar la exportación: {str(e)}"
+
+def _formatear_avance(estado: dict) -> str:
+    """
+    Filas escritas, con el total esperado y el porcentaje si se conoce.
+    """
+    if not estado["total"]:
+        return str(estado["filas"])
+    return f"{estado['filas']}/{estado['total']} ({estado['filas'] / estado['total'] * 100:.0f}%)"
 
 class ExcelExporterTool:
     """
@@ -160,19 +240,24 @@ class ExcelExporterTool:
         data: Union[List[Dict], pd.DataFrame], 
         filename: str = "export.xlsx", 
         sheet_name: str = "Sheet1",
-        downloads_folder: bool = True
+        downloads_folder: bool = True,
+        en_segundo_plano: bool = False,
+        formato: str | None = None
     ) -> str:
         """
-        Exporta datos a un archivo Excel.
+        Exporta datos a un archivo Excel (o CSV, CSV comprimido, Parquet o Feather).
 
         Args:
             data: Los datos a exportar, lista de diccionarios o DataFrame
-            filename: Nombre del archivo Excel a crear
+            filename: Nombre del archivo a crear (se le agrega fecha y hora, y la extensión del formato)
             sheet_name: Nombre de la hoja dentro del archivo Excel
             downloads_folder: Si True, guarda en carpeta Descargas del usuario
+            en_segundo_plano: Si True, la exportación se encola y se devuelve el id del trabajo
+            formato: Formato del archivo (ver FORMATOS_EXPORTACION); por defecto se deduce
+                de la extensión de filename
 
         Returns:
-            String indicando éxito o fallo de la exportación
+            String indicando éxito o fallo de la exportación (o el id del trabajo)
         """
         try:
             if isinstance(data, list) and all(isinstance(item, dict) for item in data):
@@ -185,28 +270,29 @@ class ExcelExporterTool:
             if df.empty:
                 return "Error: No hay datos para exportar."
 
-            # Determinar ruta de guardado
-            if downloads_folder:
-                downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-                filepath = os.path.join(downloads_path, filename)
-            else:
-                filepath = filename
+            formato = resolver_formato(filename, formato)
+
+            # Determinar ruta de guardado, con la extensión del formato elegido
+            nombre_final, filepath = crear_ruta_exportacion(filename, FORMATOS_EXPORTACION[formato])
+            if not downloads_folder:
+                filepath = os.path.join(os.path.dirname(filename), nombre_final)
 
-            # Exportar con formato básico
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # Aplicar formato básico
-                workbook = writer.book
-                worksheet = writer.sheets[sheet_name]
-                
-                # Formatear headers
-                for cell in worksheet["1:1"]:
-                    cell.font = Font(bold=True, color="FFFFFF")
-                    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                    cell.alignment = Alignment(horizontal="center")
+            # Exportar con formato básico; CSV, Parquet y Feather se escriben por columnas
+            def exportar(trabajo: TrabajoExportacion | None = None) -> str:
+                if trabajo is not None:
+                    trabajo.ruta = filepath
+                # Si la exportación falla o se cancela, el escritor cierra y elimina el archivo
+                with crear_escritor(filepath, formato, progreso=trabajo.avanzar if trabajo else None) as escritor:
+                    escritor.escribir_dataframe(sheet_name, df)
+                    escritor.guardar()
+                if formato != "xlsx":
+                    return f"Datos exportados exitosamente a {filepath} ({formato})."
+                return f"Datos exportados exitosamente a {filepath} en la hoja '{sheet_name}'."
 
-            return f"Datos exportados exitosamente a {filepath} en la hoja '{sheet_name}'."
+            if en_segundo_plano:
+                trabajo = gestor_exportaciones.enviar(f"{formato} {filename} ({len(df)} registros)", exportar, total=len(df))
+                return mensaje_trabajo_enviado(trabajo)
+            return exportar()
             
         except Exception as e:
             return f"Error exportando datos a Excel: {str(e)}"
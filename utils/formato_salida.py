@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+
+from config import TABLA_MAX_CARACTERES
+
+# Formatos de salida soportados por las herramientas de listado
+FORMATOS_SALIDA = ("table", "csv", "tsv", "jsonl")
+
+def verificar_formato_salida(output_format: str) -> None:
+    """
+    Verifica que el formato de salida pedido sea válido.
+
+    Raises:
+        ValueError: Si el formato no está en FORMATOS_SALIDA
+    """
+    if output_format not in FORMATOS_SALIDA:
+        raise ValueError(
+            f"Formato de salida '{output_format}' no válido. Opciones: {', '.join(FORMATOS_SALIDA)}"
+        )
+
+def formatear_tabla(
+    table,
+    output_format: str,
+    max_caracteres: int | None = TABLA_MAX_CARACTERES,
+    inicio: int = 0,
+    fin: int | None = None
+) -> str:
+    """
+    Convierte las columnas y filas de una tabla (TablaTexto o PrettyTable) a un formato
+    compacto y fácil de procesar: "csv", "tsv" o "jsonl" (un objeto JSON por fila).
+    Con "table" se devuelve la tabla dibujada de siempre.
+
+    La salida se corta al superar `max_caracteres`; en ese caso la última línea indica
+    cuántas filas se omitieron ("# ..." en csv/tsv, {"filas_omitidas": N} en jsonl).
+    `inicio` y `fin` permiten formatear solo una porción de las filas. La cantidad de
+    filas omitidas queda además en `table.filas_omitidas`, como hace TablaTexto.
+    """
+    verificar_formato_salida(output_format)
+    if output_format == "table":
+        return table.get_string(start=inicio, end=fin)
+
+    columnas = list(table.field_names)
+    filas = table.rows[inicio:fin]
+
+    if output_format == "jsonl":
+        def serializar(fila) -> str:
+            return json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=str)
+        encabezado = None
+    else:
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, delimiter="," if output_format == "csv" else "\t", lineterminator="")
+
+        def serializar(fila) -> str:
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerow(fila)
+            return buffer.getvalue()
+        encabezado = serializar(columnas)
+
+    lineas = [encabezado] if encabezado is not None else []
+    usados = sum(len(linea) + 1 for linea in lineas)
+    omitidas = 0
+
+    for indice, fila in enumerate(filas):
+        linea = serializar(fila)
+        if max_caracteres and indice > 0 and usados + len(linea) + 1 > max_caracteres:
+            omitidas = len(filas) - indice
+            break
+        lineas.append(linea)
+        usados += len(linea) + 1
+
+    table.filas_omitidas = omitidas
+    if omitidas:
+        if output_format == "jsonl":
+            lineas.append(json.dumps({"filas_omitidas": omitidas, "total_filas": len(filas)}))
+        else:
+            lineas.append(f"# {omitidas} filas omitidas de {len(filas)} (la salida se limita a {max_caracteres} caracteres)")
+
+    return "\n".join(lineas)
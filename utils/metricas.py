@@ -0,0 +1,364 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+
+from utils.cache import caches_registradas
+
+# Límites (en segundos) de los buckets de los histogramas de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Límites de los buckets del histograma de consultas a Dragonfish por invocación
+BUCKETS_LLAMADAS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+# Consultas a Dragonfish hechas por la invocación de herramienta en curso. Las tareas
+# asyncio y los hilos de asyncio.to_thread heredan el contexto, así que las consultas
+# hechas en paralelo se cuentan en la herramienta que las originó.
+_llamadas_invocacion: contextvars.ContextVar[list | None] = contextvars.ContextVar(
+    "llamadas_invocacion", default=None
+)
+
+class Histograma:
+    """
+    Histograma acumulado con buckets fijos, al estilo de Prometheus.
+    """
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor: float) -> None:
+        self.conteos[bisect.bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+    def acumulados(self) -> list:
+        """
+        Devuelve pares (límite, observaciones <= límite), terminando en "+Inf".
+        """
+        total = 0
+        resultado = []
+        for limite, conteo in zip((*self.buckets, "+Inf"), self.conteos):
+            total += conteo
+            resultado.append((limite, total))
+        return resultado
+
+class RegistroMetricas:
+    """
+    Contadores e histogramas del servidor, identificados por nombre y etiquetas
+    (herramienta, endpoint, base_datos, ...). Es seguro para usar desde varios hilos.
+    """
+
+    def __init__(self):
+        self._contadores: dict = {}
+        self._histogramas: dict = {}
+        self._ayudas: dict = {}
+        self._lock = threading.Lock()
+
+    def describir(self, nombre: str, ayuda: str) -> None:
+        self._ayudas[nombre] = ayuda
+
+    def ayuda(self, nombre: str) -> str | None:
+        return self._ayudas.get(nombre)
+
+    def incrementar(self, nombre: str, valor: float = 1, **etiquetas) -> None:
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre: str, valor: float, buckets: tuple = BUCKETS_LATENCIA, **etiquetas) -> None:
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(buckets)
+            histograma.observar(valor)
+
+    def contadores(self) -> dict:
+        """
+        Copia de los contadores: (nombre, etiquetas) -> valor.
+        """
+        with self._lock:
+            return dict(self._contadores)
+
+    def histogramas(self) -> dict:
+        """
+        Resumen de los histogramas: (nombre, etiquetas) -> (cantidad, suma, acumulados).
+        """
+        with self._lock:
+            return {
+                clave: (histograma.cantidad, histograma.suma, histograma.acumulados())
+                for clave, histograma in self._histogramas.items()
+            }
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+# Registro compartido por todo el servidor
+metricas = RegistroMetricas()
+metricas.describir("mcp_herramienta_duracion_segundos", "Duración de cada invocación de herramienta MCP")
+metricas.describir("mcp_herramienta_invocaciones_total", "Invocaciones de herramientas MCP por resultado (ok, error, excepcion)")
+metricas.describir("mcp_herramienta_consultas_dragonfish", "Consultas HTTP a Dragonfish hechas por cada invocación de herramienta")
+metricas.describir("mcp_herramienta_consultas_dragonfish_total", "Consultas HTTP a Dragonfish hechas por las herramientas")
+metricas.describir("dragonfish_consulta_duracion_segundos", "Duración de cada consulta HTTP a Dragonfish (cada intento)")
+metricas.describir("dragonfish_consultas_total", "Consultas HTTP a Dragonfish por estado (código HTTP o error_conexion)")
+metricas.describir("dragonfish_bytes_recibidos_total", "Bytes recibidos de Dragonfish")
+metricas.describir("dragonfish_consultas_compartidas_total", "Consultas resueltas reutilizando una consulta idéntica en curso")
+metricas.describir("cache_aciertos_total", "Lecturas del caché que encontraron un valor vigente")
+metricas.describir("cache_fallos_total", "Lecturas del caché que no encontraron un valor vigente")
+metricas.describir("snapshots_stock_errores_total", "Snapshots de stock que no se pudieron guardar, por tipo de error")
+
+def etiqueta_endpoint(endpoint: str) -> str:
+    """
+    Etiqueta con la que se registra un endpoint en las métricas. Las consultas puntuales
+    ("Articulo/<codigo>") se agrupan en "Articulo/{codigo}" para que no aparezca una serie
+    nueva por cada código consultado.
+    """
+    recurso, separador, _ = endpoint.partition("/")
+    return f"{recurso}/{{codigo}}" if separador else endpoint
+
+def registrar_consulta_dragonfish(
+    endpoint: str,
+    base_datos: str,
+    segundos: float,
+    estado: str,
+    bytes_recibidos: int = 0
+) -> None:
+    """
+    Registra una consulta HTTP a Dragonfish (cada intento, incluidos los reintentos) y
+    la suma a la invocación de herramienta en curso.
+
+    Args:
+        endpoint: Endpoint consultado
+        base_datos: Base de datos consultada
+        segundos: Duración de la consulta
+        estado: Código HTTP de la respuesta o "error_conexion"
+        bytes_recibidos: Tamaño del cuerpo de la respuesta
+    """
+    endpoint = etiqueta_endpoint(endpoint)
+    metricas.observar("dragonfish_consulta_duracion_segundos", segundos, endpoint=endpoint, base_datos=base_datos)
+    metricas.incrementar("dragonfish_consultas_total", endpoint=endpoint, base_datos=base_datos, estado=estado)
+    if bytes_recibidos:
+        metricas.incrementar("dragonfish_bytes_recibidos_total", bytes_recibidos, endpoint=endpoint, base_datos=base_datos)
+
+    llamadas = _llamadas_invocacion.get()
+    if llamadas is not None:
+        llamadas[0] += 1
+
+def _resultado_herramienta(resultado) -> str:
+    # Las herramientas informan los errores devolviendo un texto que empieza con "Error" o "❌"
+    if isinstance(resultado, str) and resultado.startswith(("Error", "❌")):
+        return "error"
+    return "ok"
+
+def instrumentar_herramienta(funcion, nombre: str | None = None):
+    """
+    Envuelve una herramienta (sincrónica o asíncrona) para registrar su duración, su
+    resultado y cuántas consultas a Dragonfish hizo, etiquetadas por herramienta y
+    base_datos (si la herramienta recibe ese argumento). La firma se conserva, por lo
+    que FastMCP genera el mismo esquema de parámetros.
+    """
+    nombre = nombre or funcion.__name__
+    firma = inspect.signature(funcion)
+
+    def etiquetas(args, kwargs) -> dict:
+        if "base_datos" not in firma.parameters:
+            return {"herramienta": nombre}
+        try:
+            argumentos = firma.bind_partial(*args, **kwargs).arguments
+        except TypeError:
+            argumentos = {}
+        base_datos = argumentos.get("base_datos", firma.parameters["base_datos"].default)
+        if base_datos is inspect.Parameter.empty:
+            base_datos = ""
+        return {"herramienta": nombre, "base_datos": str(base_datos)}
+
+    def registrar(etiquetas_invocacion: dict, inicio: float, llamadas: list, resultado: str) -> None:
+        metricas.observar("mcp_herramienta_duracion_segundos", time.perf_counter() - inicio, **etiquetas_invocacion)
+        metricas.incrementar("mcp_herramienta_invocaciones_total", resultado=resultado, **etiquetas_invocacion)
+        metricas.observar("mcp_herramienta_consultas_dragonfish", llamadas[0], buckets=BUCKETS_LLAMADAS, **etiquetas_invocacion)
+        metricas.incrementar("mcp_herramienta_consultas_dragonfish_total", llamadas[0], **etiquetas_invocacion)
+
+    if inspect.iscoroutinefunction(funcion):
+        @functools.wraps(funcion)
+        async def envoltura(*args, **kwargs):
+            etiquetas_invocacion = etiquetas(args, kwargs)
+            llamadas = [0]
+            token = _llamadas_invocacion.set(llamadas)
+            inicio = time.perf_counter()
+            try:
+                resultado = await funcion(*args, **kwargs)
+            except BaseException:
+                registrar(etiquetas_invocacion, inicio, llamadas, "excepcion")
+                raise
+            finally:
+                _llamadas_invocacion.reset(token)
+            registrar(etiquetas_invocacion, inicio, llamadas, _resultado_herramienta(resultado))
+            return resultado
+    else:
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            etiquetas_invocacion = etiquetas(args, kwargs)
+            llamadas = [0]
+            token = _llamadas_invocacion.set(llamadas)
+            inicio = time.perf_counter()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except BaseException:
+                registrar(etiquetas_invocacion, inicio, llamadas, "excepcion")
+                raise
+            finally:
+                _llamadas_invocacion.reset(token)
+            registrar(etiquetas_invocacion, inicio, llamadas, _resultado_herramienta(resultado))
+            return resultado
+
+    return envoltura
+
+def estado_caches() -> dict:
+    """
+    Aciertos, fallos y tasa de aciertos de cada caché registrado: nombre -> dict.
+    """
+    estados = {}
+    for nombre, cache in caches_registradas.items():
+        lecturas = cache.hits + cache.misses
+        estados[nombre] = {
+            "aciertos": cache.hits,
+            "fallos": cache.misses,
+            "tasa_aciertos": cache.hits / lecturas if lecturas else None,
+            "entradas": len(cache),
+        }
+    return estados
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _formatear_etiquetas(etiquetas) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in etiquetas) + "}"
+
+def _formatear_valor(valor) -> str:
+    return f"{valor:g}" if isinstance(valor, float) else str(valor)
+
+def exportar_prometheus() -> str:
+    """
+    Devuelve todas las métricas en el formato de texto de Prometheus (versión 0.0.4).
+    """
+    lineas = []
+    contadores = metricas.contadores()
+    # Los aciertos y fallos de los cachés se leen de los contadores de cada TTLCache
+    for nombre, estado in estado_caches().items():
+        contadores[("cache_aciertos_total", (("cache", nombre),))] = estado["aciertos"]
+        contadores[("cache_fallos_total", (("cache", nombre),))] = estado["fallos"]
+
+    for tipo, series in (("counter", contadores), ("histogram", metricas.histogramas())):
+        por_nombre: dict = {}
+        for (nombre, etiquetas), valor in sorted(series.items(), key=lambda item: (item[0][0], item[0][1])):
+            por_nombre.setdefault(nombre, []).append((etiquetas, valor))
+
+        for nombre, valores in por_nombre.items():
+            if metricas.ayuda(nombre):
+                lineas.append(f"# HELP {nombre} {metricas.ayuda(nombre)}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in valores:
+                if tipo == "counter":
+                    lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {_formatear_valor(valor)}")
+                    continue
+                cantidad, suma, acumulados = valor
+                for limite, total in acumulados:
+                    etiquetas_bucket = (*etiquetas, ("le", limite if isinstance(limite, str) else f"{limite:g}"))
+                    lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas_bucket)} {total}")
+                lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {suma:g}")
+                lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {cantidad}")
+
+    return "\n".join(lineas) + "\n"
+
+def _percentil(acumulados: list, cantidad: int, fraccion: float):
+    """
+    Límite del primer bucket que alcanza la fracción pedida de las observaciones
+    (una cota superior del percentil), o "+Inf".
+    """
+    objetivo = cantidad * fraccion
+    for limite, total in acumulados:
+        if total >= objetivo:
+            return limite
+    return "+Inf"
+
+def _agrupar_series(nombre_histograma: str, nombres_contadores: tuple, etiquetas_grupo: tuple) -> dict:
+    """
+    Junta, por las etiquetas de grupo, el histograma indicado y la suma de los contadores
+    (separados por su etiqueta "resultado"/"estado" si la tienen).
+    """
+    grupos: dict = {}
+    for (nombre, etiquetas), (cantidad, suma, acumulados) in metricas.histogramas().items():
+        if nombre != nombre_histograma:
+            continue
+        clave = tuple(dict(etiquetas).get(etiqueta, "") for etiqueta in etiquetas_grupo)
+        grupos.setdefault(clave, {})["latencia"] = (cantidad, suma, acumulados)
+    for (nombre, etiquetas), valor in metricas.contadores().items():
+        if nombre not in nombres_contadores:
+            continue
+        etiquetas = dict(etiquetas)
+        clave = tuple(etiquetas.get(etiqueta, "") for etiqueta in etiquetas_grupo)
+        subclave = etiquetas.get("resultado") or etiquetas.get("estado") or ""
+        grupo = grupos.setdefault(clave, {})
+        grupo.setdefault(nombre, {})
+        grupo[nombre][subclave] = grupo[nombre].get(subclave, 0) + valor
+    return grupos
+
+def resumen_herramientas() -> list:
+    """
+    Una fila por herramienta y base de datos con invocaciones, errores, latencia
+    promedio y p95 (cota por bucket) y consultas a Dragonfish por invocación.
+    """
+    filas = []
+    grupos = _agrupar_series(
+        "mcp_herramienta_duracion_segundos",
+        ("mcp_herramienta_invocaciones_total", "mcp_herramienta_consultas_dragonfish_total"),
+        ("herramienta", "base_datos")
+    )
+    for (herramienta, base_datos), grupo in sorted(grupos.items()):
+        cantidad, suma, acumulados = grupo.get("latencia", (0, 0.0, []))
+        invocaciones = grupo.get("mcp_herramienta_invocaciones_total", {})
+        consultas = sum(grupo.get("mcp_herramienta_consultas_dragonfish_total", {}).values())
+        filas.append({
+            "herramienta": herramienta,
+            "base_datos": base_datos,
+            "invocaciones": cantidad,
+            "errores": invocaciones.get("error", 0) + invocaciones.get("excepcion", 0),
+            "latencia_promedio": suma / cantidad if cantidad else 0.0,
+            "latencia_p95": _percentil(acumulados, cantidad, 0.95),
+            "consultas_por_invocacion": consultas / cantidad if cantidad else 0.0,
+        })
+    return filas
+
+def resumen_endpoints() -> list:
+    """
+    Una fila por endpoint y base de datos con consultas HTTP, errores (respuestas que no
+    son 2xx y errores de conexión), latencia promedio y p95 y bytes recibidos.
+    """
+    filas = []
+    grupos = _agrupar_series(
+        "dragonfish_consulta_duracion_segundos",
+        ("dragonfish_consultas_total", "dragonfish_bytes_recibidos_total", "dragonfish_consultas_compartidas_total"),
+        ("endpoint", "base_datos")
+    )
+    for (endpoint, base_datos), grupo in sorted(grupos.items()):
+        cantidad, suma, acumulados = grupo.get("latencia", (0, 0.0, []))
+        estados = grupo.get("dragonfish_consultas_total", {})
+        filas.append({
+            "endpoint": endpoint,
+            "base_datos": base_datos,
+            "consultas": cantidad,
+            "errores": sum(valor for estado, valor in estados.items() if not estado.startswith("2")),
+            "compartidas": sum(grupo.get("dragonfish_consultas_compartidas_total", {}).values()),
+            "latencia_promedio": suma / cantidad if cantidad else 0.0,
+            "latencia_p95": _percentil(acumulados, cantidad, 0.95),
+            "bytes": sum(grupo.get("dragonfish_bytes_recibidos_total", {}).values()),
+        })
+    return filas
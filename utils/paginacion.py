@@ -0,0 +1,105 @@
+import asyncio
+from typing import AsyncIterator
+
+from config import DRAGONFISH_TAMANO_PAGINA
+from utils.api_helpers import api_get_async
+
+class PaginadorDragonfish:
+    """
+    Recorre un listado de Dragonfish página por página usando el sobre
+    `Resultados` / `TotalRegistros` de la API, entregando los registros a medida
+    que llegan en lugar de descargar todo el listado de una sola vez.
+
+    Mientras se procesan los registros de una página, la siguiente ya se está
+    descargando en paralelo (si `prefetch` está activo).
+
+    Ejemplo:
+        paginador = PaginadorDragonfish("Articulo", base_datos, maximo=100)
+        async for articulo in paginador:
+            ...
+        total = paginador.total_registros
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        base_datos: str,
+        params: dict | None = None,
+        tamano_pagina: int = DRAGONFISH_TAMANO_PAGINA,
+        maximo: int | None = None,
+        prefetch: bool = True
+    ):
+        """
+        Args:
+            endpoint: Endpoint a recorrer (por ejemplo "Articulo")
+            base_datos: Base de datos a consultar
+            params: Filtros adicionales de la consulta (sin "limit" ni "page")
+            tamano_pagina: Registros pedidos por página
+            maximo: Cantidad máxima de registros a entregar (None para todos)
+            prefetch: Si True, pide la página siguiente mientras se procesa la actual
+        """
+        self.endpoint = endpoint
+        self.base_datos = base_datos
+        self.params = params or {}
+        self.tamano_pagina = tamano_pagina if maximo is None else max(1, min(tamano_pagina, maximo))
+        self.maximo = maximo
+        self.prefetch = prefetch
+        # Total informado por la API; disponible luego de recibir la primera página
+        self.total_registros: int | None = None
+
+    async def _pedir_pagina(self, pagina: int) -> dict:
+        params = {**self.params, "limit": self.tamano_pagina, "page": pagina}
+        return await api_get_async(self.endpoint, self.base_datos, params)
+
+    async def paginas(self) -> AsyncIterator[list]:
+        """
+        Entrega las páginas de registros (listas) de a una.
+        """
+        pagina = 1
+        entregados = 0
+        pendiente = asyncio.ensure_future(self._pedir_pagina(pagina))
+        try:
+            while pendiente is not None:
+                data = await pendiente
+                pendiente = None
+
+                recibidos = data.get("Resultados", [])
+                if data.get("TotalRegistros") is not None:
+                    self.total_registros = data["TotalRegistros"]
+
+                resultados = recibidos
+                if self.maximo is not None:
+                    resultados = recibidos[:self.maximo - entregados]
+                entregados += len(resultados)
+
+                # Hay más páginas si la actual vino completa y no se alcanzó el total ni el máximo
+                hay_mas = (
+                    len(recibidos) == self.tamano_pagina
+                    and (self.maximo is None or entregados < self.maximo)
+                    and (self.total_registros is None or pagina * self.tamano_pagina < self.total_registros)
+                )
+                if hay_mas:
+                    pagina += 1
+                    if self.prefetch:
+                        pendiente = asyncio.ensure_future(self._pedir_pagina(pagina))
+
+                if resultados:
+                    yield resultados
+
+                if hay_mas and not self.prefetch:
+                    pendiente = asyncio.ensure_future(self._pedir_pagina(pagina))
+        finally:
+            # Si el consumidor corta antes, no dejar descargas en curso
+            if pendiente is not None:
+                pendiente.cancel()
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        async for pagina in self.paginas():
+            for registro in pagina:
+                yield registro
+
+    async def listar(self) -> list:
+        """
+        Descarga todas las páginas y devuelve los registros en una lista.
+        """
+        return [registro async for registro in self]
@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from config import (
+    HTTP_REINTENTOS,
+    HTTP_REINTENTOS_ESPERA_BASE,
+    HTTP_REINTENTOS_ESPERA_MAX,
+    CIRCUITO_UMBRAL_FALLOS,
+    CIRCUITO_TIEMPO_APERTURA,
+)
+
+# Códigos de estado que indican un problema transitorio del servidor
+ESTADOS_REINTENTABLES = {429, 502, 503, 504}
+
+# Estados del circuit breaker
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+class CircuitoAbiertoError(Exception):
+    """
+    Se lanza cuando el circuit breaker de una base de datos está abierto y la
+    consulta se rechaza sin llegar a Dragonfish.
+    """
+
+class CircuitBreaker:
+    """
+    Circuit breaker por base de datos.
+
+    - cerrado: las consultas pasan normalmente.
+    - abierto: tras `umbral_fallos` fallos seguidos, las consultas se rechazan de
+      inmediato durante `tiempo_apertura` segundos.
+    - semiabierto: pasado ese tiempo se deja pasar una única consulta de prueba;
+      si funciona el circuito se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, umbral_fallos: int = CIRCUITO_UMBRAL_FALLOS, tiempo_apertura: float = CIRCUITO_TIEMPO_APERTURA):
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_apertura = tiempo_apertura
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.abierto_desde: float | None = None
+        self._prueba_en_curso = False
+        self._prueba_desde: float | None = None
+        self._lock = threading.Lock()
+        # Contadores expuestos para diagnóstico
+        self.reintentos = 0
+        self.fallos = 0
+        self.aperturas = 0
+        self.rechazos = 0
+
+    def verificar(self) -> None:
+        """
+        Verifica si se puede consultar la API.
+
+        Raises:
+            CircuitoAbiertoError: Si el circuito está abierto
+        """
+        with self._lock:
+            if self.estado == ABIERTO and time.monotonic() - self.abierto_desde >= self.tiempo_apertura:
+                self.estado = SEMIABIERTO
+            # Una sola consulta de prueba a la vez (si la anterior quedó colgada, se permite otra)
+            prueba_vencida = self._prueba_en_curso and time.monotonic() - self._prueba_desde >= self.tiempo_apertura
+            if self.estado == SEMIABIERTO and (not self._prueba_en_curso or prueba_vencida):
+                self._prueba_en_curso = True
+                self._prueba_desde = time.monotonic()
+                return
+            if self.estado != CERRADO:
+                self.rechazos += 1
+                raise CircuitoAbiertoError(
+                    "Dragonfish no está respondiendo; se reintentará automáticamente en unos segundos."
+                )
+
+    def registrar_exito(self) -> None:
+        with self._lock:
+            self.estado = CERRADO
+            self.fallos_consecutivos = 0
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self.fallos += 1
+            self.fallos_consecutivos += 1
+            if self.estado == SEMIABIERTO or self.fallos_consecutivos >= self.umbral_fallos:
+                if self.estado != ABIERTO:
+                    self.aperturas += 1
+                self.estado = ABIERTO
+                self.abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+    def registrar_reintento(self) -> None:
+        with self._lock:
+            self.reintentos += 1
+
+# Circuit breakers por base de datos
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def obtener_breaker(base_datos: str) -> CircuitBreaker:
+    """
+    Devuelve el circuit breaker de la base de datos indicada.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(base_datos)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _breakers[base_datos] = breaker
+        return breaker
+
+def estado_resiliencia() -> dict:
+    """
+    Devuelve el estado y los contadores de reintentos del circuit breaker de cada base de datos.
+    """
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {
+        base_datos: {
+            "estado": breaker.estado,
+            "fallos_consecutivos": breaker.fallos_consecutivos,
+            "fallos": breaker.fallos,
+            "reintentos": breaker.reintentos,
+            "aperturas": breaker.aperturas,
+            "rechazos": breaker.rechazos,
+        }
+        for base_datos, breaker in breakers.items()
+    }
+
+def es_reintentable(response: httpx.Response) -> bool:
+    """
+    Indica si una respuesta corresponde a un error transitorio del servidor.
+    """
+    return response.status_code in ESTADOS_REINTENTABLES
+
+def calcular_espera(intento: int, response: httpx.Response | None = None) -> float:
+    """
+    Calcula cuántos segundos esperar antes del siguiente reintento.
+    Si el servidor envía Retry-After se respeta; si no, se usa espera exponencial
+    con jitter. En ambos casos el resultado se limita a HTTP_REINTENTOS_ESPERA_MAX.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                espera = float(retry_after)
+            except ValueError:
+                try:
+                    fecha = parsedate_to_datetime(retry_after)
+                    espera = (fecha - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    espera = None
+            if espera is not None:
+                return min(max(espera, 0), HTTP_REINTENTOS_ESPERA_MAX)
+
+    espera_maxima = min(HTTP_REINTENTOS_ESPERA_MAX, HTTP_REINTENTOS_ESPERA_BASE * (2 ** intento))
+    return random.uniform(0, espera_maxima)
+
+def quedan_reintentos(intento: int) -> bool:
+    return intento < HTTP_REINTENTOS
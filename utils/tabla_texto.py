@@ -0,0 +1,197 @@
+import textwrap
+from itertools import chain, islice
+from typing import Iterable, Iterator
+
+from config import TABLA_MAX_CARACTERES, TABLA_MUESTRA_ANCHOS
+
+class _AlineacionColumnas(dict):
+    """
+    Diccionario columna -> alineación ("l", "c" o "r").
+    """
+
+class TablaTexto:
+    """
+    Tabla de texto con la misma interfaz que PrettyTable para los usos del proyecto
+    (`field_names`, `add_row`, `add_rows`, `align`, `max_width`, `get_string`), pensada
+    para resultados grandes:
+
+    - El ancho de cada columna se calcula sobre una muestra acotada de filas (las
+      primeras TABLA_MUESTRA_ANCHOS y otras tantas espaciadas a lo largo de la tabla)
+      en lugar de medir todas las celdas. Si una celda fuera de la muestra es más
+      ancha, se parte en varias líneas, igual que con `max_width`.
+    - Las líneas se generan de a una (`iter_lineas`), sin armar la tabla completa en memoria.
+    - `get_string` corta la salida al superar un máximo de caracteres
+      (TABLA_MAX_CARACTERES) e informa cuántas filas quedaron afuera.
+    """
+
+    def __init__(self, max_caracteres: int | None = TABLA_MAX_CARACTERES,
+                 muestra_anchos: int = TABLA_MUESTRA_ANCHOS):
+        """
+        Args:
+            max_caracteres: Máximo de caracteres de `get_string` (None o 0 = sin límite)
+            muestra_anchos: Cantidad de filas usadas para calcular los anchos de columna
+        """
+        self.max_caracteres = max_caracteres
+        self.muestra_anchos = muestra_anchos
+        self.max_width: dict = {}
+        self.filas_omitidas = 0
+        self._field_names: list = []
+        self._align = _AlineacionColumnas()
+        self._filas: list = []
+
+    @property
+    def field_names(self) -> list:
+        return self._field_names
+
+    @field_names.setter
+    def field_names(self, nombres: list) -> None:
+        self._field_names = list(nombres)
+        self._align = _AlineacionColumnas({nombre: self._align.get(nombre, "c") for nombre in self._field_names})
+
+    @property
+    def align(self) -> dict:
+        return self._align
+
+    @align.setter
+    def align(self, alineacion: str) -> None:
+        # Igual que PrettyTable: asignar un texto aplica la alineación a todas las columnas
+        self._align = _AlineacionColumnas({nombre: alineacion for nombre in self._field_names})
+
+    @property
+    def rows(self) -> list:
+        return self._filas
+
+    def add_row(self, fila: list) -> None:
+        if len(fila) != len(self._field_names):
+            raise ValueError(
+                f"La fila tiene {len(fila)} valores pero la tabla tiene {len(self._field_names)} columnas"
+            )
+        self._filas.append(fila)
+
+    def add_rows(self, filas: Iterable[list]) -> None:
+        for fila in filas:
+            self.add_row(fila)
+
+    def __len__(self) -> int:
+        return len(self._filas)
+
+    def _calcular_anchos(self) -> list:
+        """
+        Calcula el ancho de cada columna a partir del encabezado y una muestra de filas,
+        respetando los `max_width` configurados.
+        """
+        anchos = [len(str(nombre)) for nombre in self._field_names]
+
+        # Muestra: las primeras filas (las que seguro se muestran) y filas espaciadas
+        # a lo largo de toda la tabla
+        paso = max(1, len(self._filas) // self.muestra_anchos)
+        muestra = chain(islice(self._filas, self.muestra_anchos), islice(self._filas, 0, None, paso))
+        for fila in muestra:
+            for columna, valor in enumerate(fila):
+                largo = max(len(linea) for linea in str(valor).split("\n"))
+                if largo > anchos[columna]:
+                    anchos[columna] = largo
+
+        for columna, nombre in enumerate(self._field_names):
+            maximo = self.max_width.get(nombre)
+            if maximo:
+                anchos[columna] = min(anchos[columna], maximo)
+        return anchos
+
+    @staticmethod
+    def _partir(texto: str, ancho: int) -> list:
+        """
+        Parte el texto de una celda en líneas de a lo sumo `ancho` caracteres.
+        """
+        lineas = []
+        for linea in texto.split("\n"):
+            if len(linea) <= ancho:
+                lineas.append(linea)
+            else:
+                lineas.extend(textwrap.wrap(linea, ancho) or [""])
+        return lineas
+
+    def _lineas_fila(self, fila: list, anchos: list, alineaciones: list) -> list:
+        """
+        Devuelve las líneas de texto de una fila (más de una si alguna celda se parte).
+        """
+        celdas = [str(valor) for valor in fila]
+
+        # Camino rápido: ninguna celda supera su ancho ni tiene saltos de línea
+        if all(len(celda) <= ancho and "\n" not in celda for celda, ancho in zip(celdas, anchos)):
+            return ["| " + " | ".join(
+                _alinear(celda, ancho, alineacion)
+                for celda, ancho, alineacion in zip(celdas, anchos, alineaciones)
+            ) + " |"]
+
+        partes = [self._partir(celda, ancho) for celda, ancho in zip(celdas, anchos)]
+        alto = max(len(lineas) for lineas in partes)
+        return [
+            "| " + " | ".join(
+                _alinear(lineas[i] if i < len(lineas) else "", ancho, alineacion)
+                for lineas, ancho, alineacion in zip(partes, anchos, alineaciones)
+            ) + " |"
+            for i in range(alto)
+        ]
+
+    def _preparar(self) -> tuple:
+        anchos = self._calcular_anchos()
+        alineaciones = [self._align.get(nombre, "c") for nombre in self._field_names]
+        separador = "+" + "+".join("-" * (ancho + 2) for ancho in anchos) + "+"
+        encabezado = [separador, *self._lineas_fila(self._field_names, anchos, alineaciones), separador]
+        return anchos, alineaciones, separador, encabezado
+
+    def iter_lineas(self) -> Iterator[str]:
+        """
+        Genera la tabla completa línea por línea, sin límite de caracteres.
+        """
+        anchos, alineaciones, separador, encabezado = self._preparar()
+        yield from encabezado
+        for fila in self._filas:
+            yield from self._lineas_fila(fila, anchos, alineaciones)
+        if self._filas:
+            yield separador
+
+    def get_string(self, start: int = 0, end: int | None = None) -> str:
+        """
+        Devuelve la tabla como texto. Si supera `max_caracteres` se cortan las filas
+        restantes y se agrega una línea indicando cuántas se omitieron
+        (disponible también en `filas_omitidas`).
+
+        Args:
+            start: Primera fila a mostrar (como en PrettyTable)
+            end: Fila siguiente a la última a mostrar (None = hasta el final)
+        """
+        anchos, alineaciones, separador, encabezado = self._preparar()
+        filas = self._filas[start:end]
+        lineas = list(encabezado)
+        usados = sum(len(linea) + 1 for linea in lineas) + len(separador)
+        self.filas_omitidas = 0
+
+        for indice, fila in enumerate(filas):
+            lineas_fila = self._lineas_fila(fila, anchos, alineaciones)
+            largo = sum(len(linea) + 1 for linea in lineas_fila)
+            if self.max_caracteres and indice > 0 and usados + largo > self.max_caracteres:
+                self.filas_omitidas = len(filas) - indice
+                break
+            lineas.extend(lineas_fila)
+            usados += largo
+
+        if filas:
+            lineas.append(separador)
+        if self.filas_omitidas:
+            lineas.append(
+                f"... {self.filas_omitidas} filas omitidas de {len(filas)} "
+                f"(la salida se limita a {self.max_caracteres} caracteres)"
+            )
+        return "\n".join(lineas)
+
+    def __str__(self) -> str:
+        return self.get_string()
+
+def _alinear(texto: str, ancho: int, alineacion: str) -> str:
+    if alineacion == "r":
+        return texto.rjust(ancho)
+    if alineacion == "c":
+        return texto.center(ancho)
+    return texto.ljust(ancho)
@@ -0,0 +1,281 @@
+import asyncio
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+from config import EXPORTACION_TRABAJOS_WORKERS, EXPORTACION_TRABAJOS_MAX, EXPORTACION_TRABAJOS_HISTORIAL
+
+# Estados posibles de un trabajo de exportación
+EN_COLA = "en cola"
+EN_CURSO = "en curso"
+TERMINADO = "terminado"
+CANCELADO = "cancelado"
+ERROR = "error"
+
+class ExportacionCancelada(Exception):
+    """
+    Se lanza dentro de una exportación en curso cuando se pidió cancelarla.
+    """
+
+class ColaExportacionesLlena(RuntimeError):
+    """
+    Se lanza al enviar una exportación cuando ya hay EXPORTACION_TRABAJOS_MAX pendientes.
+    """
+
+class TrabajoExportacion:
+    """
+    Estado de una exportación que se ejecuta en segundo plano: avance (filas escritas),
+    ruta del archivo, mensaje final o error. La función que exporta informa el avance
+    con `avanzar`, que además corta la exportación si se pidió cancelarla.
+    """
+
+    def __init__(self, descripcion: str, total: int | None = None):
+        self.id = secrets.token_hex(4)
+        self.descripcion = descripcion
+        self.estado = EN_COLA
+        self.filas = 0
+        # Total de filas esperado, si se conoce (puede completarse durante la exportación)
+        self.total = total
+        self.ruta: str | None = None
+        self.resultado: str | None = None
+        self.error: str | None = None
+        self.creado = time.time()
+        self.iniciado: float | None = None
+        self.finalizado: float | None = None
+        self._cancelar = threading.Event()
+        self._futuro = None
+        self._tarea: asyncio.Task | None = None
+
+    @property
+    def activo(self) -> bool:
+        return self.estado in (EN_COLA, EN_CURSO)
+
+    def avanzar(self, filas: int) -> None:
+        """
+        Suma filas escritas al avance.
+
+        Raises:
+            ExportacionCancelada: Si se pidió cancelar el trabajo
+        """
+        self.filas += filas
+        if self._cancelar.is_set():
+            raise ExportacionCancelada()
+
+    def cancelar(self) -> bool:
+        """
+        Pide cancelar el trabajo. Si todavía estaba en cola no llega a ejecutarse; si
+        está en curso se corta en el próximo avance informado.
+
+        Returns:
+            False si el trabajo ya había finalizado
+        """
+        if not self.activo:
+            return False
+        self._cancelar.set()
+        if self._futuro is not None and self._futuro.cancel():
+            self._finalizar(CANCELADO)
+        if self._tarea is not None:
+            self._tarea.cancel()
+        return True
+
+    def _iniciar(self) -> None:
+        self.estado = EN_CURSO
+        self.iniciado = time.time()
+
+    def _finalizar(self, estado: str, resultado: str | None = None, error: str | None = None) -> None:
+        self.estado = estado
+        self.resultado = resultado
+        self.error = error
+        self.finalizado = time.time()
+        # Un archivo a medio escribir no sirve: se elimina si quedó algo
+        if estado in (CANCELADO, ERROR) and self.ruta and os.path.exists(self.ruta):
+            try:
+                os.remove(self.ruta)
+            except OSError:
+                pass
+
+    def resumen(self) -> dict:
+        """
+        Devuelve el estado del trabajo como diccionario.
+        """
+        fin = self.finalizado or time.time()
+        return {
+            "id": self.id,
+            "descripcion": self.descripcion,
+            "estado": self.estado,
+            "filas": self.filas,
+            "total": self.total,
+            "ruta": self.ruta,
+            "segundos": round(fin - self.iniciado, 1) if self.iniciado else None,
+            "error": self.error,
+        }
+
+class GestorExportaciones:
+    """
+    Ejecuta exportaciones en segundo plano para que la herramienta que las pide
+    responda de inmediato con el id del trabajo.
+
+    - Las exportaciones sincrónicas (escritura de archivos) corren en un pool de
+      `workers` hilos.
+    - Las que descargan datos de Dragonfish son corrutinas y corren como tareas del
+      event loop del servidor (la escritura del archivo la hacen en hilos aparte).
+
+    Como máximo puede haber `max_pendientes` trabajos en cola o en curso; los trabajos
+    finalizados se conservan (hasta `historial`) para poder consultar su resultado.
+    """
+
+    def __init__(self, workers: int, max_pendientes: int, historial: int):
+        """
+        Args:
+            workers: Hilos del pool de exportaciones
+            max_pendientes: Trabajos en cola o en curso permitidos a la vez
+            historial: Trabajos finalizados que se conservan para consultar
+        """
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.historial = historial
+        self._executor: ThreadPoolExecutor | None = None
+        self._trabajos: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _reservar(self, descripcion: str, total: int | None) -> TrabajoExportacion:
+        with self._lock:
+            pendientes = sum(1 for trabajo in self._trabajos.values() if trabajo.activo)
+            if pendientes >= self.max_pendientes:
+                raise ColaExportacionesLlena(
+                    f"Ya hay {pendientes} exportaciones pendientes; espere a que terminen o cancele alguna"
+                )
+            trabajo = TrabajoExportacion(descripcion, total)
+            self._trabajos[trabajo.id] = trabajo
+
+            # Descartar los finalizados más viejos que excedan el historial
+            finalizados = [id_trabajo for id_trabajo, t in self._trabajos.items() if not t.activo]
+            for id_trabajo in finalizados[:max(0, len(finalizados) - self.historial)]:
+                del self._trabajos[id_trabajo]
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="exportacion")
+            return trabajo
+
+    def enviar(
+        self,
+        descripcion: str,
+        funcion: Callable[[TrabajoExportacion], str],
+        total: int | None = None
+    ) -> TrabajoExportacion:
+        """
+        Encola una exportación sincrónica en el pool de hilos.
+
+        Args:
+            descripcion: Texto que identifica la exportación en los listados
+            funcion: Recibe el trabajo (para informar avance y ruta) y devuelve el mensaje final
+            total: Cantidad de filas esperada (opcional)
+
+        Raises:
+            ColaExportacionesLlena: Si ya hay demasiados trabajos pendientes
+        """
+        trabajo = self._reservar(descripcion, total)
+        trabajo._futuro = self._executor.submit(self._ejecutar, trabajo, funcion)
+        return trabajo
+
+    def enviar_async(
+        self,
+        descripcion: str,
+        funcion: Callable[[TrabajoExportacion], Awaitable[str]],
+        total: int | None = None
+    ) -> TrabajoExportacion:
+        """
+        Lanza una exportación asíncrona como tarea del event loop en ejecución.
+
+        Raises:
+            ColaExportacionesLlena: Si ya hay demasiados trabajos pendientes
+        """
+        trabajo = self._reservar(descripcion, total)
+        trabajo._tarea = asyncio.ensure_future(self._ejecutar_async(trabajo, funcion))
+        # Si la tarea se cancela antes de empezar, la corrutina no llega a registrar el estado
+        trabajo._tarea.add_done_callback(lambda _: self._cerrar_cancelado(trabajo))
+        return trabajo
+
+    @staticmethod
+    def _cerrar_cancelado(trabajo: TrabajoExportacion) -> None:
+        if trabajo.activo:
+            trabajo._finalizar(CANCELADO)
+
+    def _ejecutar(self, trabajo: TrabajoExportacion, funcion: Callable) -> None:
+        if trabajo._cancelar.is_set():
+            trabajo._finalizar(CANCELADO)
+            return
+        trabajo._iniciar()
+        try:
+            trabajo._finalizar(TERMINADO, resultado=funcion(trabajo))
+        except ExportacionCancelada:
+            trabajo._finalizar(CANCELADO)
+        except Exception as e:
+            trabajo._finalizar(ERROR, error=str(e))
+
+    async def _ejecutar_async(self, trabajo: TrabajoExportacion, funcion: Callable) -> None:
+        trabajo._iniciar()
+        try:
+            trabajo._finalizar(TERMINADO, resultado=await funcion(trabajo))
+        except (ExportacionCancelada, asyncio.CancelledError):
+            trabajo._finalizar(CANCELADO)
+        except Exception as e:
+            trabajo._finalizar(ERROR, error=str(e))
+
+    def obtener(self, id_trabajo: str) -> TrabajoExportacion:
+        """
+        Devuelve el trabajo con el id indicado.
+
+        Raises:
+            ValueError: Si no existe (o ya se descartó del historial)
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is None:
+            raise ValueError(f"No existe la exportación '{id_trabajo}'")
+        return trabajo
+
+    def listar(self) -> list:
+        """
+        Devuelve los trabajos conocidos, del más reciente al más antiguo.
+        """
+        with self._lock:
+            return list(reversed(self._trabajos.values()))
+
+async def ejecutar_en_hilo(funcion: Callable, *args):
+    """
+    Como `asyncio.to_thread`, pero si la tarea se cancela mientras el hilo trabaja, espera
+    a que termine antes de propagar la cancelación. Así el archivo que se está escribiendo
+    no se cierra ni se elimina mientras otro hilo todavía escribe en él.
+    """
+    futuro = asyncio.ensure_future(asyncio.to_thread(funcion, *args))
+    try:
+        return await asyncio.shield(futuro)
+    except asyncio.CancelledError:
+        try:
+            await futuro
+        except Exception:
+            pass
+        raise
+
+# Gestor compartido por todas las herramientas de exportación
+gestor_exportaciones = GestorExportaciones(
+    workers=EXPORTACION_TRABAJOS_WORKERS,
+    max_pendientes=EXPORTACION_TRABAJOS_MAX,
+    historial=EXPORTACION_TRABAJOS_HISTORIAL,
+)
+
+def mensaje_trabajo_enviado(trabajo: TrabajoExportacion) -> str:
+    """
+    Mensaje que devuelven las herramientas al enviar una exportación en segundo plano.
+    """
+    resultado = "⏳ **EXPORTACIÓN EN SEGUNDO PLANO**\n\n"
+    resultado += f"🆔 **Id del trabajo:** {trabajo.id}\n"
+    resultado += f"📝 **Descripción:** {trabajo.descripcion}\n\n"
+    resultado += f"💡 Consulte el avance con consultar_exportacion(id_trabajo=\"{trabajo.id}\") "
+    resultado += f"o cancélela con cancelar_exportacion(id_trabajo=\"{trabajo.id}\")."
+    return resultado